@@ -0,0 +1,64 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+from Converse.config.task_config import BotConfig, FAQConfig, TaskConfig
+from Converse.entity.entity_manager import EntityManager
+from Converse.response.response import Response
+from Converse.utils.faq_index import FAQIndex
+from Converse.utils.phrase_matcher import PhraseMatcher
+from Converse.utils.yaml_parser import load_yaml
+
+
+class BotBundle:
+    """
+    The objects built from the config files of a bot: the task, FAQ and bot
+    configs, the FAQ index, the pause phrase matcher, the entity manager, the
+    policy logic and the response templates.
+    The bundle is built once and shared by all the dialog sessions, which keep
+    their states in their DialogContext, so it can not be changed afterwards.
+    """
+
+    def __init__(
+        self,
+        task_path: str,
+        policy_path: str,
+        entity_path: str,
+        entity_extraction_path: str,
+        response_path: str,
+    ):
+        self.task_path = task_path
+        self.policy_path = policy_path
+        self.entity_path = entity_path
+        self.entity_extraction_path = entity_extraction_path
+        self.response_path = response_path
+        self.task_config = TaskConfig(task_path)
+        self.faq_config = FAQConfig(task_path)
+        self.faq_index = FAQIndex(self.faq_config)
+        self.bot_config = BotConfig(task_path)
+        self.pause_matcher = PhraseMatcher(
+            {
+                "hold": self.bot_config.hold_keywords,
+                "resume": self.bot_config.resume_keywords,
+            },
+            max_l_dist=3,
+        )
+        self.entity_manager = EntityManager(entity_path, entity_extraction_path)
+        policy_data = load_yaml(policy_path)
+        self.policy = policy_data.get("Logic")
+        self.policy_flags = policy_data.get("Flag")
+        self.policy_states = policy_data.get("State")
+        self.response = Response(
+            template=response_path,
+            task_config=self.task_config,
+            bot_config=self.bot_config,
+            entity_manager=self.entity_manager,
+        )
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("BotBundle can not be changed, build a new one")
+        super().__setattr__(name, value)
@@ -186,6 +186,23 @@ class BotConfig(FixedKeyConfigDictionary):
     _OPTIONAL_ATTRIBUTES = {
         "text_bot": True,
         "bot_name": "your Converse bot",
+        # phrases pausing and resuming the conversation, matched up to
+        # three character errors
+        "hold_keywords": ListOfStr(
+            [
+                "hold a second",
+                "hold a sec",
+                "hold a 2nd",
+                "hold a moment",
+                "wait a second",
+                "wait a sec",
+                "wait a 2nd",
+                "wait a moment",
+            ]
+        ),
+        "resume_keywords": ListOfStr(
+            ["okay i'm back", "ok i'm back", "i'm back ok", "i'm back", "i am back"]
+        ),
     }
 
     def __init__(self, taskYamlFile: str):
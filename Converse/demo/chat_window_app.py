@@ -13,6 +13,7 @@ from Converse.utils.utils import json_resp
 from Converse.simple_db.simple_db import SimpleDB
 from Converse.dialog_orchestrator.orchestrator import Orchestrator
 from Converse.dialog_context.dialog_context_manager import DialogContextManager
+from Converse.utils import nltk_resources
 
 chat_window = Blueprint(
     "chat_window",
@@ -283,6 +284,8 @@ if __name__ == "__main__":
         info_path=args.info_path,
         entity_function_path=args.entity_function_path,
     )
+    # tokenizer and tagger loaded from the local NLTK data before serving
+    nltk_resources.warmup()
     simple_db = SimpleDB()
     simple_db.set_db("./Converse/bot_configs/online_shopping/db.yaml")
 
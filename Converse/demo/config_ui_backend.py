@@ -26,6 +26,7 @@ from werkzeug.utils import secure_filename
 
 from Converse.dialog_orchestrator.orchestrator import Orchestrator
 from Converse.dialog_context.dialog_context_manager import DialogContextManager
+from Converse.utils import nltk_resources
 
 app = Flask(__name__, template_folder="./templates")
 cors = CORS(app)
@@ -167,6 +168,8 @@ def reset():
         if "cid" not in user_input:
             return json.dumps({"status": "ERROR"})
 
+        # the bot config files may have been edited and saved in the config UI
+        orchestrator.reload()
         res = orchestrator.reset()
         cid = user_input["cid"]
         ctx = dmgr.reset_ctx(
@@ -302,6 +305,8 @@ try:
         info_path=args.info_path,
         entity_function_path=args.entity_function_path,
     )
+    # tokenizer and tagger loaded from the local NLTK data before serving
+    nltk_resources.warmup()
 except Exception as e:
     printException()
 
@@ -16,6 +16,7 @@ from flask_cors import CORS
 
 from Converse.dialog_orchestrator.orchestrator import Orchestrator
 from Converse.dialog_context.dialog_context_manager import DialogContextManager
+from Converse.utils import nltk_resources
 
 
 app = Flask(__name__, template_folder="./templates/")
@@ -111,7 +112,8 @@ def run():
     CORS(app)
     app.logger.info("Initializing Dial ...")
     app.logger.info("done!")
-    app.run("0.0.0.0", port=9002)
+    # the sessions are served concurrently, each one with its own context
+    app.run("0.0.0.0", port=9002, threaded=True)
 
 
 if __name__ == "__main__":
@@ -135,4 +137,6 @@ if __name__ == "__main__":
         info_path=args.info_path,
         entity_function_path=args.entity_function_path,
     )
+    # tokenizer and tagger loaded from the local NLTK data before serving
+    nltk_resources.warmup()
     run()
@@ -25,6 +25,7 @@ from werkzeug.utils import secure_filename
 
 from Converse.dialog_orchestrator.orchestrator import Orchestrator
 from Converse.dialog_context.dialog_context_manager import DialogContextManager
+from Converse.utils import nltk_resources
 
 
 def create_config_ui_app(
@@ -179,6 +180,8 @@ def create_config_ui_app(
             if "cid" not in user_input:
                 return json.dumps({"status": "ERROR"})
 
+            # the bot config files may have been edited and saved in the config UI
+            orchestrator.reload()
             res = orchestrator.reset()
             cid = user_input["cid"]
             ctx = dmgr.reset_ctx(
@@ -276,6 +279,8 @@ def create_config_ui_app(
             info_path=info_path,
             entity_function_path=entity_function_path,
         )
+        # tokenizer and tagger loaded from the local NLTK data before serving
+        nltk_resources.warmup()
     except Exception as e:
         printException()
     app.run("0.0.0.0", port=8088)
@@ -4,7 +4,9 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import io
 import logging
+import pickle
 import jsonpickle
 from collections import deque
 
@@ -91,13 +93,6 @@ class DialogContext:
         """
         DialogContext records the meta data for a dialog session.
         """
-        self.user_response = ""  # saves the latest user response
-        self.turn = 0
-        self.last_response = None
-        self.do_pause = False
-        self.finish_and_fail = False
-        self.repeat = False
-        self.update_entity = dict()
         self.policy_map = dict()
         self.bot_config = bot_config
         # policy map stores string mapping from strings in config yaml
@@ -107,11 +102,28 @@ class DialogContext:
         if bool(entity_config):
             self.cur_states = DialogState()
         self.tree_manager = TreeManager(task_config)
-        self.tree_manager.reset_states()
         self.entity_history_manager = EntityHistoryManager()
+        self.reset()
+
+    def reset(self):
+        """
+        Start the dialog session over. The context keeps the configs of its
+        bot, everything the session collected so far is forgotten.
+        """
+        self.user_response = ""  # saves the latest user response
+        self.turn = 0
+        self.last_response = None
+        self.do_pause = False
+        self.finish_and_fail = False
+        self.repeat = False
+        self.update_entity = dict()
+        if self.cur_states is not None:
+            self.cur_states = DialogState()
+        self.tree_manager.reset_states()
         self.entity_history_manager.reset()
         self.user_history = UserHistory()
         self.collected_entities = dict()
+        self.reset_task_turns()
         self.reset_update()
 
     def serialize(self) -> str:
@@ -132,8 +144,51 @@ class DialogContext:
         """
         dialog_context = jsonpickle.decode(serialized_dialog_context)
         assert isinstance(dialog_context, DialogContext)
+        # jsonpickle sets the attributes one by one, without __setstate__
+        dialog_context._set_missing_states()
         return dialog_context
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._set_missing_states()
+
+    def _set_missing_states(self):
+        """
+        Contexts saved before the turn counts of the tasks were kept in the
+        context lack them, they start counting from the next turn.
+        """
+        self.__dict__.setdefault("task_turns", dict())
+        self.__dict__.setdefault("exceed_max_turn_flag", False)
+
+    def checkpoint(self, *turn_objects) -> bytes:
+        """
+        Save the states of the session, and the given objects of the current
+        turn, so that the turn can be run again from here after restore.
+        The configs of the bot are shared, they are saved by reference.
+        """
+        shared = self._shared_configs()
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda obj: id(obj) if id(obj) in shared else None
+        pickler.dump((self.__dict__, turn_objects))
+        return buffer.getvalue()
+
+    def restore(self, checkpoint: bytes) -> tuple:
+        """
+        Bring the session back to the checkpoint, returns fresh copies of the
+        turn objects of the checkpoint. The checkpoint can be restored again.
+        """
+        unpickler = pickle.Unpickler(io.BytesIO(checkpoint))
+        unpickler.persistent_load = self._shared_configs().__getitem__
+        states, turn_objects = unpickler.load()
+        self.__dict__.clear()
+        self.__dict__.update(states)
+        return turn_objects
+
+    def _shared_configs(self) -> dict:
+        task_config = self.tree_manager.task_path
+        return {id(self.bot_config): self.bot_config, id(task_config): task_config}
+
     def store_utt(self, user_id, message_time, utt, **kwags):
         self.user_history.store_message(user_id, message_time, utt, **kwags)
 
@@ -153,6 +208,15 @@ class DialogContext:
         self.update_entity["value"] = None
         self.update_entity["task"] = None
 
+    def reset_task_turns(self):
+        """
+        self.task_turns counts the turns spent in each task, a task is finished
+        when its count exceeds the task max_turns and
+        self.exceed_max_turn_flag is then set for the next turn.
+        """
+        self.task_turns = dict()
+        self.exceed_max_turn_flag = False
+
 
 if __name__ == "__main__":
     dialog_context = DialogContext(
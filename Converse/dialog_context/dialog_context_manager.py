@@ -6,6 +6,7 @@
 
 import logging
 import redis
+from redis import asyncio as aioredis
 
 from Converse.dialog_context.dialog_context import DialogContext
 from Converse.config.task_config import TaskConfig, BotConfig
@@ -53,6 +54,36 @@ class DialogContextManager:
     def save(self, ctx_key: str, ctx_value: DialogContext):
         pass
 
+    # Coroutine versions for Orchestrator.process_async, by default they call
+    # the methods above, which is fine for the stores that do not block
+
+    async def get_ctx_async(self, ctx_key: str) -> DialogContext:
+        return self.get_ctx(ctx_key)
+
+    async def get_or_create_ctx_async(
+        self,
+        ctx_key: str,
+        entity_config: dict = None,
+        task_config: TaskConfig = None,
+        bot_config: BotConfig = None,
+    ) -> DialogContext:
+        return self.get_or_create_ctx(ctx_key, entity_config, task_config, bot_config)
+
+    async def delete_ctx_async(self, ctx_key: str):
+        return self.delete_ctx(ctx_key)
+
+    async def reset_ctx_async(
+        self,
+        ctx_key: str,
+        entity_config: dict = None,
+        task_config: TaskConfig = None,
+        bot_config: BotConfig = None,
+    ) -> DialogContext:
+        return self.reset_ctx(ctx_key, entity_config, task_config, bot_config)
+
+    async def save_async(self, ctx_key: str, ctx_value: DialogContext):
+        self.save(ctx_key, ctx_value)
+
 
 class MemoryDialogContextManager(DialogContextManager):
     def __init__(self):
@@ -113,6 +144,8 @@ class RedisDialogContextManager(DialogContextManager):
         host = kwargs.get("host", "127.0.0.1")
         port = kwargs.get("port", 6379)
         self.context_store = redis.Redis(host=host, port=port)
+        # connects on first use, from the event loop of the async methods
+        self.async_context_store = aioredis.Redis(host=host, port=port)
         super().__init__()
 
     def get_ctx(self, ctx_key: str) -> DialogContext:
@@ -163,3 +196,45 @@ class RedisDialogContextManager(DialogContextManager):
 
     def save(self, ctx_key: str, ctx_value: DialogContext):
         self._set_ctx(ctx_key, ctx_value)
+
+    async def get_ctx_async(self, ctx_key: str) -> DialogContext:
+        serialized_ctx_value = await self.async_context_store.get(ctx_key)
+        if serialized_ctx_value is None:
+            return None
+        return DialogContext.deserialize(serialized_ctx_value)
+
+    async def get_or_create_ctx_async(
+        self,
+        ctx_key: str,
+        entity_config: dict = None,
+        task_config: TaskConfig = None,
+        bot_config: BotConfig = None,
+    ) -> DialogContext:
+        ctx_value = await self.get_ctx_async(ctx_key)
+        if ctx_value is None:
+            ctx_value = DialogContext(
+                entity_config=entity_config,
+                task_config=task_config,
+                bot_config=bot_config,
+            )
+            await self.save_async(ctx_key, ctx_value)
+        return ctx_value
+
+    async def reset_ctx_async(
+        self,
+        ctx_key: str,
+        entity_config: dict = None,
+        task_config: TaskConfig = None,
+        bot_config: BotConfig = None,
+    ) -> DialogContext:
+        ctx_value = DialogContext(
+            entity_config=entity_config, task_config=task_config, bot_config=bot_config
+        )
+        await self.save_async(ctx_key, ctx_value)
+        return ctx_value
+
+    async def delete_ctx_async(self, ctx_key: str):
+        return await self.async_context_store.delete(ctx_key)
+
+    async def save_async(self, ctx_key: str, ctx_value: DialogContext):
+        await self.async_context_store.set(ctx_key, ctx_value.serialize())
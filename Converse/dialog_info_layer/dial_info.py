@@ -4,15 +4,17 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.tokenize import sent_tokenize
+import asyncio
+import functools
 
 from Converse.dialog_context.dialog_context import DialogContext
-from Converse.nlu.ner_converse.client import NER
+from Converse.nlu.ner_converse.client import NER, AsyncNER
 from Converse.nlu.negation_detection.negation_v2 import NegationDetection
-from Converse.nlu.intent_converse.client import IntentDetection
+from Converse.nlu.intent_converse.client import IntentDetection, AsyncIntentDetection
 from Converse.config.task_config import TaskConfig, BotConfig, FAQConfig
+from Converse.dialog_info_layer.model_gate import ModelPlan, skipped_result
+from Converse.dialog_info_layer.model_graph import GraphRunner, ModelGraph, load_client
+from Converse.utils.annotation import UtteranceAnnotation
 from Converse.utils.yaml_parser import load_info_logic
 
 
@@ -20,19 +22,32 @@ SELECTED_POS_TAGS = {"PRP", "PRP$", "WP", "WP$"}
 COREFERENCE_SKIP = {"i", "you", "we"}
 
 client_dict = {"ner": NER, "intent": IntentDetection, "negation": NegationDetection}
+# grpc.aio clients used by collect_info_async, the other models run in threads
+async_client_dict = {"ner": AsyncNER, "intent": AsyncIntentDetection}
+# clients called with the UtteranceAnnotation of the turn
+annotation_clients = {"negation"}
+# gRPC clients called with the deadline of the model as the request timeout
+timeout_clients = {"ner", "intent"}
 
 
-# when adding new NLP model, should modify import, client_dict, collect_info(),
-# and also maybe the logic in info_pipeline
+# a new NLP model is added in the info config, with the dotted path of its
+# client class, post-processing of its results may need info_pipeline changes
 class InfoManager:
     def __init__(
         self,
         info_config_file,
         task_config: TaskConfig = None,
         faq_config: FAQConfig = None,
+        max_workers=8,
     ):
         self.models_info = load_info_logic(info_config_file)
+        # dependencies, deadlines and fallbacks of the models
+        self.graph = ModelGraph(self.models_info)
+        self.runner = GraphRunner(self.graph, max_workers=max_workers)
+        self.metrics = self.runner.metrics
         self.models = {}
+        self.async_models = {}
+        self.init_args = {}
         self.negate_intent_threshold = 0.2
         for m_name in self.models_info:
             init_args = (
@@ -43,18 +58,124 @@ class InfoManager:
             if task_config and m_name == "intent":
                 init_args["task_config"] = task_config
                 init_args["faq_config"] = faq_config
-            self.models[m_name] = client_dict[m_name](**init_args)
+            client = (
+                load_client(self.models_info[m_name]["client"])
+                if "client" in self.models_info[m_name]
+                else client_dict[m_name]
+            )
+            self.models[m_name] = client(**init_args)
+            self.init_args[m_name] = init_args
             """
             An example of self.models:
             {'ner': NER client instance,
                 'negation': NegationDetection client instance, ...}
             """
 
-    def collect_info(self, utt: str, model_names: list, ctx: DialogContext):
+    def collect_info(
+        self,
+        utt: str,
+        model_names: list,
+        ctx: DialogContext,
+        intent_texts=(),
+        annotation: UtteranceAnnotation = None,
+    ):
+        """
+        Run the models on the utterance, concurrently following the model
+        graph. The intent model gets the utterance, each of its sentences and
+        the extra intent_texts in a single call, the results of intent_texts
+        are stored under "intent_extra".
+        """
+        if annotation is None or annotation.text != utt:
+            annotation = UtteranceAnnotation(utt)
+        calls, fallbacks = {}, {}
+        context = utt
+        for name in model_names:
+            assert name in self.models
+            if "context_args" in self.models_info[name]:
+                context = ctx.user_history.extract_utt(
+                    **self.models_info[name]["context_args"]
+                )
+            call_args = (
+                self.models_info[name]["call_args"]
+                if "call_args" in self.models_info[name]
+                else {}
+            )
+            if name in annotation_clients and context == utt:
+                call_args = dict(call_args, annotation=annotation)
+            timeout = self.graph.nodes[name].timeout
+            if (
+                name in timeout_clients
+                and "client" not in self.models_info[name]
+                and timeout is not None
+            ):
+                # a hung call gives its worker back at the deadline
+                call_args = dict(call_args, timeout=timeout)
+            if name == "intent":
+                # sentence segmentation
+                sents_after_seg = annotation.sentences
+                intent_texts = [context] + sents_after_seg + list(intent_texts)
+                calls[name] = functools.partial(
+                    self.intent_batch, intent_texts, **call_args
+                )
+                fallbacks[name] = functools.partial(
+                    self.intent_fallback, len(intent_texts)
+                )
+            else:
+                calls[name] = functools.partial(self.models[name], context, **call_args)
+
         res = {}
+        for name, output in self.runner.run(calls, fallbacks).items():
+            if name == "intent":
+                res[name] = output[0]
+                res["intent_seg"] = output[1 : len(sents_after_seg) + 1]
+                res["intent_extra"] = output[len(sents_after_seg) + 1 :]
+            else:
+                res[name] = output
+        return res
+
+    def intent_fallback(self, n_texts: int) -> list:
+        """ Fallback result of every text of an intent call """
+        return [self.graph.nodes["intent"].fallback_result() for _ in range(n_texts)]
+
+    def intent_batch(self, texts: list, **call_args) -> list:
+        """ Query the intent model once, identical texts are only sent once """
+        unique_texts = list(dict.fromkeys(texts))
+        results = dict(
+            zip(unique_texts, self.models["intent"].batch(unique_texts, **call_args))
+        )
+        return [results[text] for text in texts]
+
+    def async_model(self, name: str):
+        """ The async client of a model, created on first use """
+        if name not in self.async_models:
+            self.async_models[name] = async_client_dict[name](**self.init_args[name])
+        return self.async_models[name]
+
+    async def close_async(self):
+        """ Close the channels the async clients opened on the running loop """
+        for model in self.async_models.values():
+            await model.close()
+
+    async def collect_info_async(
+        self,
+        utt: str,
+        model_names: list,
+        ctx: DialogContext,
+        intent_texts=(),
+        annotation: UtteranceAnnotation = None,
+    ):
+        """
+        Same results as collect_info, on the event loop. The gRPC models are
+        awaited through their grpc.aio clients, the local models run in the
+        default executor.
+        """
+        if annotation is None or annotation.text != utt:
+            annotation = UtteranceAnnotation(utt)
+        loop = asyncio.get_running_loop()
+        calls, fallbacks = {}, {}
         context = utt
         for name in model_names:
-            assert name in client_dict
+            assert name in self.models
             if "context_args" in self.models_info[name]:
                 context = ctx.user_history.extract_utt(
                     **self.models_info[name]["context_args"]
@@ -64,15 +185,51 @@ class InfoManager:
                 if "call_args" in self.models_info[name]
                 else {}
             )
-            res[name] = self.models[name](context, **call_args)
-            # sentence segmentation
+            if name in annotation_clients and context == utt:
+                call_args = dict(call_args, annotation=annotation)
             if name == "intent":
-                sents_after_seg = sent_tokenize(utt)
-                res["intent_seg"] = [
-                    self.models[name](sent, **call_args) for sent in sents_after_seg
-                ]
+                sents_after_seg = annotation.sentences
+                intent_texts = [context] + sents_after_seg + list(intent_texts)
+                calls[name] = functools.partial(
+                    self.intent_batch_async, intent_texts, **call_args
+                )
+                fallbacks[name] = functools.partial(
+                    self.intent_fallback, len(intent_texts)
+                )
+            elif name in async_client_dict and "client" not in self.models_info[name]:
+                calls[name] = functools.partial(
+                    self.async_model(name), context, **call_args
+                )
+            else:
+                calls[name] = functools.partial(
+                    loop.run_in_executor,
+                    None,
+                    functools.partial(self.models[name], context, **call_args),
+                )
+
+        res = {}
+        for name, output in (await self.runner.run_async(calls, fallbacks)).items():
+            if name == "intent":
+                res[name] = output[0]
+                res["intent_seg"] = output[1 : len(sents_after_seg) + 1]
+                res["intent_extra"] = output[len(sents_after_seg) + 1 :]
+            else:
+                res[name] = output
         return res
 
+    async def intent_batch_async(self, texts: list, **call_args) -> list:
+        """ Async intent_batch, no call is made without texts """
+        if not texts:
+            return []
+        unique_texts = list(dict.fromkeys(texts))
+        results = dict(
+            zip(
+                unique_texts,
+                await self.async_model("intent").batch(unique_texts, **call_args),
+            )
+        )
+        return [results[text] for text in texts]
+
     def intent_resolution(self, intent_res_1, intent_res_2, negation_flag=False):
         got_intent_1 = intent_res_1["success"] if intent_res_1 else False
         got_intent_2 = intent_res_2["success"] if intent_res_2 else False
@@ -109,35 +266,155 @@ class InfoManager:
 
         return res
 
+    def polarity_result(self, annotation: UtteranceAnnotation, polarity: str, models):
+        """ Results of a turn answered by the polarity lexicon, without model calls """
+        intent_res = {
+            "success": True,
+            "intent": polarity,
+            "prob": 1.0,
+            "sent": annotation.text,
+        }
+        res = {
+            m_name: skipped_result(m_name, annotation)
+            for m_name in models
+            if m_name != "intent"
+        }
+        res["intent"] = intent_res
+        res["intent_seg"] = [intent_res]
+        return self.resolve_intents(res, [False], [None])
+
     def info_pipeline(
         self,
         asr_origin: str,
         asr_norm: str,
         ctx: DialogContext,
         models=["intent", "ner"],
+        plan: ModelPlan = None,
     ):
         """
         This is the function that the orchestrator actually calls.
         It first collects all the NLU model results,
         then do intent resolution.
+        The models skipped by the plan get an empty result.
         """
-        tokenized_utt = word_tokenize(asr_norm)
-        pos_tags = nltk.pos_tag(tokenized_utt)
+        annotation = UtteranceAnnotation(asr_norm)
+        self.store_utt(annotation, ctx)
+        models = [m_name for m_name in self.models_info] if self.models_info else models
+        plan = plan or ModelPlan()
+        if plan.polarity:
+            return self.polarity_result(annotation, plan.polarity, models)
+        # the second pass intent queries depend on the negation and coreference
+        # results, so the intent model runs after the others, in one call
+        res = self.collect_info(
+            asr_norm,
+            [
+                m_name
+                for m_name in models
+                if m_name != "intent" and m_name not in plan.skip
+            ],
+            ctx,
+            annotation=annotation,
+        )
+        res.update(
+            {
+                m_name: skipped_result(m_name, annotation)
+                for m_name in plan.skip & set(models)
+            }
+        )
+        negation_flags, intent_2nd_texts = self.second_pass_intent_texts(
+            res, annotation, ctx
+        )
+        res.update(
+            self.collect_info(
+                asr_norm,
+                ["intent"],
+                ctx,
+                intent_texts=intent_2nd_texts.values(),
+                annotation=annotation,
+            )
+        )
+        intent_2nd_res = [None] * len(negation_flags)
+        for i, intent_2nd in zip(intent_2nd_texts, res.pop("intent_extra")):
+            intent_2nd_res[i] = intent_2nd
+        return self.resolve_intents(res, negation_flags, intent_2nd_res)
+
+    async def info_pipeline_async(
+        self,
+        asr_origin: str,
+        asr_norm: str,
+        ctx: DialogContext,
+        models=["intent", "ner"],
+        plan: ModelPlan = None,
+    ):
+        """
+        Same as info_pipeline, but the models run concurrently. The first
+        intent pass runs together with the other models, the second pass only
+        if negation or coreference changed a sentence.
+        """
+        annotation = UtteranceAnnotation(asr_norm)
+        self.store_utt(annotation, ctx)
+        models = [m_name for m_name in self.models_info] if self.models_info else models
+        plan = plan or ModelPlan()
+        if plan.polarity:
+            return self.polarity_result(annotation, plan.polarity, models)
+        res = await self.collect_info_async(
+            asr_norm,
+            [m_name for m_name in models if m_name not in plan.skip],
+            ctx,
+            annotation=annotation,
+        )
+        res.update(
+            {
+                m_name: skipped_result(m_name, annotation)
+                for m_name in plan.skip & set(models)
+            }
+        )
+        res.pop("intent_extra")
+        negation_flags, intent_2nd_texts = self.second_pass_intent_texts(
+            res, annotation, ctx
+        )
+        call_args = self.models_info["intent"].get("call_args", {})
+        intent_2nd_res = [None] * len(negation_flags)
+        texts = list(intent_2nd_texts.values())
+        intent_2nd_results = []
+        if texts:
+            second_pass = await self.runner.run_async(
+                {
+                    "intent": functools.partial(
+                        self.intent_batch_async, texts, **call_args
+                    )
+                },
+                {"intent": functools.partial(self.intent_fallback, len(texts))},
+            )
+            intent_2nd_results = second_pass["intent"]
+        for i, intent_2nd in zip(intent_2nd_texts, intent_2nd_results):
+            intent_2nd_res[i] = intent_2nd
+        return self.resolve_intents(res, negation_flags, intent_2nd_res)
+
+    @staticmethod
+    def store_utt(annotation: UtteranceAnnotation, ctx: DialogContext):
         ctx.store_utt(
             "spk1",
             "%Y-%m-%d %H:%M:%S",
-            asr_norm,
-            tokenized_text=tokenized_utt,
-            pos_tags=pos_tags,
+            annotation.text,
+            tokenized_text=annotation.tokens,
+            pos_tags=annotation.pos_tags,
         )
-        models = [m_name for m_name in self.models_info] if self.models_info else models
-        res = self.collect_info(asr_norm, models, ctx)
+
+    def second_pass_intent_texts(
+        self, res: dict, annotation: UtteranceAnnotation, ctx: DialogContext
+    ):
+        """
+        Remove the negation words and resolve the coreferences of the current
+        message. Returns the negation flag of every sentence and the adjusted
+        sentences, by sentence index, that need a second intent pass.
+        """
         cur_mes = ctx.user_history.messages_buffer[-1]
+        tokenized_utt, pos_tags = annotation.tokens, annotation.pos_tags
 
         # sentence segmentation
-        raw_sents = sent_tokenize(asr_norm)
+        raw_sents = annotation.sentences
         negation_flags = [False] * len(raw_sents)
-        intent_2nd_res = [None] * len(raw_sents)
         negation_placeholder = "#@#"
 
         def remove_negation_word(negation_res, negation_placeholder="#@#"):
@@ -154,7 +431,7 @@ class InfoManager:
                 words[i] = negation_placeholder
             text_with_negation_words_removed = " ".join(words)
             tokenized_text_with_negation_placeholder = words
-            sents_with_negation_words_removed = sent_tokenize(
+            sents_with_negation_words_removed = annotation.sent_tokenize(
                 text_with_negation_words_removed
             )
             negation_flags = [False] * len(sents_with_negation_words_removed)
@@ -194,7 +471,7 @@ class InfoManager:
                 cur_mes.text_with_negation_words_removed,
                 tokenized_text_with_negation_placeholder,
                 sents_with_negation_words_removed,
-            ) = (" ".join(tokenized_utt), tokenized_utt, sent_tokenize(asr_norm))
+            ) = (" ".join(tokenized_utt), tokenized_utt, annotation.sentences)
 
         # coreference resolution
         def find_entity(coref_res, cluster):
@@ -204,9 +481,9 @@ class InfoManager:
             the function will return "the blue bike".
             """
             words = coref_res["words"]
+            pos_tags = annotation.pos_tag(words)
             entity = ""
             for span_s, span_e in cluster:
-                pos_tags = nltk.pos_tag(words)
                 # skip personal pronoun like I, you, we
                 if " ".join(words[span_s:span_e]).lower() not in COREFERENCE_SKIP:
                     span_tags = set([t[1] for t in pos_tags[span_s:span_e]])
@@ -285,11 +562,12 @@ class InfoManager:
         )
 
         # intent resolution
-        sents_to_adjust_for_coref = sent_tokenize(cur_mes.utt_replaced_coref)
-        sents_tokenized_text_with_negation_placeholder = sent_tokenize(
+        sents_to_adjust_for_coref = annotation.sent_tokenize(cur_mes.utt_replaced_coref)
+        sents_tokenized_text_with_negation_placeholder = annotation.sent_tokenize(
             " ".join(tokenized_text_with_negation_placeholder)
         )
         coref_flags = [False] * len(sents_to_adjust_for_coref)
+        intent_2nd_texts = {}
         for i in range(len(coref_flags)):
             sent_to_adjust_for_coref = sents_to_adjust_for_coref[i]
             if (
@@ -297,18 +575,18 @@ class InfoManager:
                 != sents_tokenized_text_with_negation_placeholder[i]
             ):
                 coref_flags[i] = True
-                intent_2nd_res[i] = self.models["intent"](
-                    sent_to_adjust_for_coref.replace(negation_placeholder, "")
+                intent_2nd_texts[i] = sent_to_adjust_for_coref.replace(
+                    negation_placeholder, ""
                 )
             elif negation_flags[i]:
-                intent_2nd_res[i] = self.models["intent"](
-                    sents_with_negation_words_removed[i]
-                )
+                intent_2nd_texts[i] = sents_with_negation_words_removed[i]
 
         cur_mes.utt_replaced_coref = cur_mes.utt_replaced_coref.replace(
             negation_placeholder, ""
         )
+        return negation_flags, intent_2nd_texts
 
+    def resolve_intents(self, res: dict, negation_flags, intent_2nd_res):
         assert len(res["intent_seg"]) == len(intent_2nd_res) == len(negation_flags)
         intent_res = []
         for i in range(len(negation_flags)):
@@ -0,0 +1,151 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import re
+import threading
+from collections import defaultdict
+
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.entity.entity_manager import EntityManager
+from Converse.utils.annotation import UtteranceAnnotation
+
+POSITIVE_PHRASES = {
+    "yes",
+    "yeah",
+    "yep",
+    "yup",
+    "sure",
+    "ok",
+    "okay",
+    "correct",
+    "right",
+    "absolutely",
+    "of course",
+    "yes please",
+    "yes it is",
+    "yes that's right",
+    "yes that is right",
+    "that's right",
+    "that is right",
+    "that's correct",
+    "that is correct",
+    "sure thing",
+}
+NEGATIVE_PHRASES = {
+    "no",
+    "nope",
+    "nah",
+    "no thanks",
+    "no thank you",
+    "no it isn't",
+    "no it is not",
+    "not really",
+    "that's wrong",
+    "that is wrong",
+    "that's not right",
+    "that is not right",
+    "incorrect",
+    "wrong",
+}
+# models whose result can be left out of the turn, with the result used instead
+SKIPPABLE_MODELS = {"ner", "negation"}
+
+
+def skipped_result(name: str, annotation: UtteranceAnnotation):
+    """ Result of a model that was not called, as if it found nothing """
+    if name == "ner":
+        return {"success": True}
+    if name == "negation":
+        return {"wordlist": list(annotation.lower().tokens), "triplets": [(-1, -1, -1)]}
+    raise ValueError("Model %s can not be skipped" % name)
+
+
+class ModelPlan:
+    """
+    Models of the turn that the info layer does not need to call, and the
+    polarity of the utterance when the lexicon alone answers the turn.
+    """
+
+    def __init__(self, skip=(), polarity: str = None):
+        self.skip = frozenset(skip)
+        self.polarity = polarity
+
+
+class ModelGate:
+    """
+    Decides from the dialog states which NLU models are needed in a turn:
+    - a yes/no answer to a confirmation, or to a USER_UTT entity question, is
+      resolved from a polarity lexicon without any model call,
+    - for a USER_UTT entity not extracted by NER, the whole utterance is the
+      entity and the intent is only read for its polarity and FAQs, so the
+      NER model is skipped.
+    """
+
+    def __init__(self, model_names, entity_manager: EntityManager):
+        self.model_names = list(model_names)
+        self.entity_manager = entity_manager
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.calls = defaultdict(int)
+        self.skipped = defaultdict(int)
+
+    @staticmethod
+    def polarity(utt: str):
+        """ positive or negative if the utterance is a plain yes or no, else None """
+        phrase = " ".join(re.sub(r"[^\w\s']", " ", utt.lower()).split())
+        if phrase in POSITIVE_PHRASES:
+            return "positive"
+        if phrase in NEGATIVE_PHRASES:
+            return "negative"
+        return None
+
+    def plan(self, asr_norm: str, ctx: DialogContext) -> ModelPlan:
+        states = ctx.cur_states
+        plan = ModelPlan()
+        # choosing between multiple entities reads the NER and negation results
+        if not states.multiple_entities:
+            user_utt = "USER_UTT" in states.cur_entity_types
+            polarity = (
+                self.polarity(asr_norm)
+                if states.confirm_entity
+                or states.confirm_intent
+                or states.confirm_continue
+                or user_utt
+                else None
+            )
+            if polarity and SKIPPABLE_MODELS.issuperset(
+                name for name in self.model_names if name != "intent"
+            ):
+                plan = ModelPlan(self.model_names, polarity)
+            elif (
+                user_utt
+                and "ner" in self.model_names
+                and "ner"
+                not in self.entity_manager.get_extraction_methods(
+                    entity_name=states.cur_entity_name
+                )
+            ):
+                plan = ModelPlan(["ner"])
+        self.record(plan)
+        return plan
+
+    def record(self, plan: ModelPlan):
+        with self.lock:
+            self.turns += 1
+            for name in self.model_names:
+                if name in plan.skip:
+                    self.skipped[name] += 1
+                else:
+                    self.calls[name] += 1
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "turns": self.turns,
+                "model_calls": sum(self.calls.values()),
+                "skipped_calls": sum(self.skipped.values()),
+                "skipped_by_model": dict(self.skipped),
+            }
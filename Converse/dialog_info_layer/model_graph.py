@@ -0,0 +1,252 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import asyncio
+import copy
+import importlib
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# seconds between checks for a queued call with a deadline to start running
+QUEUE_POLL = 0.01
+
+
+def load_client(path: str):
+    """ The client class of a model from its dotted path, e.g. package.module.Class """
+    module_name, _, class_name = path.rpartition(".")
+    if not module_name:
+        raise ValueError("Model client must be a dotted path: %s" % path)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class ModelNode:
+    """
+    Scheduling fields of a model in the info config: the models it waits
+    for, its deadline in seconds from its start and the result used when it
+    misses the deadline or fails.
+    """
+
+    def __init__(self, name: str, model_info: dict):
+        self.name = name
+        self.depends_on = list(model_info.get("depends_on", []))
+        self.timeout = model_info.get("timeout")
+        self.has_fallback = "fallback" in model_info
+        self.fallback = model_info.get("fallback")
+        if self.timeout is not None and not self.has_fallback:
+            raise ValueError("Model %s has a timeout but no fallback" % name)
+
+    def fallback_result(self):
+        return copy.deepcopy(self.fallback)
+
+
+class ModelGraph:
+    """ Dependency graph of the models of the info config """
+
+    def __init__(self, models_info: dict):
+        self.nodes = {name: ModelNode(name, info) for name, info in models_info.items()}
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise ValueError(
+                        "Model %s depends on unknown model %s" % (node.name, dep)
+                    )
+        self.order = self.topological_order()
+
+    def topological_order(self) -> list:
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError("Model dependency cycle: %s" % " -> ".join(path))
+            state[name] = "visiting"
+            for dep in self.nodes[name].depends_on:
+                visit(dep, path + [dep])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [name])
+        return order
+
+    def dependencies(self, name: str, names) -> list:
+        """ Dependencies of a model among the models of one run """
+        return [dep for dep in self.nodes[name].depends_on if dep in names]
+
+
+class ModelMetrics:
+    """
+    Sliding window of the latencies of every model, with timeout and error
+    counts
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.calls = defaultdict(int)
+        self.timeouts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.latencies_ms = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, name: str, latency_ms: float, timeout=False, error=False):
+        with self.lock:
+            self.calls[name] += 1
+            self.timeouts[name] += int(timeout)
+            self.errors[name] += int(error)
+            self.latencies_ms[name].append(latency_ms)
+
+    @staticmethod
+    def percentile(values, p):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return float(values[min(len(values) - 1, int(p / 100.0 * len(values)))])
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                name: {
+                    "calls": self.calls[name],
+                    "timeouts": self.timeouts[name],
+                    "errors": self.errors[name],
+                    "latency_ms_p50": self.percentile(self.latencies_ms[name], 50),
+                    "latency_ms_p99": self.percentile(self.latencies_ms[name], 99),
+                }
+                for name in self.calls
+            }
+
+
+class _ModelCall:
+    """ A model call in the executor, its clock starts when a worker runs it """
+
+    def __init__(self, name: str, function, timeout=None):
+        self.name = name
+        self.function = function
+        self.timeout = timeout
+        self.start = None
+
+    def __call__(self):
+        self.start = time.perf_counter()
+        return self.function()
+
+    def deadline(self):
+        if self.timeout is None or self.start is None:
+            return None
+        return self.start + self.timeout
+
+
+class GraphRunner:
+    """
+    Runs the models of one turn following the graph: a model starts once the
+    models it depends on have a result, independent models run concurrently.
+    A model that misses its deadline, or raises with a fallback configured,
+    gets its fallback result; a late result is discarded. The deadline counts
+    from when a worker starts the call, the wait for a free worker is not
+    part of it. A late call keeps its worker until it returns, the gRPC
+    clients get the deadline as the timeout of their requests.
+    """
+
+    def __init__(self, graph: ModelGraph, max_workers=8):
+        self.graph = graph
+        self.metrics = ModelMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def fallback(self, name: str, fallbacks: dict):
+        if name in fallbacks:
+            return fallbacks[name]()
+        return self.graph.nodes[name].fallback_result()
+
+    def run(self, calls: dict, fallbacks=None) -> dict:
+        """
+        calls maps a model name to a function without arguments returning its
+        result, fallbacks optionally maps a model name to a function building
+        its fallback result.
+        """
+        fallbacks = fallbacks or {}
+        waiting = [name for name in self.graph.order if name in calls]
+        running = {}  # future -> _ModelCall
+        results = {}
+        while waiting or running:
+            for name in list(waiting):
+                if all(dep in results for dep in self.graph.dependencies(name, calls)):
+                    waiting.remove(name)
+                    call = _ModelCall(name, calls[name], self.graph.nodes[name].timeout)
+                    running[self.executor.submit(call)] = call
+            deadlines = [call.deadline() for call in running.values()]
+            deadlines = [d for d in deadlines if d is not None]
+            wait_time = (
+                max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+            )
+            if any(
+                call.timeout is not None and call.start is None
+                for call in running.values()
+            ):
+                # its deadline is only known once a worker picks it up
+                wait_time = (
+                    QUEUE_POLL if wait_time is None else min(wait_time, QUEUE_POLL)
+                )
+            done, _ = wait(running, timeout=wait_time, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future in list(running):
+                call = running[future]
+                name, deadline = call.name, call.deadline()
+                if future in done:
+                    del running[future]
+                    latency_ms = (now - call.start) * 1000.0
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        if not self.graph.nodes[name].has_fallback:
+                            raise
+                        self.metrics.record(name, latency_ms, error=True)
+                        results[name] = self.fallback(name, fallbacks)
+                    else:
+                        self.metrics.record(name, latency_ms)
+                elif deadline is not None and now >= deadline:
+                    del running[future]
+                    self.metrics.record(name, (now - call.start) * 1000.0, timeout=True)
+                    results[name] = self.fallback(name, fallbacks)
+        return results
+
+    async def run_async(self, calls: dict, fallbacks=None) -> dict:
+        """
+        Same as run, calls maps a model name to a function returning an
+        awaitable
+        """
+        fallbacks = fallbacks or {}
+        tasks = {}
+
+        async def run_model(name):
+            for dep in self.graph.dependencies(name, calls):
+                await tasks[dep]
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    calls[name](), self.graph.nodes[name].timeout
+                )
+            except asyncio.TimeoutError:
+                self.metrics.record(
+                    name, (time.perf_counter() - start) * 1000.0, timeout=True
+                )
+                return self.fallback(name, fallbacks)
+            except Exception:
+                if not self.graph.nodes[name].has_fallback:
+                    raise
+                self.metrics.record(
+                    name, (time.perf_counter() - start) * 1000.0, error=True
+                )
+                return self.fallback(name, fallbacks)
+            self.metrics.record(name, (time.perf_counter() - start) * 1000.0)
+            return result
+
+        for name in self.graph.order:
+            if name in calls:
+                tasks[name] = asyncio.ensure_future(run_model(name))
+        results = await asyncio.gather(*tasks.values())
+        return dict(zip(tasks, results))
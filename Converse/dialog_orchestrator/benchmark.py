@@ -0,0 +1,238 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Micro-benchmarks of the dialog orchestrator, from the repository root, e.g.
+PYTHONPATH=./ python Converse/dialog_orchestrator/benchmark.py reset
+PYTHONPATH=./ python Converse/dialog_orchestrator/benchmark.py faq --n_questions 10000
+PYTHONPATH=./ python Converse/dialog_orchestrator/benchmark.py pause
+"""
+
+import argparse
+import json
+import random
+import time
+
+from Converse.config.bot_bundle import BotBundle
+from Converse.config.task_config import FAQ, BotConfig
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.dialog_orchestrator.orchestrator import Orchestrator
+from Converse.dialog_policy.dial_policy import DialoguePolicy
+from Converse.utils.faq_index import FAQIndex
+from Converse.utils.phrase_matcher import PhraseMatcher
+
+WORDS = (
+    "how do i can you what is where are my the a to for of in on with account "
+    "password reset order ship shipping return refund cancel subscription plan "
+    "price change address track package gift card store hours open weekend "
+    "delivery international payment credit invoice discount coupon warranty "
+    "repair size exchange email phone number login app update support agent"
+).split()
+
+
+def per_second(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return repeats / (time.perf_counter() - start)
+
+
+def bench_reset(orchestrator, repeats, rebuild_repeats):
+    """
+    Resets per second of a session, against rebuilding the bot resources on
+    every reset as Orchestrator.reset used to do
+    """
+    policy_layer = orchestrator.policy_layer
+    ctx = DialogContext(
+        entity_config=policy_layer.state_manager.entity_manager.entity_config,
+        task_config=policy_layer.state_manager.task_config,
+        bot_config=policy_layer.bot_config,
+    )
+
+    def rebuild():
+        bot = BotBundle(
+            task_path=orchestrator.task_path,
+            policy_path=orchestrator.policy_path,
+            entity_path=orchestrator.entity_path,
+            entity_extraction_path=orchestrator.entity_extraction_path,
+            response_path=orchestrator.response_path,
+        )
+        InfoManager(orchestrator.info_path, bot.task_config, bot.faq_config)
+        DialoguePolicy(
+            orchestrator.response_path,
+            orchestrator.policy_path,
+            orchestrator.task_path,
+            orchestrator.entity_path,
+            orchestrator.entity_extraction_path,
+            orchestrator.entity_function_path,
+            bot=bot,
+        )
+        return policy_layer.response.greeting()
+
+    results = {
+        "session_resets_per_s": per_second(
+            lambda: orchestrator.reset(ctx=ctx), repeats
+        ),
+        "rebuild_resets_per_s": per_second(rebuild, rebuild_repeats),
+    }
+    results["speedup"] = (
+        results["session_resets_per_s"] / results["rebuild_resets_per_s"]
+    )
+    return results
+
+
+def synthetic_faqs(n_questions, seed=0):
+    rng = random.Random(seed)
+    faqs = {}
+    for i in range(0, n_questions, 5):
+        faqs["faq_%d" % i] = FAQ(
+            {
+                "samples": [
+                    " ".join(rng.choices(WORDS, k=rng.randint(4, 12))) + "?"
+                    for _ in range(min(5, n_questions - i))
+                ],
+                "answers": ["answer %d" % i],
+                "question_match_options": ["fuzzy_matching"],
+            }
+        )
+    return faqs
+
+
+def typo(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        pos = rng.randint(0, len(chars) - 1)
+        if rng.random() < 0.5:
+            del chars[pos]
+        else:
+            chars.insert(pos, rng.choice("abcdefghijklmnopqrstuvwxyz "))
+    return "".join(chars)
+
+
+def bench_faq(n_questions, n_utterances):
+    """
+    Milliseconds per turn spent matching the utterance to the FAQ samples,
+    process.extract over all the samples against the FAQ index, and whether
+    the chosen samples (so the answers) are identical
+    """
+    from thefuzz import fuzz, process
+
+    start = time.perf_counter()
+    index = FAQIndex(synthetic_faqs(n_questions))
+    build_ms = (time.perf_counter() - start) * 1000.0
+    rng = random.Random(1)
+    utterances = [typo(rng, rng.choice(index.questions)) for _ in range(n_utterances)]
+    utterances += [" ".join(rng.choices(WORDS, k=8)) for _ in range(n_utterances)]
+
+    def legacy(utt):
+        question, score = process.extract(
+            utt.lower(), index.questions, scorer=fuzz.ratio
+        )[0]
+        return (question, score) if score > 90 else None
+
+    timings = {}
+    matches = {}
+    for name, match in [("extract", legacy), ("index", index.match)]:
+        start = time.perf_counter()
+        matches[name] = [match(utt) for utt in utterances]
+        timings[name + "_ms"] = (time.perf_counter() - start) * 1000.0 / len(utterances)
+    return {
+        "questions": len(index),
+        "index_build_ms": build_ms,
+        **timings,
+        "speedup": timings["extract_ms"] / timings["index_ms"],
+        "matched": sum(match is not None for match in matches["index"]),
+        "identical": matches["extract"] == matches["index"],
+    }
+
+
+def bench_pause(task_path, n_utterances):
+    """
+    Microseconds per turn spent looking for the hold and resume phrases,
+    find_near_matches for every phrase against the phrase matcher, and whether
+    the decisions are identical
+    """
+    from fuzzysearch import find_near_matches
+
+    bot_config = BotConfig(task_path)
+    groups = {
+        "hold": bot_config.hold_keywords,
+        "resume": bot_config.resume_keywords,
+    }
+    start = time.perf_counter()
+    matcher = PhraseMatcher(groups, max_l_dist=3)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    rng = random.Random(1)
+    phrases = [phrase for keywords in groups.values() for phrase in keywords]
+    utterances = [typo(rng, rng.choice(phrases)) for _ in range(n_utterances)]
+    utterances += [" ".join(rng.choices(WORDS, k=8)) for _ in range(n_utterances)]
+
+    def legacy(utt):
+        utter = utt.lower()
+        return {
+            group
+            for group, keywords in groups.items()
+            if any(find_near_matches(k, utter, max_l_dist=3) for k in keywords)
+        }
+
+    timings = {}
+    matches = {}
+    for name, match in [("find_near_matches", legacy), ("matcher", matcher.match)]:
+        start = time.perf_counter()
+        matches[name] = [match(utt) for utt in utterances]
+        timings[name + "_us"] = (
+            (time.perf_counter() - start) * 1000000.0 / len(utterances)
+        )
+    return {
+        "phrases": len(phrases),
+        "matcher_build_ms": build_ms,
+        **timings,
+        "speedup": timings["find_near_matches_us"] / timings["matcher_us"],
+        "matched": sum(bool(match) for match in matches["matcher"]),
+        "identical": matches["find_near_matches"] == matches["matcher"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    reset = subparsers.add_parser(
+        "reset", help="session resets against rebuilding the bot resources"
+    )
+    reset.add_argument("--task_path", type=str, default=None)
+    reset.add_argument("--entity_path", type=str, default=None)
+    reset.add_argument("--info_path", type=str, default=None)
+    reset.add_argument("--repeats", type=int, default=10000)
+    reset.add_argument("--rebuild_repeats", type=int, default=20)
+    faq = subparsers.add_parser(
+        "faq", help="FAQ index against process.extract over all the samples"
+    )
+    faq.add_argument("--n_questions", type=int, default=10000)
+    faq.add_argument("--n_utterances", type=int, default=200)
+    pause = subparsers.add_parser(
+        "pause", help="phrase matcher against find_near_matches for every phrase"
+    )
+    pause.add_argument(
+        "--task_path",
+        type=str,
+        default="Converse/bot_configs/online_shopping/tasks.yaml",
+    )
+    pause.add_argument("--n_utterances", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == "reset":
+        orchestrator = Orchestrator(
+            task_path=args.task_path,
+            entity_path=args.entity_path,
+            info_path=args.info_path,
+        )
+        results = bench_reset(orchestrator, args.repeats, args.rebuild_repeats)
+    elif args.command == "faq":
+        results = bench_faq(args.n_questions, args.n_utterances)
+    elif args.command == "pause":
+        results = bench_pause(args.task_path, args.n_utterances)
+    print(json.dumps(results, indent=2))
@@ -6,18 +6,20 @@
 
 import logging
 
-from fuzzysearch import find_near_matches
-from thefuzz import fuzz, process
 from random import choice
 
 from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.dialog_info_layer.model_gate import ModelGate
 from Converse.dialog_policy.dial_policy import DialoguePolicy
-from Converse.entity.entity_manager import EntityManager
-from Converse.dialog_state_manager.dial_state_manager import StatesWithinCurrentTurn
+from Converse.dialog_state_manager.dial_state_manager import (
+    FunctionCalls,
+    PendingFunctionCall,
+    StatesWithinCurrentTurn,
+    function_calls,
+)
 
-from Converse.utils.yaml_parser import load_dial_logic
 from Converse.dialog_context.dialog_context import DialogContext
-from Converse.config.task_config import TaskConfig, FAQConfig
+from Converse.config.bot_bundle import BotBundle
 
 log = logging.getLogger(__name__)
 
@@ -55,24 +57,23 @@ class Orchestrator:
         self.entity_function_path = (
             entity_function_path or self.default_entity_function_path
         )
-        self.task_config = TaskConfig(self.task_path)
-        self.faq_config = FAQConfig(self.task_path)
-        self.faq_exact_match_questions = []
-        self.faq_exact_match_q2a_dict = {}
-        for faq in self.faq_config:
-            if "fuzzy_matching" in self.faq_config[faq].question_match_options:
-                for question in self.faq_config[faq].samples:
-                    self.faq_exact_match_questions.append(question.lower())
-                    self.faq_exact_match_q2a_dict[question.lower()] = self.faq_config[
-                        faq
-                    ].answers
-        self.policy = load_dial_logic(self.policy_path)
+        self.bot = BotBundle(
+            task_path=self.task_path,
+            policy_path=self.policy_path,
+            entity_path=self.entity_path,
+            entity_extraction_path=self.entity_extraction_path,
+            response_path=self.response_path,
+        )
+        self.task_config = self.bot.task_config
+        self.faq_config = self.bot.faq_config
+        self.faq_index = self.bot.faq_index
+        self.pause_matcher = self.bot.pause_matcher
+        self.policy = self.bot.policy
         self.info_layer: InfoManager = InfoManager(
             self.info_path, self.task_config, self.faq_config
         )
-        self.entity_manager = EntityManager(
-            self.entity_path, self.entity_extraction_path
-        )
+        self.entity_manager = self.bot.entity_manager
+        self.model_gate = ModelGate(self.info_layer.models_info, self.entity_manager)
         self.policy_layer = DialoguePolicy(
             self.response_path,
             self.policy_path,
@@ -80,30 +81,34 @@ class Orchestrator:
             self.entity_path,
             self.entity_extraction_path,
             self.entity_function_path,
+            bot=self.bot,
         )
 
-    def reset(self, initiate_user_input=True) -> str:
+    def reset(self, initiate_user_input=True, ctx: DialogContext = None) -> str:
         """
-        Forget all the history and let the bot start a new conversation.
-        Reset orchestrator, dialog context and the policy layer.
+        Let the bot start a new conversation. Only the dialog context of the
+        session is reset, the bot resources are shared by all the sessions.
         """
-        self.task_config = TaskConfig(self.task_path)
-        self.faq_config = FAQConfig(self.task_path)
-        self.info_layer: InfoManager = InfoManager(
-            self.info_path, self.task_config, self.faq_config
-        )
-        self.entity_manager = EntityManager(self.entity_path)
-        self.policy_layer = DialoguePolicy(
-            self.response_path,
-            self.policy_path,
-            self.task_path,
-            self.entity_path,
-            self.entity_extraction_path,
-            self.entity_function_path,
-        )
+        if ctx is not None:
+            ctx.reset()
         response = self.policy_layer.response.greeting() if initiate_user_input else ""
         return response
 
+    def reload(self):
+        """
+        Rebuild the bot resources from the config files, after they were
+        edited. The resources of the sessions being served are replaced too.
+        """
+        self.__init__(
+            info_path=self.info_path,
+            task_path=self.task_path,
+            policy_path=self.policy_path,
+            entity_path=self.entity_path,
+            entity_extraction_path=self.entity_extraction_path,
+            response_path=self.response_path,
+            entity_function_path=self.entity_function_path,
+        )
+
     def store_agent_response(self, ctx: DialogContext):
         user_id = "spk2"
         message_time = "%Y-%m-%d %H:%M:%S"
@@ -114,34 +119,100 @@ class Orchestrator:
         aggregate the results from info layer and entity module,
         send current dialogue states to policy layer and get response
         """
+        res, cur_turn_states, prev_res = self._start_turn(ctx, asr_norm)
+        if res is not None:
+            return res
+        # the dialog states tell which models the turn needs
+        plan = self.model_gate.plan(asr_norm, ctx)
+        extracted_info = self.info_layer.info_pipeline(
+            asr_origin, asr_norm, ctx, plan=plan
+        )
+        return self._finish_turn(
+            ctx, asr_norm, extracted_info, cur_turn_states, prev_res
+        )
+
+    async def process_async(
+        self, asr_origin: str, asr_norm: str, ctx: DialogContext
+    ) -> str:
+        """
+        Same as process, on the event loop. The NLU models are awaited through
+        the async clients of the info layer, the entity and task functions
+        served over HTTP are awaited too. The policy runs synchronously.
+        """
+        res, cur_turn_states, prev_res = await self._run_with_function_calls(
+            self._start_turn, ctx, asr_norm
+        )
+        if res is not None:
+            return res
+        plan = self.model_gate.plan(asr_norm, ctx)
+        extracted_info = await self.info_layer.info_pipeline_async(
+            asr_origin, asr_norm, ctx, plan=plan
+        )
+        return await self._run_with_function_calls(
+            self._finish_turn, ctx, asr_norm, extracted_info, cur_turn_states, prev_res
+        )
+
+    async def close_async(self):
+        """ Close the gRPC channels process_async opened on the running loop """
+        await self.info_layer.close_async()
+
+    async def _run_with_function_calls(self, step, ctx: DialogContext, *args):
+        """
+        Run a synchronous step of the turn, awaiting the entity and task
+        functions served over HTTP that it calls. The step stops at such a
+        call. Once the result is in, the step runs again from a checkpoint of
+        the session, where the functions already called get their results.
+        """
+        state_manager = self.policy_layer.state_manager
+        if not state_manager.url_functions:
+            return step(ctx, *args)
+        calls = FunctionCalls()
+        checkpoint = ctx.checkpoint(*args)
+        while True:
+            token = function_calls.set(calls)
+            try:
+                return step(ctx, *args)
+            except PendingFunctionCall as call:
+                pending = call
+            finally:
+                function_calls.reset(token)
+            calls.record(pending.url, await state_manager.execute_pending_call(pending))
+            calls.rewind()
+            args = ctx.restore(checkpoint)
+
+    def _start_turn(self, ctx: DialogContext, asr_norm: str):
+        """
+        The steps of the turn before the info layer. Returns the response if
+        the turn ends here, else None, the states of the turn and the response
+        to a task finished on the previous turn.
+        """
         log.info("USER: %s", asr_norm)
         ctx.user_response = asr_norm
         # one turn represents of a pair of user response and agent response
         ctx.turn += 1
-        faq_res = ""
         if asr_norm == "RESET":
-            return self.reset()
+            return self.reset(ctx=ctx), None, None
 
         if ctx.finish_and_fail:
             ctx.last_response = self.policy_layer.response.forward_to_human()
             self.store_agent_response(ctx)
-            return ctx.last_response
+            return ctx.last_response, None, None
 
         cur_turn_states = StatesWithinCurrentTurn()
         if not asr_norm:
-            return self.policy_layer.empty_response(ctx, cur_turn_states)
+            return self.policy_layer.empty_response(ctx, cur_turn_states), None, None
         cur_turn_states.asr_out = asr_norm
 
         pause_res = self.pause_detection(ctx, cur_turn_states)
         if pause_res:
-            return pause_res
+            return pause_res, None, None
 
         self.policy_layer.state_manager.update_and_get_states(ctx)
 
         if ctx.cur_states.exceed_max_turn and not ctx.cur_states.cur_task:
             ctx.last_response = self.policy_layer.response.forward_to_human()
             self.store_agent_response(ctx)
-            return ctx.last_response
+            return ctx.last_response, None, None
         elif ctx.cur_states.exceed_max_turn and ctx.cur_states.prev_tasks:
             prev_res = self.policy_layer.response.task_finish_response(
                 ctx.cur_states.prev_tasks,
@@ -152,15 +223,29 @@ class Orchestrator:
         else:
             prev_res = None
 
-        self.extracted_info = self.info_layer.info_pipeline(asr_origin, asr_norm, ctx)
-        cur_turn_states.extracted_info = self.extracted_info
-        log.info(f"Extracted info: {self.extracted_info}")
+        return None, cur_turn_states, prev_res
+
+    def _finish_turn(
+        self,
+        ctx: DialogContext,
+        asr_norm: str,
+        extracted_info: dict,
+        cur_turn_states: StatesWithinCurrentTurn,
+        prev_res: str,
+    ) -> str:
+        """
+        The steps of the turn after the info layer, the entities, the FAQs,
+        the intents and the policy
+        """
+        faq_res = ""
+        cur_turn_states.extracted_info = extracted_info
+        log.info(f"Extracted info: {extracted_info}")
         # somehow, email entity type is marked as 'DUCKLING/email'
         # while we expect 'EMAIL'
         # we manually change it here for now, but later we probably want to
         # change it in the NER server
-        if self.extracted_info["ner"] and "probabilities" in self.extracted_info["ner"]:
-            for ner_candidate in self.extracted_info["ner"]["probabilities"]:
+        if extracted_info["ner"] and "probabilities" in extracted_info["ner"]:
+            for ner_candidate in extracted_info["ner"]["probabilities"]:
                 if ner_candidate["label"] == "DUCKLING/email":
                     ner_candidate["label"] = "EMAIL"
 
@@ -173,60 +258,53 @@ class Orchestrator:
             entity_name=ctx.cur_states.cur_entity_name,
         )
 
-        self.entity_candidates = self.entity_manager.extract_entities(
+        entity_candidates = self.entity_manager.extract_entities(
             utterance=ctx.user_response,
             methods=entity_extraction_methods,
-            ner_model_output=self.extracted_info["ner"],
+            ner_model_output=extracted_info["ner"],
             entity_types=expected_entity_classes,
         )
-        cur_turn_states.entity_candidates = self.entity_candidates
+        cur_turn_states.entity_candidates = entity_candidates
 
         # add entities into the entity history manager
-        for entity in self.entity_candidates:
+        for entity in entity_candidates:
             entity.turn = ctx.turn
             ctx.entity_history_manager.insert(entity, ctx.turn)
 
         cur_turn_states.got_info = cur_turn_states.got_entity_info = bool(
-            self.entity_candidates
+            entity_candidates
         )
         if not cur_turn_states.got_info:
             cur_turn_states.got_info = (
                 cur_turn_states.got_entity_info
-            ) = cur_turn_states.got_ner = (
-                "probabilities" in self.extracted_info["ner"]
-            )
+            ) = cur_turn_states.got_ner = ("probabilities" in extracted_info["ner"])
 
         cur_turn_states.got_FAQ = (
             True
-            if self.extracted_info["final_intent"]
-            and self.extracted_info["final_intent"]["intent"]
-            and self.extracted_info["final_intent"]["intent"] in self.faq_config
+            if extracted_info["final_intent"]
+            and extracted_info["final_intent"]["intent"]
+            and extracted_info["final_intent"]["intent"] in self.faq_config
             else False
         )
         # exact match FAQ has higher priority than intent equivalent FAQ
-        if self.faq_exact_match_questions:
-            exact_match_question, exact_match_score = process.extract(
-                asr_norm.lower(), self.faq_exact_match_questions, scorer=fuzz.ratio
-            )[0]
-            cur_turn_states.got_exact_FAQ = exact_match_score > 90
-            if cur_turn_states.got_exact_FAQ:
-                faq_res = choice(self.faq_exact_match_q2a_dict[exact_match_question])
-                if not ctx.cur_states.cur_task:
-                    ctx.tree_manager.finish = True
-                # if current utterance is a exact match FAQ,
-                # then the detected intent is probably wrong
-                if self.extracted_info["final_intent"]:
-                    self.extracted_info["final_intent"] = {
-                        "intent": None,
-                        "prob": 0.0,
-                        "uncertain": False,
-                    }
-                cur_turn_states.got_entity_info = False
+        faq_match = self.faq_index.match(asr_norm)
+        cur_turn_states.got_exact_FAQ = faq_match is not None
+        if cur_turn_states.got_exact_FAQ:
+            faq_res = choice(self.faq_index.answers[faq_match[0]])
+            if not ctx.cur_states.cur_task:
+                ctx.tree_manager.finish = True
+            # if current utterance is a exact match FAQ,
+            # then the detected intent is probably wrong
+            if extracted_info["final_intent"]:
+                extracted_info["final_intent"] = {
+                    "intent": None,
+                    "prob": 0.0,
+                    "uncertain": False,
+                }
+            cur_turn_states.got_entity_info = False
         if not cur_turn_states.got_exact_FAQ and cur_turn_states.got_FAQ:
             faq_res = choice(
-                self.faq_config[self.extracted_info["final_intent"]["intent"]][
-                    "answers"
-                ]
+                self.faq_config[extracted_info["final_intent"]["intent"]]["answers"]
             )
             cur_turn_states.got_entity_info = False
             if not ctx.cur_states.cur_task:
@@ -235,29 +313,27 @@ class Orchestrator:
         if "USER_UTT" in ctx.cur_states.cur_entity_types:
             # we assume the whole user utterance is what we need for entity extraction
             cur_turn_states.got_intent = False
-            if self.extracted_info["final_intent"]["intent"] == "positive":  # polarity
+            if extracted_info["final_intent"]["intent"] == "positive":  # polarity
                 ctx.cur_states.polarity = cur_turn_states.polarity = 1
-            elif (
-                self.extracted_info["final_intent"]["intent"] == "negative"
-            ):  # polarity
+            elif extracted_info["final_intent"]["intent"] == "negative":  # polarity
                 ctx.cur_states.polarity = cur_turn_states.polarity = -1
         else:
             cur_turn_states.got_intent = (
                 True
-                if self.extracted_info["final_intent"]
-                and self.extracted_info["final_intent"]["intent"]
-                and self.extracted_info["final_intent"]["intent"] in self.task_config
+                if extracted_info["final_intent"]
+                and extracted_info["final_intent"]["intent"]
+                and extracted_info["final_intent"]["intent"] in self.task_config
                 else False
             )
 
             if cur_turn_states.got_intent:  # got new intent
-                if self.extracted_info["final_intent"]["uncertain"]:
+                if extracted_info["final_intent"]["uncertain"]:
                     ctx.cur_states.confirm_intent = True
                     ctx.cur_states.unconfirmed_intent.append(
-                        self.extracted_info["final_intent"]["intent"]
+                        extracted_info["final_intent"]["intent"]
                     )
                     ctx.last_response = self.policy_layer.ask_confirm_task(
-                        self.extracted_info["final_intent"]["intent"],
+                        extracted_info["final_intent"]["intent"],
                         ctx,
                         cur_turn_states,
                     )
@@ -265,7 +341,7 @@ class Orchestrator:
                     self.store_agent_response(ctx)
                     ctx.cur_states.prev_turn_got_intent = cur_turn_states.got_intent
                     return ctx.last_response
-                ctx.cur_states.new_task = self.extracted_info["final_intent"]["intent"]
+                ctx.cur_states.new_task = extracted_info["final_intent"]["intent"]
                 if ctx.cur_states.new_task == "positive":  # polarity
                     cur_turn_states.polarity = 1
                     cur_turn_states.got_intent = False
@@ -353,38 +429,14 @@ class Orchestrator:
         self, ctx: DialogContext, cur_turn_states: StatesWithinCurrentTurn, model=False
     ) -> str:
         if not model:
-
-            def fuzzy_check(keywords: list, threshold=3):
-                utter = cur_turn_states.asr_out.lower()
-                for k in keywords:
-                    res = find_near_matches(k, utter, max_l_dist=threshold)
-                    if len(res) > 0:
-                        return True
-                return False
-
-            hold_keywords = [
-                "hold a second",
-                "hold a sec",
-                "hold a 2nd",
-                "hold a moment",
-                "wait a second",
-                "wait a sec",
-                "wait a 2nd",
-                "wait a moment",
-            ]
-
-            resume_keywords = [
-                "okay I'm back",
-                "ok i'm back",
-                "i'm back ok" "i'm back",
-                "i am back",
-            ]
+            # the hold and resume phrases of the bot config found in one pass
+            found = self.pause_matcher.match(cur_turn_states.asr_out)
             if not ctx.do_pause:
-                if fuzzy_check(hold_keywords):
+                if "hold" in found:
                     ctx.do_pause = True
                     return "sure"
             if ctx.do_pause:
-                if fuzzy_check(resume_keywords):
+                if "resume" in found:
                     ctx.do_pause = False
                     return self.policy_layer.welcome_back(ctx)
                 else:
@@ -395,6 +447,7 @@ if __name__ == "__main__":
     import sys
     import uuid
     from Converse.dialog_context.dialog_context_manager import DialogContextManager
+    from Converse.utils import nltk_resources
 
     dmgr = DialogContextManager.new_instance("memory")
     orc = Orchestrator(
@@ -405,6 +458,7 @@ if __name__ == "__main__":
         entity_extraction_path="Converse/bot_configs/entity_extraction_config.yaml",
         response_path="Converse/bot_configs/response_template.yaml",
     )
+    nltk_resources.warmup()
     cid = sys.argv[1] if len(sys.argv) > 1 else str(uuid.uuid4())
     print(f"you conversation id is {cid}")
     ctx = dmgr.reset_ctx(
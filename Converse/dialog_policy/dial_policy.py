@@ -15,11 +15,8 @@ from Converse.dialog_state_manager.dial_state_manager import (
 )
 from Converse.dialog_context.dialog_context import DialogContext
 from Converse.entity.entity import ExtractionMethod, Entity, EmailEntity
-from Converse.entity.entity_manager import EntityManager
-from Converse.response.response import Response
-from Converse.config.task_config import TaskConfig, BotConfig
+from Converse.config.bot_bundle import BotBundle
 from Converse.utils.utils import get_dict_key
-from Converse.utils.yaml_parser import load_dial_logic, load_data
 
 log = logging.getLogger(__name__)
 
@@ -44,7 +41,12 @@ class DialoguePolicy:
         entity_path: str = None,
         entity_extraction_path: str = None,
         entity_function_path: str = None,
+        bot: BotBundle = None,
     ):
+        """
+        The policy layer is shared by the dialog sessions. The config objects
+        come from the bot bundle, built from the paths when no bundle is given.
+        """
         self.task_path = task_path or self.default_task_path
         self.policy_path = policy_path or self.default_policy_path
         self.entity_path = entity_path or self.default_entity_path
@@ -55,31 +57,27 @@ class DialoguePolicy:
         self.entity_function_path = (
             entity_function_path or self.default_entity_function_path
         )
-        self.entity_manager = EntityManager(
-            self.entity_path, self.entity_extraction_path
-        )
-        self.task_config = TaskConfig(self.task_path)
-        self.bot_config = BotConfig(self.task_path)
+        if bot is None:
+            bot = BotBundle(
+                task_path=self.task_path,
+                policy_path=self.policy_path,
+                entity_path=self.entity_path,
+                entity_extraction_path=self.entity_extraction_path,
+                response_path=self.response_path,
+            )
+        self.bot = bot
+        self.entity_manager = bot.entity_manager
+        self.task_config = bot.task_config
+        self.bot_config = bot.bot_config
         self.state_manager = StateManager(
             entity_manager=self.entity_manager,
             task_config=self.task_config,
             entity_function_path=self.entity_function_path,
         )
-        self.reset()
-
-    def reset(self):
-        self.policy = load_dial_logic(self.policy_path)
-        self.policy_flags = load_data(self.policy_path, "Flag")
-        self.policy_states = load_data(self.policy_path, "State")
-        self.bot_config = BotConfig(self.task_path)
-        self.response = Response(
-            template=self.response_path,
-            task_config=self.task_config,
-            bot_config=self.bot_config,
-            entity_manager=self.entity_manager,
-        )
-
-        self.state_manager.reset()
+        self.policy = bot.policy
+        self.policy_flags = bot.policy_flags
+        self.policy_states = bot.policy_states
+        self.response = bot.response
 
     def policy_tree(
         self,
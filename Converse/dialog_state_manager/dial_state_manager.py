@@ -4,7 +4,8 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
-from collections import defaultdict
+import asyncio
+from contextvars import ContextVar
 from copy import deepcopy
 import logging
 import importlib.util
@@ -16,11 +17,57 @@ from Converse.entity.entity import (
 from Converse.entity_backend import entity_functions as ef
 from Converse.entity.entity_manager import EntityManager
 from Converse.config.task_config import TaskConfig, TaskEntity
-from Converse.utils.utils import entity_api_call, resp
+from Converse.utils.utils import entity_api_call, entity_api_call_async, resp
 
 log = logging.getLogger(__name__)
 
 
+class PendingFunctionCall(Exception):
+    """
+    Raised for an entity or task function served over HTTP when the turn runs
+    on the event loop, the call is awaited and the turn is run again.
+    """
+
+    def __init__(self, url: str, entities: dict, states: dict):
+        super().__init__(url)
+        self.url = url
+        self.entities = entities
+        self.states = states
+
+
+class FunctionCalls:
+    """
+    The results of the entity and task functions called by a turn running
+    on the event loop, in call order. When the turn is run again from its
+    start, the functions already called get their results from here.
+    """
+
+    def __init__(self):
+        self.calls = []  # (function name or url, result)
+        self.position = 0
+
+    def replay(self, name: str):
+        """ The result of the next call if it was already made, else None """
+        if self.position < len(self.calls) and self.calls[self.position][0] == name:
+            self.position += 1
+            return self.calls[self.position - 1][1]
+        # the turn took another path, the calls recorded after it are stale
+        del self.calls[self.position :]
+        return None
+
+    def record(self, name: str, result: dict):
+        self.calls.append((name, result))
+        self.position += 1
+
+    def rewind(self):
+        self.position = 0
+
+
+# the function calls of the turn running in the current asyncio task,
+# None for the turns run by Orchestrator.process
+function_calls: ContextVar = ContextVar("function_calls", default=None)
+
+
 class DialogState(object):
     def __init__(self):
         """
@@ -133,6 +180,11 @@ class StatesWithinCurrentTurn:
 
 
 class StateManager:
+    """
+    Updates the dialog states of a session. One state manager serves all the
+    sessions of a bot, the states it updates are all kept in the DialogContext.
+    """
+
     def __init__(
         self,
         entity_manager: EntityManager,
@@ -148,11 +200,15 @@ class StateManager:
             )
             self.addtional_ef = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(self.addtional_ef)
-        self.reset()
-
-    def reset(self):
-        self.task_turns = defaultdict(int)
-        self.exceed_max_turn_flag = False
+        # the entity and task functions served over HTTP
+        func_names = set()
+        for task in self.task_config:
+            func_names.add(self.task_config[task].task_finish_function)
+            for entity in self.task_config[task].entities:
+                func_names.add(self.task_config[task].entities[entity].function)
+        self.url_functions = {
+            url for _, url in map(self._get_entity_or_task_function, func_names) if url
+        }
 
     def update_and_get_states(self, ctx):
         """
@@ -194,7 +250,7 @@ class StateManager:
             states.cur_entity_name
         )
         states.task_stack = tree_manager.task_stack
-        states.exceed_max_turn = self.exceed_max_turn_flag
+        states.exceed_max_turn = ctx.exceed_max_turn_flag
         states.prev_tasks = tree_manager.prev_tasks
         states.prev_tasks_success = tree_manager.prev_tasks_success
         states.prev_task_finished = tree_manager.prev_task_finished
@@ -202,7 +258,7 @@ class StateManager:
         if states.prev_task_finished or (states.exceed_max_turn and states.prev_tasks):
             self._task_finish_function(ctx)
 
-        self.exceed_max_turn_flag = False
+        ctx.exceed_max_turn_flag = False
         if states.spell_entity != states.cur_entity_name:
             states.spell_entity = None
         states.agent_action_type = (
@@ -227,6 +283,16 @@ class StateManager:
 
     @staticmethod
     def _execute_entity_or_task_function(ctx, func, url):
+        calls = function_calls.get()
+        name = url or getattr(func, "__name__", None)
+        if calls is not None:
+            res = calls.replay(name)
+            if res is not None:
+                return res
+            if url:
+                raise PendingFunctionCall(
+                    url, ctx.collected_entities, ctx.cur_states.to_dictionary()
+                )
         try:
             if url:
                 res = entity_api_call(
@@ -245,6 +311,21 @@ class StateManager:
         except Exception as e:  # to catch other issues
             log.warning(f"function call exception: {e}")
             res = resp(False, "We couldn't handle your request")
+        if calls is not None:
+            calls.record(name, res)
+        return res
+
+    @staticmethod
+    async def execute_pending_call(call: PendingFunctionCall) -> dict:
+        """ Await an entity or task function served over HTTP """
+        try:
+            res = await entity_api_call_async(call.url, call.entities, **call.states)
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            log.warning(f"function call timeout: {e}")
+            res = resp(False, "Service time out")
+        except Exception as e:  # to catch other issues
+            log.warning(f"function call exception: {e}")
+            res = resp(False, "We couldn't handle your request")
         return res
 
     def _task_finish_function(self, ctx):
@@ -281,21 +362,21 @@ class StateManager:
         tree_manager = ctx.tree_manager
         if tree_manager.prev_tasks:
             for prev_task in tree_manager.prev_tasks:
-                self.task_turns[prev_task] = 0
+                ctx.task_turns[prev_task] = 0
         tree_manager.reset_prev_task()
         if states.cur_task:
-            self.task_turns[states.cur_task] += 1
+            ctx.task_turns[states.cur_task] = ctx.task_turns.get(states.cur_task, 0) + 1
         if states.new_task:
             self.new_task(states.new_task, tree_manager)
         elif ctx.update_entity["entity"]:
             self.leaf_node_handler(ctx)
         if (
             states.cur_task
-            and self.task_turns[states.cur_task]
+            and ctx.task_turns[states.cur_task]
             > self.task_config[states.cur_task].max_turns
         ):
             self.force_cur_task_finish(tree_manager)
-            self.exceed_max_turn_flag = True
+            ctx.exceed_max_turn_flag = True
 
     def new_task(self, task_name, tree_manager):
         tree_manager.set_task(task_name)
@@ -0,0 +1,196 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from dnnc_tinybert_inference_only import DnncIntentPredictor, TaskSet
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchStats:
+    """
+    Sliding window of batch sizes and queue waits, used to tune the batching
+    window against the tail latency.
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes = deque(maxlen=window)
+        self.batch_pairs = deque(maxlen=window)
+        self.queue_waits_ms = deque(maxlen=window)
+
+    def record(self, batch_size, batch_pairs, queue_waits_ms):
+        with self.lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.batch_sizes.append(batch_size)
+            self.batch_pairs.append(batch_pairs)
+            self.queue_waits_ms.extend(queue_waits_ms)
+
+    @staticmethod
+    def percentile(values, p):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return float(values[min(len(values) - 1, int(p / 100.0 * len(values)))])
+
+    def summary(self) -> dict:
+        with self.lock:
+            sizes = list(self.batch_sizes)
+            pairs = list(self.batch_pairs)
+            waits = list(self.queue_waits_ms)
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "batch_size_mean": sum(sizes) / len(sizes) if sizes else 0.0,
+                "batch_size_max": max(sizes, default=0),
+                "batch_pairs_mean": sum(pairs) / len(pairs) if pairs else 0.0,
+                "queue_wait_ms_p50": self.percentile(waits, 50),
+                "queue_wait_ms_p99": self.percentile(waits, 99),
+            }
+
+
+class _PendingRequest:
+    def __init__(self, premise_ids, task_set: TaskSet, threshold: float):
+        self.premise_ids = premise_ids
+        self.task_set = task_set
+        self.threshold = threshold
+        self.enqueued = time.perf_counter()
+        self.future = Future()
+
+
+class BatchingIntentPredictor:
+    """
+    Drop-in replacement of DnncIntentPredictor for the servicer. Concurrent
+    requests arriving within max_wait_ms are coalesced, up to max_pairs NLI
+    pairs, into a single forward pass whose probabilities are split back
+    per request. A request of more than max_pairs pairs runs by itself.
+    """
+
+    def __init__(
+        self,
+        predictor: DnncIntentPredictor,
+        max_wait_ms=5.0,
+        max_pairs=2000,
+        log_every=100,
+    ):
+        self.predictor = predictor
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pairs = max_pairs
+        self.log_every = log_every
+        self.stats = BatchStats()
+        self.pending = queue.Queue()
+        # the request that did not fit in the last batch, it opens the next one
+        self.carried = None
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def register(self, tasks, task_key="task", example_key="examples") -> str:
+        return self.predictor.register(tasks, task_key, example_key)
+
+    def task_set(self, tasks, task_key="task", example_key="examples") -> TaskSet:
+        return self.predictor.task_set(tasks, task_key, example_key)
+
+    def get_task_set(self, task_set_id: str):
+        return self.predictor.get_task_set(task_set_id)
+
+    def predict(
+        self,
+        input: str,
+        tasks=None,
+        task_key="task",
+        example_key="examples",
+        threshold=0.65,
+    ):
+        task_set = self.task_set(tasks, task_key, example_key)
+        return self.predict_task_set(input, task_set, threshold=threshold)
+
+    def predict_task_set(
+        self, input: str, task_set: TaskSet, threshold=0.65, top_k=None
+    ):
+        assert len(task_set) > 0
+        task_set = self.predictor.candidates(input, task_set, top_k)
+        # tokenize on the calling thread, only the forward pass is serialized
+        request = _PendingRequest(
+            self.predictor.model.encode(input.lower()), task_set, threshold
+        )
+        self.pending.put(request)
+        return request.future.result()
+
+    def predict_task_set_batch(self, inputs, task_set: TaskSet, threshold=0.65):
+        assert len(task_set) > 0
+        requests = []
+        for input in inputs:
+            request = _PendingRequest(
+                self.predictor.model.encode(input.lower()),
+                self.predictor.candidates(input, task_set),
+                threshold,
+            )
+            self.pending.put(request)
+            requests.append(request)
+        return [request.future.result() for request in requests]
+
+    def _collect(self):
+        """ Block for one request, then gather more until the window closes """
+        if self.carried is not None:
+            batch, self.carried = [self.carried], None
+        else:
+            batch = [self.pending.get()]
+        pairs = len(batch[0].task_set)
+        deadline = time.perf_counter() + self.max_wait
+        while pairs < self.max_pairs:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self.pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if pairs + len(request.task_set) > self.max_pairs:
+                self.carried = request
+                break
+            batch.append(request)
+            pairs += len(request.task_set)
+        return batch, pairs
+
+    def _run(self):
+        while True:
+            batch, pairs = self._collect()
+            started = time.perf_counter()
+            # recorded before the results are handed back, so that the stats
+            # cover every request answered
+            self.stats.record(
+                len(batch),
+                pairs,
+                [(started - request.enqueued) * 1000.0 for request in batch],
+            )
+            try:
+                self._predict_batch(batch)
+            except Exception as e:
+                logger.exception("Batched intent prediction failed")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            if self.log_every and self.stats.batches % self.log_every == 0:
+                logger.info("Intent batching stats: %s", self.stats.summary())
+
+    def _predict_batch(self, batch):
+        results = self.predictor.model.predict_task_sets(
+            [request.premise_ids for request in batch],
+            [request.task_set for request in batch],
+        )
+        for request, probs in zip(batch, results):
+            request.future.set_result(
+                self.predictor.best_match(request.task_set, probs, request.threshold)
+            )
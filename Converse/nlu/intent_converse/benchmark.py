@@ -0,0 +1,121 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Micro-benchmarks of the intent model, e.g.
+python benchmark.py features --model_path INTENT_MODEL_PATH
+python benchmark.py backends --model_path INTENT_MODEL_PATH
+"""
+
+import argparse
+import json
+import random
+import time
+
+from dnnc_tinybert_inference_only import DNNC
+from onnx_backend import BACKENDS
+from utils import InputExample
+
+WORDS = (
+    "i want to check my order status reset the password cancel subscription "
+    "where is nearest store talk with an agent please update shipping address "
+    "how much money do have in account balance book flight tomorrow morning"
+).split()
+
+
+def synthetic_pairs(n_pairs, seed=0):
+    """ Short premises against samples with a long tail of lengths """
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n_pairs):
+        premise = " ".join(rng.choices(WORDS, k=rng.randint(3, 15)))
+        length = rng.randint(3, 12) if rng.random() < 0.95 else rng.randint(40, 100)
+        pairs.append((premise, " ".join(rng.choices(WORDS, k=length))))
+    return pairs
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_features(model: DNNC, n_pairs, repeats):
+    """
+    Tokens per second of DNNC.predict against the previous path, which padded
+    every pair to max_seq_length and ran the chunks in input order.
+    """
+    pairs = synthetic_pairs(n_pairs)
+    model.model.eval()
+
+    def padded():
+        examples = [InputExample(premise, hypothesis) for premise, hypothesis in pairs]
+        features = model.convert_examples_to_features(examples, train=False)
+        tensors = model.features_to_tensors(features)
+        return tensors[1].sum().item(), model.forward(*tensors, sort_by_length=False)
+
+    def bucketed():
+        return model.predict(pairs)
+
+    padded_time, (tokens, _) = timed(padded, repeats)
+    bucketed_time, _ = timed(bucketed, repeats)
+    return {
+        "pairs": n_pairs,
+        "tokens": tokens,
+        "padded_tokens_per_sec": tokens / padded_time,
+        "bucketed_tokens_per_sec": tokens / bucketed_time,
+        "speedup": padded_time / bucketed_time,
+    }
+
+
+def bench_backends(model_path, backends, n_pairs, repeats, export_dir=None):
+    """
+    Pairs per second of every backend on the same pairs, with the largest
+    probability drift and the label agreement against the torch backend.
+    """
+    pairs = synthetic_pairs(n_pairs)
+    results = {}
+    reference = None
+    for backend in backends:
+        model = DNNC(path=model_path, backend=backend, export_dir=export_dir)
+        model.predict(pairs[:10])  # warm up
+        elapsed, (labels, probs) = timed(lambda: model.predict(pairs), repeats)
+        results[backend] = {"pairs_per_sec": n_pairs / elapsed}
+        if reference is None:
+            reference = labels, probs
+        else:
+            results[backend]["max_prob_drift"] = (
+                (probs - reference[1]).abs().max().item()
+            )
+            results[backend]["label_agreement"] = sum(
+                a == b for a, b in zip(labels, reference[0])
+            ) / len(labels)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Intent model benchmarks")
+    parser.add_argument("benchmark", choices=["features", "backends"])
+    parser.add_argument("--model_path", type=str, required=True)
+    parser.add_argument("--n_pairs", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--backends", type=str, nargs="+", default=BACKENDS, choices=BACKENDS
+    )
+    parser.add_argument("--export_dir", type=str, default=None)
+    args = parser.parse_args()
+
+    if args.benchmark == "features":
+        model = DNNC(path=args.model_path)
+        result = bench_features(model, args.n_pairs, args.repeats)
+    elif args.benchmark == "backends":
+        result = bench_backends(
+            args.model_path, args.backends, args.n_pairs, args.repeats, args.export_dir
+        )
+    print(json.dumps(result, indent=4))
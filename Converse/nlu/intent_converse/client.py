@@ -4,11 +4,70 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
 import grpc
 
 import Converse.nlu.intent_converse.proto.intent_pb2 as intent_pb2
 import Converse.nlu.intent_converse.proto.intent_pb2_grpc as intent_pb2_grpc
 from Converse.config.task_config import TaskConfig, FAQConfig
+from Converse.utils.aio_channels import LoopChannels
+
+
+def time_left(deadline):
+    """ Seconds left before a time.monotonic() deadline, None without one """
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of intent results with an optional time to live,
+    counting hits and misses.
+    """
+
+    def __init__(self, max_size: int, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() > entry[0]:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, value: dict):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires, dict(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def info(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+            }
 
 
 class IntentDetection:
@@ -17,20 +76,37 @@ class IntentDetection:
         task_config: TaskConfig,
         service_channel: str,
         faq_config: FAQConfig = None,
+        cache_size: int = 0,
+        cache_ttl: float = None,
     ):
+        """
+        :param cache_size: number of results of repeated utterances kept on the
+            client, 0 disables the cache
+        :param cache_ttl: seconds a cached result stays valid, None keeps it
+            until it is evicted
+        """
         print("Initializing IntentDetection ... ", end="", flush=True)
-        self.request_wo_doc = self.intent_samples(task_config, faq_config)
+        self.task_set = self.intent_samples(task_config, faq_config)
+        # cache keys include the samples, changing them invalidates the cache
+        self.task_set_hash = hashlib.sha1(
+            self.task_set.SerializeToString(deterministic=True)
+        ).hexdigest()
+        # id of the task set cached on the intent server, registered lazily
+        self.task_set_id = None
+        self.cache = ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.stub = self.connect(service_channel)
+        print("Done")
 
+    def connect(self, service_channel: str):
         # Open a gRPC channel
         channel = grpc.insecure_channel(service_channel)
 
         # Create a stub (client)
-        self.stub = intent_pb2_grpc.IntentDetectionServiceStub(channel)
-        print("Done")
+        return intent_pb2_grpc.IntentDetectionServiceStub(channel)
 
     def intent_samples(self, task_config: TaskConfig, faq_config: FAQConfig = None):
-        """ Transfer samples into IntentDetectionRequest """
-        request = intent_pb2.IntentDetectionRequest()
+        """ Transfer samples into RegisterTaskSetRequest """
+        request = intent_pb2.RegisterTaskSetRequest()
         c = []
         for task in task_config:
             t = intent_pb2.IntentClass()
@@ -50,20 +126,229 @@ class IntentDetection:
 
         return request
 
-    def __call__(self, text: str) -> dict:
-        """ Return intent detection results """
-        req = self.request_wo_doc
-        # print(req)
-        req.document = text
+    def register(self, timeout: float = None) -> bool:
+        """
+        Register the task samples with the intent server, which keeps them
+        tokenized under the returned id. Per-turn requests then only carry
+        the document and the id.
+        """
+        response = self.stub.RegisterTaskSet(self.task_set, timeout=timeout)
+        self.task_set_id = response.task_set_id if response.success else None
+        return response.success
+
+    def detect(self, text: str, timeout: float = None):
+        request = intent_pb2.IntentDetectionRequest(
+            document=text, task_set_id=self.task_set_id
+        )
+        return self.stub.IntentDetection(request, timeout=timeout)
+
+    def detect_batch(self, texts: list, timeout: float = None):
+        request = intent_pb2.IntentDetectionBatchRequest(
+            documents=texts, task_set_id=self.task_set_id
+        )
+        return self.stub.IntentDetectionBatch(request, timeout=timeout)
+
+    @staticmethod
+    def to_dict(results) -> dict:
+        """ Convert an IntentRes message into the result dict """
+        return {
+            "success": results.success,
+            "intent": results.label,
+            "prob": results.probability,
+            "sent": results.sent,
+        }
+
+    def cache_key(self, text: str):
+        """ The server lowercases the text and ignores the whitespace """
+        return " ".join(text.lower().split()), self.task_set_hash
+
+    @staticmethod
+    def failure() -> dict:
+        """ Result of a text the server did not answer """
+        return {"success": False, "intent": "", "prob": 0.0, "sent": ""}
+
+    @staticmethod
+    def cacheable(result: dict) -> bool:
+        # the server reports errors with the label "None"
+        return result["intent"] != "None"
+
+    def cache_info(self) -> dict:
+        """ Hit and miss counters of the result cache """
+        return self.cache.info() if self.cache else {}
+
+    def __call__(self, text: str, timeout: float = None) -> dict:
+        """
+        Return intent detection results
+        :param timeout: seconds the gRPC requests of the call may take
+        """
+        if self.cache:
+            key = self.cache_key(text)
+            result = self.cache.get(key)
+            if result is None:
+                result, answered = self.call(text, timeout)
+                if answered and self.cacheable(result):
+                    self.cache.put(key, result)
+            return result
+        return self.call(text, timeout)[0]
+
+    def call(self, text: str, timeout: float = None) -> Tuple[dict, bool]:
+        """ The result of the text and whether the server answered """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self.task_set_id and not self.register(time_left(deadline)):
+            return self.failure(), False
 
         # Make the call
-        response = self.stub.IntentDetection(req)
-        success = response.results.success
-        intent = response.results.label
-        prob = response.results.probability
-        sent = response.results.sent
+        response = self.detect(text, time_left(deadline))
+        if response.unknown_task_set:
+            # the server restarted or evicted our task set
+            if not self.register(time_left(deadline)):
+                return self.failure(), False
+            response = self.detect(text, time_left(deadline))
+
+        return self.to_dict(response.results), True
+
+    def batch(self, texts: list, timeout: float = None) -> list:
+        """
+        Return intent detection results of several texts in one call
+        :param timeout: seconds the gRPC requests of the call may take
+        """
+        if not self.cache:
+            return self.call_batch(texts, timeout)[0]
+
+        keys = [self.cache_key(text) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        missed = [i for i, result in enumerate(results) if result is None]
+        missed_results, answered = self.call_batch([texts[i] for i in missed], timeout)
+        for i, result in zip(missed, missed_results):
+            results[i] = result
+            if answered and self.cacheable(result):
+                self.cache.put(keys[i], result)
+        return results
+
+    def call_batch(self, texts: list, timeout: float = None) -> Tuple[list, bool]:
+        """ The results of the texts and whether the server answered """
+        if not texts:
+            return [], True
+        failure = [self.failure() for _ in texts]
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self.task_set_id and not self.register(time_left(deadline)):
+            return failure, False
+
+        response = self.detect_batch(texts, time_left(deadline))
+        if response.unknown_task_set:
+            if not self.register(time_left(deadline)):
+                return failure, False
+            response = self.detect_batch(texts, time_left(deadline))
+
+        return [self.to_dict(results) for results in response.results], True
+
+
+class AsyncIntentDetection(IntentDetection):
+    """
+    grpc.aio variant of IntentDetection, calls are coroutines so that a turn
+    can query several models concurrently. Every call builds its own request.
+    """
+
+    def __init__(
+        self,
+        task_config: TaskConfig,
+        service_channel: str,
+        faq_config: FAQConfig = None,
+        cache_size: int = 0,
+        cache_ttl: float = None,
+    ):
+        super().__init__(
+            task_config,
+            service_channel,
+            faq_config=faq_config,
+            cache_size=cache_size,
+            cache_ttl=cache_ttl,
+        )
+        self.channels = LoopChannels(
+            service_channel, intent_pb2_grpc.IntentDetectionServiceStub
+        )
+
+    def connect(self, service_channel: str):
+        # the grpc.aio channels are opened by loop_stub, no blocking channel
+        return None
+
+    def loop_stub(self):
+        return self.channels.stub()
+
+    async def close(self):
+        """ Close the channel of the running event loop """
+        await self.channels.close()
+
+    async def register(self) -> bool:
+        response = await self.loop_stub().RegisterTaskSet(self.task_set)
+        self.task_set_id = response.task_set_id if response.success else None
+        return response.success
+
+    async def detect(self, text: str):
+        request = intent_pb2.IntentDetectionRequest(
+            document=text, task_set_id=self.task_set_id
+        )
+        return await self.loop_stub().IntentDetection(request)
+
+    async def detect_batch(self, texts: list):
+        request = intent_pb2.IntentDetectionBatchRequest(
+            documents=texts, task_set_id=self.task_set_id
+        )
+        return await self.loop_stub().IntentDetectionBatch(request)
+
+    async def __call__(self, text: str) -> dict:
+        """ Return intent detection results """
+        if self.cache:
+            key = self.cache_key(text)
+            result = self.cache.get(key)
+            if result is None:
+                result, answered = await self.call(text)
+                if answered and self.cacheable(result):
+                    self.cache.put(key, result)
+            return result
+        return (await self.call(text))[0]
+
+    async def call(self, text: str) -> Tuple[dict, bool]:
+        if not self.task_set_id and not await self.register():
+            return self.failure(), False
+
+        response = await self.detect(text)
+        if response.unknown_task_set:
+            if not await self.register():
+                return self.failure(), False
+            response = await self.detect(text)
+
+        return self.to_dict(response.results), True
+
+    async def batch(self, texts: list) -> list:
+        """ Return intent detection results of several texts in one call """
+        if not self.cache:
+            return (await self.call_batch(texts))[0]
+
+        keys = [self.cache_key(text) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        missed = [i for i, result in enumerate(results) if result is None]
+        missed_results, answered = await self.call_batch([texts[i] for i in missed])
+        for i, result in zip(missed, missed_results):
+            results[i] = result
+            if answered and self.cacheable(result):
+                self.cache.put(keys[i], result)
+        return results
+
+    async def call_batch(self, texts: list) -> Tuple[list, bool]:
+        if not texts:
+            return [], True
+        failure = [self.failure() for _ in texts]
+        if not self.task_set_id and not await self.register():
+            return failure, False
+
+        response = await self.detect_batch(texts)
+        if response.unknown_task_set:
+            if not await self.register():
+                return failure, False
+            response = await self.detect_batch(texts)
 
-        return {"success": success, "intent": intent, "prob": prob, "sent": sent}
+        return [self.to_dict(results) for results in response.results], True
 
 
 if __name__ == "__main__":
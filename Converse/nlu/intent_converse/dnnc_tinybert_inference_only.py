@@ -4,14 +4,25 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
-
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
 import torch
+import torch.nn.functional as F
+from sklearn.feature_extraction.text import TfidfVectorizer
 from TinyBERT.transformer.tokenization import BertTokenizer
 from TinyBERT.transformer.modeling import TinyBertForSequenceClassification
 
 from utils import truncate_seq_pair
-from utils import InputExample, InputFeatures
+from utils import InputFeatures
 from utils import get_logger
+from utils import calc_in_acc, calc_recall_at_k
+from onnx_backend import BACKENDS, OnnxModel
 
 ENTAILMENT = "entailment"
 NON_ENTAILMENT = "non_entailment"
@@ -20,8 +31,19 @@ logger = get_logger(__name__)
 
 
 class DNNC:
-    def __init__(self, path: str):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, path: str, backend="torch", export_dir=None):
+        """
+        :param backend: "torch", or "onnx" / "onnx-int8" to run the model with
+            ONNX Runtime on CPU
+        :param export_dir: where the ONNX files are exported, the model path by
+            default
+        """
+        assert backend in BACKENDS, "unknown backend {}".format(backend)
+        self.backend = backend
+        if backend == "torch":
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        else:
+            self.device = torch.device("cpu")
         self.max_seq_length = 128
 
         self.label_list = [ENTAILMENT, NON_ENTAILMENT]
@@ -32,11 +54,50 @@ class DNNC:
         self.tokenizer = BertTokenizer.from_pretrained(path, do_lower_case=True)
         self.tokenizer.cls_token = "[CLS]"
         self.tokenizer.sep_token = "[SEP]"
+        self.cls_id, self.sep_id = self.tokenizer.convert_tokens_to_ids(
+            [self.tokenizer.cls_token, self.tokenizer.sep_token]
+        )
 
         self.model = TinyBertForSequenceClassification.from_pretrained(
             path, num_labels=self.num_labels
         )
         self.model.to(self.device)
+        self.model.eval()
+        if backend == "torch":
+            self.runner = self.model
+        else:
+            self.runner = OnnxModel(self.model, backend, export_dir or path)
+
+    def encode(self, text):
+        """ Tokenize a text into WordPiece ids """
+        return self.tokenizer.convert_tokens_to_ids(self.tokenizer.tokenize(text))
+
+    def convert_ids_to_feature(self, ids_a, ids_b, label_id=-1):
+        ids_a = list(ids_a)
+        ids_b = list(ids_b)
+        truncate_seq_pair(ids_a, ids_b, self.max_seq_length - 3)
+
+        input_ids = [self.cls_id] + ids_a + [self.sep_id]
+        segment_ids = [0] * len(input_ids)
+        input_ids += ids_b + [self.sep_id]
+        segment_ids += [1] * (len(ids_b) + 1)
+        input_mask = [1] * len(input_ids)
+
+        padding = [0] * (self.max_seq_length - len(input_ids))
+        input_ids += padding
+        input_mask += padding
+        segment_ids += padding
+
+        assert len(input_ids) == self.max_seq_length
+        assert len(input_mask) == self.max_seq_length
+        assert len(segment_ids) == self.max_seq_length
+
+        return InputFeatures(
+            input_ids=input_ids,
+            input_mask=input_mask,
+            segment_ids=segment_ids,
+            label_id=label_id,
+        )
 
     def convert_examples_to_features(self, examples, train):
         label_map = {label: i for i, label in enumerate(self.label_list)}
@@ -48,30 +109,6 @@ class DNNC:
 
         features = []
         for (ex_index, example) in enumerate(examples):
-            tokens_a = self.tokenizer.tokenize(example.text_a)
-            tokens_b = self.tokenizer.tokenize(example.text_b)
-
-            truncate_seq_pair(tokens_a, tokens_b, self.max_seq_length - 3)
-
-            tokens = [self.tokenizer.cls_token] + tokens_a + [self.tokenizer.sep_token]
-            segment_ids = [0] * len(tokens)
-
-            tokens_b = tokens_b + [self.tokenizer.sep_token]
-            segment_ids += [1] * len(tokens_b)
-            tokens += tokens_b
-
-            input_ids = self.tokenizer.convert_tokens_to_ids(tokens)
-            input_mask = [1] * len(input_ids)
-
-            padding = [0] * (self.max_seq_length - len(input_ids))
-            input_ids += padding
-            input_mask += padding
-            segment_ids += padding
-
-            assert len(input_ids) == self.max_seq_length
-            assert len(input_mask) == self.max_seq_length
-            assert len(segment_ids) == self.max_seq_length
-
             if example.label is None:
                 label_id = -1
             else:
@@ -81,10 +118,9 @@ class DNNC:
                 label_distribution[label_id] += 1.0
 
             features.append(
-                InputFeatures(
-                    input_ids=input_ids,
-                    input_mask=input_mask,
-                    segment_ids=segment_ids,
+                self.convert_ids_to_feature(
+                    self.encode(example.text_a),
+                    self.encode(example.text_b),
                     label_id=label_id,
                 )
             )
@@ -95,41 +131,164 @@ class DNNC:
         else:
             return features
 
+    def features_to_tensors(self, features):
+        """ Stack features into tensors cut to the longest pair """
+        input_ids = torch.tensor([f.input_ids for f in features], dtype=torch.long)
+        input_mask = torch.tensor([f.input_mask for f in features], dtype=torch.long)
+        segment_ids = torch.tensor([f.segment_ids for f in features], dtype=torch.long)
+
+        max_len = input_mask.sum(dim=1).max().item()
+        input_ids = input_ids[:, :max_len]
+        input_mask = input_mask[:, :max_len]
+        segment_ids = segment_ids[:, :max_len]
+        return input_ids, input_mask, segment_ids
+
+    def pair_tensors(self, pairs):
+        """
+        Build the input tensors of (ids_a, ids_b) pairs in preallocated
+        buffers, padded only to the longest pair. Truncation matches
+        truncate_seq_pair.
+        """
+        max_pair_len = self.max_seq_length - 3
+        len_a = np.array([len(ids_a) for ids_a, _ in pairs], dtype=np.int64)
+        len_b = np.array([len(ids_b) for _, ids_b in pairs], dtype=np.int64)
+        # truncate_seq_pair pops from the longer sequence, from b on ties
+        over = len_a + len_b > max_pair_len
+        keep_a = np.where(
+            over,
+            np.minimum(
+                len_a, np.maximum((max_pair_len + 1) // 2, max_pair_len - len_b)
+            ),
+            len_a,
+        )
+        keep_b = np.where(over, np.minimum(len_b, max_pair_len - keep_a), len_b)
+
+        seq_lens = keep_a + keep_b + 3
+        max_len = int(seq_lens.max())
+        example_num = len(pairs)
+        input_ids = np.zeros((example_num, max_len), dtype=np.int64)
+        input_ids[:, 0] = self.cls_id
+        rows = np.arange(example_num)
+        input_ids[rows, keep_a + 1] = self.sep_id
+        input_ids[rows, seq_lens - 1] = self.sep_id
+        for i, (ids_a, ids_b) in enumerate(pairs):
+            input_ids[i, 1 : keep_a[i] + 1] = ids_a[: keep_a[i]]
+            input_ids[i, keep_a[i] + 2 : seq_lens[i] - 1] = ids_b[: keep_b[i]]
+
+        positions = np.arange(max_len)[None, :]
+        input_mask = positions < seq_lens[:, None]
+        segment_ids = (positions >= (keep_a + 2)[:, None]) & input_mask
+
+        return (
+            torch.from_numpy(input_ids),
+            torch.from_numpy(input_mask.astype(np.int64)),
+            torch.from_numpy(segment_ids.astype(np.int64)),
+        )
+
     def predict(self, data):
 
         self.model.eval()
 
-        input = [InputExample(premise, hypothesis) for (premise, hypothesis) in data]
+        pairs = [
+            (self.encode(premise), self.encode(hypothesis))
+            for (premise, hypothesis) in data
+        ]
+        return self.forward(*self.pair_tensors(pairs))
+
+    def predict_task_set(self, premise_ids, task_set):
+        """
+        Score one encoded premise against every sample of a registered task set.
+        The pair tensors are assembled from the cached sample ids, so only the
+        premise has to be tokenized.
+        """
+        self.model.eval()
 
-        eval_features = self.convert_examples_to_features(input, train=False)
-        input_ids = torch.tensor([f.input_ids for f in eval_features], dtype=torch.long)
-        input_mask = torch.tensor(
-            [f.input_mask for f in eval_features], dtype=torch.long
-        )
-        segment_ids = torch.tensor(
-            [f.segment_ids for f in eval_features], dtype=torch.long
-        )
+        return self.forward(*self.task_set_tensors(premise_ids, task_set))
 
-        max_len = input_mask.sum(dim=1).max().item()
-        input_ids = input_ids[:, :max_len]
-        input_mask = input_mask[:, :max_len]
-        segment_ids = segment_ids[:, :max_len]
+    def predict_task_sets(self, premise_ids_list, task_sets):
+        """
+        Score several encoded premises, each against its task set, in one
+        forward pass. Returns the probabilities of every premise.
+        """
+        self.model.eval()
+
+        tensors = [
+            self.task_set_tensors(premise_ids, task_set)
+            for premise_ids, task_set in zip(premise_ids_list, task_sets)
+        ]
+        _, probs = self.forward(*self.concat_tensors(tensors))
+
+        results = []
+        start = 0
+        for task_set in task_sets:
+            end = start + len(task_set)
+            results.append(probs[start:end])
+            start = end
+        return results
+
+    @staticmethod
+    def concat_tensors(tensors):
+        """ Concatenate pair tensors of different lengths, padding to the longest """
+        max_len = max(t[0].size(1) for t in tensors)
+        return [
+            torch.cat([F.pad(t[i], (0, max_len - t[i].size(1))) for t in tensors])
+            for i in range(3)
+        ]
+
+    def task_set_tensors(self, premise_ids, task_set):
+        """ Build the input tensors pairing a premise with every sample """
+        len_a = len(premise_ids)
+        if len_a + task_set.max_len > self.max_seq_length - 3:
+            # some pairs need truncation
+            return self.pair_tensors(
+                [(premise_ids, ids_b) for ids_b in task_set.sample_ids]
+            )
 
+        example_num = len(task_set)
+        b_start = len_a + 2
+        seq_lens = task_set.sample_lens + b_start + 1
+        max_len = b_start + task_set.max_len + 1
+
+        input_ids = torch.zeros((example_num, max_len), dtype=torch.long)
+        input_ids[:, 0] = self.cls_id
+        input_ids[:, 1 : len_a + 1] = torch.tensor(premise_ids, dtype=torch.long)
+        input_ids[:, len_a + 1] = self.sep_id
+        input_ids[:, b_start : b_start + task_set.max_len] = task_set.sample_tensor
+        input_ids[torch.arange(example_num), seq_lens - 1] = self.sep_id
+
+        positions = torch.arange(max_len).unsqueeze(0)
+        input_mask = (positions < seq_lens.unsqueeze(1)).long()
+        segment_ids = (positions >= b_start).long() * input_mask
+
+        return input_ids, input_mask, segment_ids
+
+    def forward(self, input_ids, input_mask, segment_ids, sort_by_length=True):
+        """
+        Run the model in chunks of CHUNK pairs. Pairs are sorted by length so
+        that every chunk is only padded to its own longest pair, results are
+        returned in the input order.
+        """
         CHUNK = 500
         EXAMPLE_NUM = input_ids.size(0)
-        labels = []
-        probs = None
+        seq_lens = input_mask.sum(dim=1)
+        if sort_by_length:
+            order = torch.argsort(seq_lens)
+        else:
+            order = torch.arange(EXAMPLE_NUM)
+        probs = torch.zeros((EXAMPLE_NUM, self.num_labels))
         start_index = 0
 
         while start_index < EXAMPLE_NUM:
             end_index = min(start_index + CHUNK, EXAMPLE_NUM)
+            index = order[start_index:end_index]
+            chunk_len = seq_lens[index].max().item()
 
-            input_ids_ = input_ids[start_index:end_index, :].to(self.device)
-            input_mask_ = input_mask[start_index:end_index, :].to(self.device)
-            segment_ids_ = segment_ids[start_index:end_index, :].to(self.device)
+            input_ids_ = input_ids[index, :chunk_len].to(self.device)
+            input_mask_ = input_mask[index, :chunk_len].to(self.device)
+            segment_ids_ = segment_ids[index, :chunk_len].to(self.device)
 
             with torch.no_grad():
-                outputs = self.model(
+                outputs = self.runner(
                     input_ids=input_ids_,
                     attention_mask=input_mask_,
                     token_type_ids=segment_ids_,
@@ -137,26 +296,168 @@ class DNNC:
                 logits = outputs[0]
                 probs_ = torch.softmax(logits, dim=1)
 
-            probs_ = probs_.detach().cpu()
-            if probs is None:
-                probs = probs_
-            else:
-                probs = torch.cat((probs, probs_), dim=0)
-            labels += [
-                self.label_list[torch.max(probs_[i], dim=0)[1].item()]
-                for i in range(probs_.size(0))
-            ]
+            probs[index] = probs_.detach().cpu()
             start_index = end_index
 
+        labels = [self.label_list[i] for i in probs.argmax(dim=1).tolist()]
+
         assert len(labels) == EXAMPLE_NUM
         assert probs.size(0) == EXAMPLE_NUM
 
         return labels, probs
 
 
+class TaskSet:
+    """
+    Samples of a task set, lowercased and tokenized once. The sample ids are
+    also kept as a padded tensor so that per-request pairs can be assembled
+    without touching the tokenizer again.
+    """
+
+    def __init__(self, tasks, model: DNNC, task_key="task", example_key="examples"):
+        self.labels = []
+        self.examples = []
+        self.sample_ids = []
+        # sample indices of every task, used by the per-task prefilter
+        self.task_indices = OrderedDict()
+        for t in tasks:
+            for e in t[example_key]:
+                self.task_indices.setdefault(t[task_key], []).append(len(self.labels))
+                self.labels.append(t[task_key])
+                self.examples.append(e)
+                self.sample_ids.append(model.encode(e.lower()))
+
+        self.sample_lens = torch.tensor(
+            [len(ids) for ids in self.sample_ids], dtype=torch.long
+        )
+        self.max_len = max(self.sample_lens.tolist(), default=0)
+        self.sample_tensor = torch.zeros(
+            (len(self.sample_ids), self.max_len), dtype=torch.long
+        )
+        for i, ids in enumerate(self.sample_ids):
+            self.sample_tensor[i, : len(ids)] = torch.tensor(ids, dtype=torch.long)
+
+        self.vectorizer = None
+        self.sample_vectors = None
+
+    def build_index(self):
+        """
+        Character n-gram TF-IDF index over the samples, a cheap first stage
+        that shortlists samples before the NLI cross-encoder
+        """
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True
+        )
+        self.sample_vectors = self.vectorizer.fit_transform(
+            [e.lower() for e in self.examples]
+        )
+
+    def retrieve(self, text: str, k: int, per_task=False):
+        """
+        Indices of the k samples closest to the text, or of the k closest
+        samples of every task. Indices are returned in sample order so that
+        ties are broken as in a full pass.
+        """
+        if self.vectorizer is None:
+            self.build_index()
+        scores = (
+            (self.sample_vectors @ self.vectorizer.transform([text]).T)
+            .toarray()
+            .ravel()
+        )
+        if per_task:
+            indices = []
+            for task_indices in self.task_indices.values():
+                task_indices = np.asarray(task_indices)
+                order = np.argsort(-scores[task_indices], kind="stable")[:k]
+                indices.extend(task_indices[order].tolist())
+        else:
+            indices = np.argsort(-scores, kind="stable")[:k].tolist()
+        return sorted(indices)
+
+    def subset(self, indices):
+        """ A task set restricted to the given sample indices """
+        sub = copy.copy(self)
+        sub.labels = [self.labels[i] for i in indices]
+        sub.examples = [self.examples[i] for i in indices]
+        sub.sample_ids = [self.sample_ids[i] for i in indices]
+        sub.task_indices = OrderedDict()
+        for i, label in enumerate(sub.labels):
+            sub.task_indices.setdefault(label, []).append(i)
+        index = torch.tensor(indices, dtype=torch.long)
+        sub.sample_lens = self.sample_lens[index]
+        sub.max_len = max(sub.sample_lens.tolist(), default=0)
+        sub.sample_tensor = self.sample_tensor[index, : sub.max_len]
+        return sub
+
+    def __len__(self):
+        return len(self.sample_ids)
+
+    @staticmethod
+    def content_hash(tasks, task_key="task", example_key="examples"):
+        """ Stable id of a task set, the sample order is part of the content """
+        h = hashlib.sha1()
+        for t in tasks:
+            h.update(json.dumps([t[task_key], list(t[example_key])]).encode("utf-8"))
+        return h.hexdigest()
+
+
 class DnncIntentPredictor:
-    def __init__(self, model_path):
-        self.model = DNNC(path=model_path)
+    def __init__(
+        self,
+        model_path,
+        max_task_sets=64,
+        top_k=0,
+        per_task=False,
+        backend="torch",
+        export_dir=None,
+    ):
+        """
+        :param max_task_sets: number of registered task sets kept in memory
+        :param top_k: if positive, only the top_k samples retrieved by a
+            lexical index (the top_k of every task if per_task is set) are
+            scored by the NLI model
+        :param backend: "torch", "onnx" or "onnx-int8", see DNNC
+        """
+        self.model = DNNC(path=model_path, backend=backend, export_dir=export_dir)
+        # registered task sets, least recently used first
+        self.task_sets = OrderedDict()
+        self.max_task_sets = max_task_sets
+        self.lock = threading.Lock()
+        self.top_k = top_k
+        self.per_task = per_task
+
+    def register(self, tasks, task_key="task", example_key="examples") -> str:
+        """
+        Tokenize and cache the samples of a task set, return its content hash
+        so that later requests only need to send the id.
+        """
+        task_set_id = TaskSet.content_hash(tasks, task_key, example_key)
+        if self.get_task_set(task_set_id) is not None:
+            return task_set_id
+
+        task_set = self.task_set(tasks, task_key, example_key)
+        assert len(task_set) > 0
+        if self.top_k:
+            task_set.build_index()
+        with self.lock:
+            self.task_sets[task_set_id] = task_set
+            while len(self.task_sets) > self.max_task_sets:
+                evicted, _ = self.task_sets.popitem(last=False)
+                logger.info("Evicted task set %s", evicted)
+        logger.info("Registered task set %s (%d samples)", task_set_id, len(task_set))
+        return task_set_id
+
+    def task_set(self, tasks, task_key="task", example_key="examples") -> TaskSet:
+        """ Tokenize the samples of a task set sent with a request """
+        return TaskSet(tasks, self.model, task_key, example_key)
+
+    def get_task_set(self, task_set_id: str):
+        with self.lock:
+            task_set = self.task_sets.get(task_set_id)
+            if task_set is not None:
+                self.task_sets.move_to_end(task_set_id)
+        return task_set
 
     def predict(
         self,
@@ -166,32 +467,106 @@ class DnncIntentPredictor:
         example_key="examples",
         threshold=0.65,
     ):
+        task_set = self.task_set(tasks, task_key, example_key)
+        return self.predict_task_set(input, task_set, threshold=threshold)
+
+    def candidates(self, input: str, task_set: TaskSet, top_k=None) -> TaskSet:
+        """
+        First stage, shortlist the samples the NLI model scores. top_k
+        overrides the top_k of the predictor, 0 scores all the samples.
+        """
+        top_k = self.top_k if top_k is None else top_k
+        if not top_k or len(task_set) <= top_k:
+            return task_set
+        return task_set.subset(
+            task_set.retrieve(input.lower(), top_k, per_task=self.per_task)
+        )
 
-        input = input.lower()
+    def predict_task_set(
+        self, input: str, task_set: TaskSet, threshold=0.65, top_k=None
+    ):
 
-        nli_input = []
-        for t in tasks:
-            for e in t[example_key]:
-                nli_input.append((input, e.lower()))
+        assert len(task_set) > 0
+
+        task_set = self.candidates(input, task_set, top_k)
+        premise_ids = self.model.encode(input.lower())
+        results = self.model.predict_task_set(premise_ids, task_set)
+        return self.best_match(task_set, results[1], threshold)
+
+    def predict_task_set_batch(self, inputs, task_set: TaskSet, threshold=0.65):
+        """ Predict the intents of several inputs in one forward pass """
+
+        assert len(task_set) > 0
 
-        assert len(nli_input) > 0
+        task_sets = [self.candidates(input, task_set) for input in inputs]
+        premise_ids_list = [self.model.encode(input.lower()) for input in inputs]
+        results = self.model.predict_task_sets(premise_ids_list, task_sets)
+        return [
+            self.best_match(t, probs, threshold) for t, probs in zip(task_sets, results)
+        ]
 
-        results = self.model.predict(nli_input)
-        maxScore, maxIndex = results[1][:, 0].max(dim=0)
+    @staticmethod
+    def best_match(task_set: TaskSet, probs, threshold=0.65):
+        """ Pick the sample with the highest entailment probability """
+        maxScore, maxIndex = probs[:, 0].max(dim=0)
 
         maxScore = maxScore.item()
         maxIndex = maxIndex.item()
 
-        intent = "None"
-        matched_example = "None"
         if maxScore < threshold:
-            return intent, 0, matched_example
+            return "None", 0, "None"
         else:
-            index = -1
-            for t in tasks:
-                for e in t[example_key]:
-                    index += 1
-                    if index == maxIndex:
-                        intent = t[task_key]
-                        matched_example = e
-            return intent, maxScore, matched_example
+            return task_set.labels[maxIndex], maxScore, task_set.examples[maxIndex]
+
+    def evaluate_retrieval(self, examples, tasks, ks=(1, 5, 10, 20, 50)):
+        """
+        Compare the NLI pass over all samples with the two-stage pass.
+        Reports recall@k of the first stage (whether a sample of the gold task
+        is shortlisted) together with accuracy and latency of both passes.
+        """
+        task_set = TaskSet(tasks, self.model)
+        task_set.build_index()
+
+        results = {}
+        for k in ks:
+            candidate_labels = [
+                {task_set.labels[i] for i in task_set.retrieve(e.text.lower(), k)}
+                for e in examples
+            ]
+            results["recall@{}".format(k)] = calc_recall_at_k(
+                examples, candidate_labels
+            )
+
+        for name, k in (("full", 0), ("two_stage", self.top_k)):
+            preds = []
+            start = time.perf_counter()
+            for e in examples:
+                intent, score, _ = self.predict_task_set(e.text, task_set, 0.0, k)
+                preds.append((score, intent))
+            elapsed = time.perf_counter() - start
+            results[name + "_acc"] = calc_in_acc(examples, preds, [0.0])[0]
+            results[name + "_ms_per_query"] = 1000.0 * elapsed / max(len(examples), 1)
+
+        return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils import load_intent_datasets, sample
+
+    parser = argparse.ArgumentParser("Evaluate the retrieval prefilter")
+    parser.add_argument("--model_path", type=str, required=True)
+    parser.add_argument("--train_path", type=str, required=True)
+    parser.add_argument("--dev_path", type=str, required=True)
+    parser.add_argument("--n_samples", type=int, default=5)
+    parser.add_argument("--top_k", type=int, default=20)
+    parser.add_argument("--per_task", action="store_true")
+    args = parser.parse_args()
+
+    train_examples, dev_examples = load_intent_datasets(args.train_path, args.dev_path)
+    tasks = sample(args.n_samples, train_examples)
+    predictor = DnncIntentPredictor(
+        args.model_path, top_k=args.top_k, per_task=args.per_task
+    )
+    print(json.dumps(predictor.evaluate_retrieval(dev_examples, tasks), indent=4))
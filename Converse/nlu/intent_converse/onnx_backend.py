@@ -0,0 +1,120 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+ONNX Runtime backend of the TinyBERT intent model. The model is exported once
+with dynamic batch and sequence axes, optionally quantized to int8, and the
+exported file is reused on the next start.
+"""
+
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:
+    onnxruntime = None
+
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+ONNX_NAME = "model.onnx"
+ONNX_INT8_NAME = "model-int8.onnx"
+
+
+class _Logits(nn.Module):
+    """ Export only the logits, the attentions and hidden states are unused """
+
+    def __init__(self, model):
+        super(_Logits, self).__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        )[0]
+
+
+def export_onnx(model: nn.Module, path: str, opset_version=13):
+    """
+    Export a sequence classification model with dynamic axes, opset 13 is the
+    highest the torch 1.8.1 of the NLU image exports
+    """
+    model.eval()
+    dummy = torch.ones((2, 8), dtype=torch.long)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        _Logits(model).cpu(),
+        (dummy, dummy, dummy),
+        path,
+        input_names=INPUT_NAMES,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset_version,
+    )
+    logger.info("Exported ONNX model to %s", path)
+
+
+def quantize(path: str, quantized_path: str):
+    """ int8 dynamic quantization of the weights """
+    quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+    logger.info("Quantized ONNX model to %s", quantized_path)
+
+
+class OnnxModel:
+    """
+    Callable with the signature of the torch model that returns the logits
+    computed by ONNX Runtime.
+    """
+
+    def __init__(self, model: nn.Module, backend: str, export_dir: str):
+        """
+        :param model: loaded torch model, exported if export_dir has no ONNX file
+        :param backend: "onnx" or "onnx-int8"
+        :param export_dir: directory of the exported files
+        """
+        if onnxruntime is None:
+            raise ImportError(
+                "The {} backend requires onnxruntime, "
+                "pip install onnxruntime onnx".format(backend)
+            )
+        path = os.path.join(export_dir, ONNX_NAME)
+        if not os.path.exists(path):
+            export_onnx(model, path)
+        if backend == "onnx-int8":
+            quantized_path = os.path.join(export_dir, ONNX_INT8_NAME)
+            if not os.path.exists(quantized_path):
+                quantize(path, quantized_path)
+            path = quantized_path
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def __call__(self, input_ids, attention_mask, token_type_ids):
+        (logits,) = self.session.run(
+            None,
+            {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+                "token_type_ids": token_type_ids.cpu().numpy().astype(np.int64),
+            },
+        )
+        return (torch.from_numpy(logits),)
@@ -8,9 +8,6 @@
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # source: intent.proto
 
-import sys
-
-_b = sys.version_info[0] < 3 and (lambda x: x) or (lambda x: x.encode("latin1"))
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
 from google.protobuf import reflection as _reflection
@@ -26,9 +23,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
     package="",
     syntax="proto3",
     serialized_options=None,
-    serialized_pb=_b(
-        '\n\x0cintent.proto"G\n\x16IntentDetectionRequest\x12\x10\n\x08\x64ocument\x18\x01 \x01(\t\x12\x1b\n\x05tasks\x18\x02 \x03(\x0b\x32\x0c.IntentClass"-\n\x0bIntentClass\x12\r\n\x05label\x18\x01 \x01(\t\x12\x0f\n\x07samples\x18\x02 \x03(\t"6\n\x17IntentDetectionResponse\x12\x1b\n\x07results\x18\x01 \x01(\x0b\x32\n.IntentRes"N\n\tIntentRes\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05label\x18\x02 \x01(\t\x12\x13\n\x0bprobability\x18\x03 \x01(\x02\x12\x0c\n\x04sent\x18\x04 \x01(\t2`\n\x16IntentDetectionService\x12\x46\n\x0fIntentDetection\x12\x17.IntentDetectionRequest\x1a\x18.IntentDetectionResponse"\x00\x62\x06proto3'
-    ),
+    serialized_pb=b'\n\x0cintent.proto"\\\n\x16IntentDetectionRequest\x12\x10\n\x08\x64ocument\x18\x01 \x01(\t\x12\x1b\n\x05tasks\x18\x02 \x03(\x0b\x32\x0c.IntentClass\x12\x13\n\x0btask_set_id\x18\x03 \x01(\t"-\n\x0bIntentClass\x12\r\n\x05label\x18\x01 \x01(\t\x12\x0f\n\x07samples\x18\x02 \x03(\t"P\n\x17IntentDetectionResponse\x12\x1b\n\x07results\x18\x01 \x01(\x0b\x32\n.IntentRes\x12\x18\n\x10unknown_task_set\x18\x02 \x01(\x08"b\n\x1bIntentDetectionBatchRequest\x12\x11\n\tdocuments\x18\x01 \x03(\t\x12\x1b\n\x05tasks\x18\x02 \x03(\x0b\x32\x0c.IntentClass\x12\x13\n\x0btask_set_id\x18\x03 \x01(\t"U\n\x1cIntentDetectionBatchResponse\x12\x1b\n\x07results\x18\x01 \x03(\x0b\x32\n.IntentRes\x12\x18\n\x10unknown_task_set\x18\x02 \x01(\x08"5\n\x16RegisterTaskSetRequest\x12\x1b\n\x05tasks\x18\x01 \x03(\x0b\x32\x0c.IntentClass"N\n\x17RegisterTaskSetResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x13\n\x0btask_set_id\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t"N\n\tIntentRes\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05label\x18\x02 \x01(\t\x12\x13\n\x0bprobability\x18\x03 \x01(\x02\x12\x0c\n\x04sent\x18\x04 \x01(\t2\xff\x01\n\x16IntentDetectionService\x12\x46\n\x0fIntentDetection\x12\x17.IntentDetectionRequest\x1a\x18.IntentDetectionResponse"\x00\x12\x46\n\x0fRegisterTaskSet\x12\x17.RegisterTaskSetRequest\x1a\x18.RegisterTaskSetResponse"\x00\x12U\n\x14IntentDetectionBatch\x12\x1c.IntentDetectionBatchRequest\x1a\x1d.IntentDetectionBatchResponse"\x00\x62\x06proto3',
 )
 
 
@@ -48,7 +43,7 @@ _INTENTDETECTIONREQUEST = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -75,6 +70,24 @@ _INTENTDETECTIONREQUEST = _descriptor.Descriptor(
             serialized_options=None,
             file=DESCRIPTOR,
         ),
+        _descriptor.FieldDescriptor(
+            name="task_set_id",
+            full_name="IntentDetectionRequest.task_set_id",
+            index=2,
+            number=3,
+            type=9,
+            cpp_type=9,
+            label=1,
+            has_default_value=False,
+            default_value=b"".decode("utf-8"),
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
     ],
     extensions=[],
     nested_types=[],
@@ -85,7 +98,7 @@ _INTENTDETECTIONREQUEST = _descriptor.Descriptor(
     extension_ranges=[],
     oneofs=[],
     serialized_start=16,
-    serialized_end=87,
+    serialized_end=108,
 )
 
 
@@ -105,7 +118,7 @@ _INTENTCLASS = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -141,8 +154,8 @@ _INTENTCLASS = _descriptor.Descriptor(
     syntax="proto3",
     extension_ranges=[],
     oneofs=[],
-    serialized_start=89,
-    serialized_end=134,
+    serialized_start=110,
+    serialized_end=155,
 )
 
 
@@ -171,6 +184,99 @@ _INTENTDETECTIONRESPONSE = _descriptor.Descriptor(
             serialized_options=None,
             file=DESCRIPTOR,
         ),
+        _descriptor.FieldDescriptor(
+            name="unknown_task_set",
+            full_name="IntentDetectionResponse.unknown_task_set",
+            index=1,
+            number=2,
+            type=8,
+            cpp_type=7,
+            label=1,
+            has_default_value=False,
+            default_value=False,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=157,
+    serialized_end=237,
+)
+
+
+_INTENTDETECTIONBATCHREQUEST = _descriptor.Descriptor(
+    name="IntentDetectionBatchRequest",
+    full_name="IntentDetectionBatchRequest",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="documents",
+            full_name="IntentDetectionBatchRequest.documents",
+            index=0,
+            number=1,
+            type=9,
+            cpp_type=9,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="tasks",
+            full_name="IntentDetectionBatchRequest.tasks",
+            index=1,
+            number=2,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="task_set_id",
+            full_name="IntentDetectionBatchRequest.task_set_id",
+            index=2,
+            number=3,
+            type=9,
+            cpp_type=9,
+            label=1,
+            has_default_value=False,
+            default_value=b"".decode("utf-8"),
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
     ],
     extensions=[],
     nested_types=[],
@@ -180,8 +286,179 @@ _INTENTDETECTIONRESPONSE = _descriptor.Descriptor(
     syntax="proto3",
     extension_ranges=[],
     oneofs=[],
-    serialized_start=136,
-    serialized_end=190,
+    serialized_start=239,
+    serialized_end=337,
+)
+
+
+_INTENTDETECTIONBATCHRESPONSE = _descriptor.Descriptor(
+    name="IntentDetectionBatchResponse",
+    full_name="IntentDetectionBatchResponse",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="results",
+            full_name="IntentDetectionBatchResponse.results",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="unknown_task_set",
+            full_name="IntentDetectionBatchResponse.unknown_task_set",
+            index=1,
+            number=2,
+            type=8,
+            cpp_type=7,
+            label=1,
+            has_default_value=False,
+            default_value=False,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=339,
+    serialized_end=424,
+)
+
+
+_REGISTERTASKSETREQUEST = _descriptor.Descriptor(
+    name="RegisterTaskSetRequest",
+    full_name="RegisterTaskSetRequest",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="tasks",
+            full_name="RegisterTaskSetRequest.tasks",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=426,
+    serialized_end=479,
+)
+
+
+_REGISTERTASKSETRESPONSE = _descriptor.Descriptor(
+    name="RegisterTaskSetResponse",
+    full_name="RegisterTaskSetResponse",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="success",
+            full_name="RegisterTaskSetResponse.success",
+            index=0,
+            number=1,
+            type=8,
+            cpp_type=7,
+            label=1,
+            has_default_value=False,
+            default_value=False,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="task_set_id",
+            full_name="RegisterTaskSetResponse.task_set_id",
+            index=1,
+            number=2,
+            type=9,
+            cpp_type=9,
+            label=1,
+            has_default_value=False,
+            default_value=b"".decode("utf-8"),
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="error",
+            full_name="RegisterTaskSetResponse.error",
+            index=2,
+            number=3,
+            type=9,
+            cpp_type=9,
+            label=1,
+            has_default_value=False,
+            default_value=b"".decode("utf-8"),
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=481,
+    serialized_end=559,
 )
 
 
@@ -219,7 +496,7 @@ _INTENTRES = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -255,7 +532,7 @@ _INTENTRES = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -273,15 +550,26 @@ _INTENTRES = _descriptor.Descriptor(
     syntax="proto3",
     extension_ranges=[],
     oneofs=[],
-    serialized_start=192,
-    serialized_end=270,
+    serialized_start=561,
+    serialized_end=639,
 )
 
 _INTENTDETECTIONREQUEST.fields_by_name["tasks"].message_type = _INTENTCLASS
 _INTENTDETECTIONRESPONSE.fields_by_name["results"].message_type = _INTENTRES
+_INTENTDETECTIONBATCHREQUEST.fields_by_name["tasks"].message_type = _INTENTCLASS
+_INTENTDETECTIONBATCHRESPONSE.fields_by_name["results"].message_type = _INTENTRES
+_REGISTERTASKSETREQUEST.fields_by_name["tasks"].message_type = _INTENTCLASS
 DESCRIPTOR.message_types_by_name["IntentDetectionRequest"] = _INTENTDETECTIONREQUEST
 DESCRIPTOR.message_types_by_name["IntentClass"] = _INTENTCLASS
 DESCRIPTOR.message_types_by_name["IntentDetectionResponse"] = _INTENTDETECTIONRESPONSE
+DESCRIPTOR.message_types_by_name[
+    "IntentDetectionBatchRequest"
+] = _INTENTDETECTIONBATCHREQUEST
+DESCRIPTOR.message_types_by_name[
+    "IntentDetectionBatchResponse"
+] = _INTENTDETECTIONBATCHRESPONSE
+DESCRIPTOR.message_types_by_name["RegisterTaskSetRequest"] = _REGISTERTASKSETREQUEST
+DESCRIPTOR.message_types_by_name["RegisterTaskSetResponse"] = _REGISTERTASKSETRESPONSE
 DESCRIPTOR.message_types_by_name["IntentRes"] = _INTENTRES
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -318,6 +606,50 @@ IntentDetectionResponse = _reflection.GeneratedProtocolMessageType(
 )
 _sym_db.RegisterMessage(IntentDetectionResponse)
 
+IntentDetectionBatchRequest = _reflection.GeneratedProtocolMessageType(
+    "IntentDetectionBatchRequest",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _INTENTDETECTIONBATCHREQUEST,
+        "__module__": "intent_pb2"
+        # @@protoc_insertion_point(class_scope:IntentDetectionBatchRequest)
+    },
+)
+_sym_db.RegisterMessage(IntentDetectionBatchRequest)
+
+IntentDetectionBatchResponse = _reflection.GeneratedProtocolMessageType(
+    "IntentDetectionBatchResponse",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _INTENTDETECTIONBATCHRESPONSE,
+        "__module__": "intent_pb2"
+        # @@protoc_insertion_point(class_scope:IntentDetectionBatchResponse)
+    },
+)
+_sym_db.RegisterMessage(IntentDetectionBatchResponse)
+
+RegisterTaskSetRequest = _reflection.GeneratedProtocolMessageType(
+    "RegisterTaskSetRequest",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _REGISTERTASKSETREQUEST,
+        "__module__": "intent_pb2"
+        # @@protoc_insertion_point(class_scope:RegisterTaskSetRequest)
+    },
+)
+_sym_db.RegisterMessage(RegisterTaskSetRequest)
+
+RegisterTaskSetResponse = _reflection.GeneratedProtocolMessageType(
+    "RegisterTaskSetResponse",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _REGISTERTASKSETRESPONSE,
+        "__module__": "intent_pb2"
+        # @@protoc_insertion_point(class_scope:RegisterTaskSetResponse)
+    },
+)
+_sym_db.RegisterMessage(RegisterTaskSetResponse)
+
 IntentRes = _reflection.GeneratedProtocolMessageType(
     "IntentRes",
     (_message.Message,),
@@ -336,8 +668,8 @@ _INTENTDETECTIONSERVICE = _descriptor.ServiceDescriptor(
     file=DESCRIPTOR,
     index=0,
     serialized_options=None,
-    serialized_start=272,
-    serialized_end=368,
+    serialized_start=642,
+    serialized_end=897,
     methods=[
         _descriptor.MethodDescriptor(
             name="IntentDetection",
@@ -348,6 +680,24 @@ _INTENTDETECTIONSERVICE = _descriptor.ServiceDescriptor(
             output_type=_INTENTDETECTIONRESPONSE,
             serialized_options=None,
         ),
+        _descriptor.MethodDescriptor(
+            name="RegisterTaskSet",
+            full_name="IntentDetectionService.RegisterTaskSet",
+            index=1,
+            containing_service=None,
+            input_type=_REGISTERTASKSETREQUEST,
+            output_type=_REGISTERTASKSETRESPONSE,
+            serialized_options=None,
+        ),
+        _descriptor.MethodDescriptor(
+            name="IntentDetectionBatch",
+            full_name="IntentDetectionService.IntentDetectionBatch",
+            index=2,
+            containing_service=None,
+            input_type=_INTENTDETECTIONBATCHREQUEST,
+            output_type=_INTENTDETECTIONBATCHRESPONSE,
+            serialized_options=None,
+        ),
     ],
 )
 _sym_db.RegisterServiceDescriptor(_INTENTDETECTIONSERVICE)
@@ -28,6 +28,16 @@ class IntentDetectionServiceStub(object):
             request_serializer=intent_pb2.IntentDetectionRequest.SerializeToString,
             response_deserializer=intent_pb2.IntentDetectionResponse.FromString,
         )
+        self.RegisterTaskSet = channel.unary_unary(
+            "/IntentDetectionService/RegisterTaskSet",
+            request_serializer=intent_pb2.RegisterTaskSetRequest.SerializeToString,
+            response_deserializer=intent_pb2.RegisterTaskSetResponse.FromString,
+        )
+        self.IntentDetectionBatch = channel.unary_unary(
+            "/IntentDetectionService/IntentDetectionBatch",
+            request_serializer=intent_pb2.IntentDetectionBatchRequest.SerializeToString,
+            response_deserializer=intent_pb2.IntentDetectionBatchResponse.FromString,
+        )
 
 
 class IntentDetectionServiceServicer(object):
@@ -44,6 +54,20 @@ class IntentDetectionServiceServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def RegisterTaskSet(self, request, context):
+        # missing associated documentation comment in .proto file
+        pass
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def IntentDetectionBatch(self, request, context):
+        # missing associated documentation comment in .proto file
+        pass
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_IntentDetectionServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -52,6 +76,16 @@ def add_IntentDetectionServiceServicer_to_server(servicer, server):
             request_deserializer=intent_pb2.IntentDetectionRequest.FromString,
             response_serializer=intent_pb2.IntentDetectionResponse.SerializeToString,
         ),
+        "RegisterTaskSet": grpc.unary_unary_rpc_method_handler(
+            servicer.RegisterTaskSet,
+            request_deserializer=intent_pb2.RegisterTaskSetRequest.FromString,
+            response_serializer=intent_pb2.RegisterTaskSetResponse.SerializeToString,
+        ),
+        "IntentDetectionBatch": grpc.unary_unary_rpc_method_handler(
+            servicer.IntentDetectionBatch,
+            request_deserializer=intent_pb2.IntentDetectionBatchRequest.FromString,
+            response_serializer=intent_pb2.IntentDetectionBatchResponse.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "IntentDetectionService", rpc_method_handlers
@@ -11,6 +11,8 @@ from concurrent import futures
 import grpc
 import time
 from dnnc_tinybert_inference_only import DnncIntentPredictor
+from onnx_backend import BACKENDS
+from batcher import BatchingIntentPredictor
 import argparse
 
 
@@ -48,7 +50,55 @@ class IntentApplication:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model_path", type=str, default="bert-base", required=True)
+    parser.add_argument(
+        "--batch_wait_ms",
+        type=float,
+        default=0,
+        help="coalesce concurrent requests arriving within this window, "
+        "0 disables batching",
+    )
+    parser.add_argument(
+        "--batch_max_pairs",
+        type=int,
+        default=2000,
+        help="maximum number of NLI pairs in one batched forward pass",
+    )
+    parser.add_argument(
+        "--retrieval_top_k",
+        type=int,
+        default=0,
+        help="score only the top k samples retrieved by a lexical prefilter, "
+        "0 scores all samples",
+    )
+    parser.add_argument(
+        "--retrieval_per_task",
+        action="store_true",
+        help="retrieve the top k samples of every task instead of overall",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="torch",
+        choices=BACKENDS,
+        help="run the model with PyTorch or ONNX Runtime (fp32 or int8)",
+    )
+    parser.add_argument(
+        "--export_dir",
+        type=str,
+        default=None,
+        help="directory of the exported ONNX files, the model path by default",
+    )
     args = parser.parse_args()
-    predictor = DnncIntentPredictor(model_path=args.model_path)
+    predictor = DnncIntentPredictor(
+        model_path=args.model_path,
+        backend=args.backend,
+        export_dir=args.export_dir,
+        top_k=args.retrieval_top_k,
+        per_task=args.retrieval_per_task,
+    )
+    if args.batch_wait_ms > 0:
+        predictor = BatchingIntentPredictor(
+            predictor, max_wait_ms=args.batch_wait_ms, max_pairs=args.batch_max_pairs
+        )
     grpc_application = IntentApplication(predictor=predictor)
     grpc_application.run()
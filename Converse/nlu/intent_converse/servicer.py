@@ -13,17 +13,41 @@ class IntentServicer(intent_pb2_grpc.IntentDetectionServiceServicer):
         super(IntentServicer, self).__init__()
         self.predictor = predictor
 
+    @staticmethod
+    def tasks_list(tasks):
+        return [{"task": t.label, "examples": list(t.samples)} for t in tasks]
+
+    def RegisterTaskSet(self, request, context):
+        response = intent_pb2.RegisterTaskSetResponse()
+        try:
+            response.task_set_id = self.predictor.register(
+                self.tasks_list(request.tasks)
+            )
+            response.success = True
+        except Exception as e:
+            response.success = False
+            response.error = str(e)
+        return response
+
     def IntentDetection(self, request, context):
         try:
             text = request.document
-            tasks_list = []
-            for t in request.tasks:
-                sample_list = []
-                for s in t.samples:
-                    sample_list.append(s)
-                tasks_list.append({"task": t.label, "examples": sample_list})
-            intent, max_score, sent = self.predictor.predict(text, tasks_list)
             response = intent_pb2.IntentDetectionResponse()
+            if request.task_set_id:
+                task_set = self.predictor.get_task_set(request.task_set_id)
+                if task_set is None:
+                    # evicted or lost on restart, the client registers it again
+                    response.unknown_task_set = True
+                    response.results.success = False
+                    response.results.label = "None"
+                    return response
+                intent, max_score, sent = self.predictor.predict_task_set(
+                    text, task_set
+                )
+            else:
+                intent, max_score, sent = self.predictor.predict(
+                    text, self.tasks_list(request.tasks)
+                )
             if intent == "None":
                 response.results.success = False
             else:
@@ -40,3 +64,38 @@ class IntentServicer(intent_pb2_grpc.IntentDetectionServiceServicer):
             response.results.sent = str(e)
 
         return response
+
+    def IntentDetectionBatch(self, request, context):
+        response = intent_pb2.IntentDetectionBatchResponse()
+        try:
+            if request.task_set_id:
+                task_set = self.predictor.get_task_set(request.task_set_id)
+                if task_set is None:
+                    # evicted or lost on restart, the client registers it again
+                    response.unknown_task_set = True
+                    return response
+            else:
+                task_set = self.predictor.task_set(self.tasks_list(request.tasks))
+            predictions = self.predictor.predict_task_set_batch(
+                list(request.documents), task_set
+            )
+            for intent, max_score, sent in predictions:
+                res = response.results.add()
+                if intent == "None":
+                    res.success = False
+                else:
+                    res.success = True
+                    res.label = intent
+                    res.probability = max_score
+                    res.sent = sent
+
+        except Exception as e:
+            response = intent_pb2.IntentDetectionBatchResponse()
+            for _ in request.documents:
+                res = response.results.add()
+                res.success = False
+                res.label = "None"
+                res.probability = 0
+                res.sent = str(e)
+
+        return response
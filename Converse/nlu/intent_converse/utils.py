@@ -288,6 +288,20 @@ def calc_in_acc(examples, in_domain_preds, thresholds):
     return in_acc
 
 
+def calc_recall_at_k(examples, candidate_labels):
+    """
+    Recall of a retrieval stage, the fraction of examples whose gold label is
+    among the labels of the retrieved candidates
+    """
+    if not examples:
+        return 0.0
+    hits = 0
+    for e, labels in zip(examples, candidate_labels):
+        if e.label in labels:
+            hits += 1
+    return hits / len(examples)
+
+
 def calc_oos_recall(oos_preds, thresholds):
     oos_recall = [0.0] * len(thresholds)
 
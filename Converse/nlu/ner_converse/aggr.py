@@ -14,8 +14,26 @@ from concurrent import futures
 import duckling
 
 
+class ParseRequest(object):
+    """
+    State of one Aggregator.parse call. The aggregator is shared by the
+    server threads, everything specific to a query lives here.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        # tokens of the date/time entities found by the NER model
+        self.date_time_white_list = ""
+
+
 class Aggregator(object):
-    def __init__(self, ner_port="0.0.0.0:8090", max_workers=8):
+    def __init__(self, ner_port="0.0.0.0:8090", max_workers=8, ner_predictor=None):
+        """
+        :param ner_port: address of the NER server, unused with ner_predictor
+        :param max_workers: threads running the NER and duckling calls
+        :param ner_predictor: NerPredictor called in this process instead of
+            the NER server
+        """
         self.duckling_entities = [
             "amount-of-money",
             "email",
@@ -27,56 +45,61 @@ class Aggregator(object):
         ]
         self.ner_port = ner_port
         self.max_workers = max_workers
-        # open a gRPC channel
-        self.channel = grpc.insecure_channel(self.ner_port)
-        # create a stub (client)
-        self.stub = ner_pb2_grpc.NERPredictorServiceStub(self.channel)
+        self.ner_predictor = ner_predictor
+        if self.ner_predictor is None:
+            # open a gRPC channel
+            self.channel = grpc.insecure_channel(self.ner_port)
+            # create a stub (client)
+            self.stub = ner_pb2_grpc.NERPredictorServiceStub(self.channel)
         self.executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
         self.dk = duckling.Duckling()
         self.dk.load()
         self.services = [self.ner_parse, self.duckling_parse]
         self.date_time_labels = {"DATE", "TIME", "DUCKLING/time"}
-        self.date_time_white_list = ""
 
     def parse(self, query):
+        request = ParseRequest(query)
         responses_future = [
-            self.executor.submit(service, query) for service in self.services
+            self.executor.submit(service, request) for service in self.services
         ]
         responses = {}
         for response_future in futures.as_completed(responses_future):
             response = response_future.result()
             responses[response[0]] = response[1]
-        return self.post_proc(responses)
+        return self.post_proc(responses, request)
 
-    def post_proc(self, responses):
+    def post_proc(self, responses, request):
+        # keep the duckling date/time entities the NER model also found
         responses["DK"] = [
             response
             for response in responses["DK"]
             if (
                 response.label in self.date_time_labels
-                and response.token in self.date_time_white_list
+                and response.token in request.date_time_white_list
             )
             or (response.label not in self.date_time_labels)
         ]
-        self.date_time_white_list = ""
         response_final = ner_pb2.NERPredictionResponse()
         response_final.success = True
         for service_name, response in responses.items():
             response_final.probabilities.extend(response)
         return response_final
 
-    def ner_parse(self, query):
-        ner_request = ner_pb2.NERPredictionRequest(
-            document=bytes(query, "utf-8"), returnSpan=True
-        )
-        response = self.stub.predict(ner_request)
+    def ner_parse(self, request):
+        if self.ner_predictor is not None:
+            response = self.ner_predictor.predict(request.query, return_span=True)
+        else:
+            ner_request = ner_pb2.NERPredictionRequest(
+                document=bytes(request.query, "utf-8"), returnSpan=True
+            )
+            response = self.stub.predict(ner_request)
         for probability in response.probabilities:
             if probability.label in self.date_time_labels:
-                self.date_time_white_list += probability.token
+                request.date_time_white_list += probability.token
         return "NER", response.probabilities
 
-    def duckling_parse(self, query):
-        results = self.dk.parse(query)
+    def duckling_parse(self, request):
+        results = self.dk.parse(request.query)
         entities = []
         for result in results:
             if "value" not in result:
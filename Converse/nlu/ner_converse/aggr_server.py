@@ -4,6 +4,7 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import argparse
 import logging
 
 import sys
@@ -43,8 +44,67 @@ class AggregatorServiceServicer(ner_pb2_grpc.NERPredictorServiceServicer):
 
 
 if __name__ == "__main__":
-    aggr = Aggregator(ner_port="0.0.0.0:8090")
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=10,
+        help="number of requests served concurrently",
+    )
+    parser.add_argument(
+        "--aggregator_workers",
+        type=int,
+        default=16,
+        help="threads running the NER and duckling calls of all requests",
+    )
+    parser.add_argument(
+        "--ner_mode",
+        choices=["remote", "embedded"],
+        default="remote",
+        help="call the NER server on --ner_port, or load the NER model in this process",
+    )
+    parser.add_argument("--ner_port", type=str, default="0.0.0.0:8090")
+    parser.add_argument(
+        "--ner_model_path",
+        type=str,
+        default="./models/tinybert_6l",
+        help="NER model loaded in embedded mode",
+    )
+    parser.add_argument(
+        "--fast_tokenizer",
+        action="store_true",
+        help="tokenize with BertTokenizerFast in embedded mode",
+    )
+    parser.add_argument(
+        "--window_size",
+        type=int,
+        default=128,
+        help="longer texts are tagged in overlapping windows of this many tokens",
+    )
+    parser.add_argument(
+        "--window_stride",
+        type=int,
+        default=96,
+        help="tokens between the starts of two consecutive windows",
+    )
+    args = parser.parse_args()
+
+    ner_predictor = None
+    if args.ner_mode == "embedded":
+        from tinybert_ner import NerPredictor
+
+        ner_predictor = NerPredictor(
+            model_path=args.ner_model_path,
+            fast_tokenizer=args.fast_tokenizer,
+            window_size=args.window_size,
+            window_stride=args.window_stride,
+        )
+    aggr = Aggregator(
+        ner_port=args.ner_port,
+        max_workers=args.aggregator_workers,
+        ner_predictor=ner_predictor,
+    )
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=args.max_workers))
     ner_pb2_grpc.add_NERPredictorServiceServicer_to_server(
         AggregatorServiceServicer(aggregator=aggr), server
     )
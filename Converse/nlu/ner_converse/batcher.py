@@ -0,0 +1,134 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from tinybert_ner import NerPredictor
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStats:
+    """
+    Sliding window of batch sizes and queue waits, the same stats as the
+    intent server batcher. Updated by the worker and read by any thread.
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes = deque(maxlen=window)
+        self.queue_waits_ms = deque(maxlen=window)
+
+    def record(self, batch_size, queue_waits_ms):
+        with self.lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.batch_sizes.append(batch_size)
+            self.queue_waits_ms.extend(queue_waits_ms)
+
+    @staticmethod
+    def percentile(values, p):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return float(values[min(len(values) - 1, int(p / 100.0 * len(values)))])
+
+    def summary(self) -> dict:
+        with self.lock:
+            sizes = list(self.batch_sizes)
+            waits = list(self.queue_waits_ms)
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "batch_size_mean": sum(sizes) / len(sizes) if sizes else 0.0,
+                "batch_size_max": max(sizes, default=0),
+                "queue_wait_ms_p50": self.percentile(waits, 50),
+                "queue_wait_ms_p99": self.percentile(waits, 99),
+            }
+
+
+class _PendingText:
+    def __init__(self, text: str, return_span: bool):
+        self.text = text
+        self.return_span = return_span
+        self.enqueued = time.perf_counter()
+        self.future = Future()
+
+
+class BatchingNerPredictor:
+    """
+    Drop-in replacement of NerPredictor for the servicer. Concurrent predict
+    calls arriving within max_wait_ms are tagged together, up to
+    max_batch_size texts, in one predict_batch call.
+    """
+
+    def __init__(
+        self, predictor: NerPredictor, max_wait_ms=5.0, max_batch_size=64, log_every=100
+    ):
+        self.predictor = predictor
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.log_every = log_every
+        self.stats = BatchStats()
+        self.pending = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def predict(self, text, return_span=True):
+        return self.predict_batch([text], return_span)[0]
+
+    def predict_batch(self, texts, return_span=True):
+        if isinstance(return_span, bool):
+            return_span = [return_span] * len(texts)
+        requests = [_PendingText(t, span) for t, span in zip(texts, return_span)]
+        for request in requests:
+            self.pending.put(request)
+        return [request.future.result() for request in requests]
+
+    def _collect(self):
+        """ Block for one text, then gather more until the window closes """
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            # recorded before the results are handed back, so that the stats
+            # cover every request answered
+            self.stats.record(
+                len(batch), [(started - request.enqueued) * 1000.0 for request in batch]
+            )
+            try:
+                responses = self.predictor.predict_batch(
+                    [request.text for request in batch],
+                    [request.return_span for request in batch],
+                )
+                for request, response in zip(batch, responses):
+                    request.future.set_result(response)
+            except Exception as e:
+                logger.exception("Batched NER prediction failed")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            if self.log_every and self.stats.batches % self.log_every == 0:
+                logger.info("NER batching stats: %s", self.stats.summary())
@@ -0,0 +1,150 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Micro-benchmarks of the NER service, from the repository root, e.g.
+PYTHONPATH=./ python Converse/nlu/ner_converse/benchmark.py aggregator --model_path NER_MODEL_PATH
+PYTHONPATH=./ python Converse/nlu/ner_converse/benchmark.py client
+"""
+
+import argparse
+import json
+import random
+import time
+from concurrent import futures
+
+WORDS = (
+    "book a table for two tomorrow at 7pm my email is jane@example.com "
+    "ship it to 415 mission street san francisco call me on friday morning "
+    "i want 3 tickets for next monday it costs 20 dollars the second one"
+).split()
+
+
+def synthetic_utterances(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(3, 20))) for _ in range(n)]
+
+
+def latencies_ms(fn, utterances, warmup=10):
+    for utt in utterances[:warmup]:
+        fn(utt)
+    latencies = []
+    for utt in utterances:
+        start = time.perf_counter()
+        fn(utt)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies.sort()
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+    }
+
+
+def bench_aggregator(model_path, n_utterances, port):
+    """
+    Latency of the aggregator with the NER model behind a loopback gRPC call,
+    against the NER model loaded in the aggregator process. The remote NER
+    server runs in this process, so the difference is the wire round trip.
+    """
+    import grpc
+
+    from aggr import Aggregator, ParseRequest
+    from server import NERApplication
+    from tinybert_ner import NerPredictor
+
+    predictor = NerPredictor(model_path=model_path)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    NERApplication(predictor).add_servicer_to_server(server)
+    server.add_insecure_port("[::]:" + str(port))
+    server.start()
+
+    utterances = synthetic_utterances(n_utterances)
+    results = {}
+    try:
+        for mode, aggr in [
+            ("remote", Aggregator(ner_port="localhost:" + str(port))),
+            ("embedded", Aggregator(ner_predictor=predictor)),
+        ]:
+            results[mode] = {
+                "ner_parse_ms": latencies_ms(
+                    lambda utt: aggr.ner_parse(ParseRequest(utt)), utterances
+                ),
+                "parse_ms": latencies_ms(aggr.parse, utterances),
+            }
+            aggr.executor.shutdown()
+    finally:
+        server.stop(0)
+    return results
+
+
+def synthetic_response(n_entities, seed=0):
+    from Converse.nlu.ner_converse.proto import ner_pb2
+
+    rng = random.Random(seed)
+    response = ner_pb2.NERPredictionResponse(success=True)
+    for _ in range(n_entities):
+        token = rng.choice(WORDS)
+        start = rng.randint(0, 100)
+        prediction = response.probabilities.add(
+            label=rng.choice(["DATE", "GPE", "PERSON", "DUCKLING/time"]),
+            probability=rng.random(),
+            token=token,
+        )
+        if rng.random() < 0.3:
+            prediction.normalizedValue = "2021-01-15T13:00:00.000Z"
+        prediction.span.start = start
+        prediction.span.end = start + len(token)
+    return response
+
+
+def bench_client(sizes, repeats):
+    """
+    Microseconds per call spent by the NER client on a response of n entities,
+    the JSON round trip of the previous client against NERResult
+    """
+    from google.protobuf.json_format import MessageToJson
+
+    from Converse.nlu.ner_converse.client import NERResult
+
+    results = {}
+    for n_entities in sizes:
+        response = synthetic_response(n_entities)
+        timings = {}
+        for name, convert in [
+            ("json", lambda: json.loads(MessageToJson(response))),
+            ("typed", lambda: NERResult.from_proto(response)),
+        ]:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                convert()
+            timings[name + "_us"] = (time.perf_counter() - start) / repeats * 1e6
+        timings["speedup"] = timings["json_us"] / timings["typed_us"]
+        results[n_entities] = timings
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    aggregator = subparsers.add_parser(
+        "aggregator", help="remote against embedded NER in the aggregator"
+    )
+    aggregator.add_argument("--model_path", type=str, required=True)
+    aggregator.add_argument("--n_utterances", type=int, default=500)
+    aggregator.add_argument("--port", type=int, default=8095)
+    client = subparsers.add_parser(
+        "client", help="NER client overhead per call by number of entities"
+    )
+    client.add_argument("--sizes", type=int, nargs="+", default=[0, 2, 8, 32])
+    client.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "aggregator":
+        results = bench_aggregator(args.model_path, args.n_utterances, args.port)
+    elif args.command == "client":
+        results = bench_client(args.sizes, args.repeats)
+    print(json.dumps(results, indent=2))
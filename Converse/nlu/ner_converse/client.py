@@ -4,12 +4,187 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import struct
+
 import grpc
 
 from Converse.nlu.ner_converse.proto import ner_pb2, ner_pb2_grpc
+from Converse.utils.aio_channels import LoopChannels
+
+
+def shortest_float(value: float) -> float:
+    """
+    Shortest decimal that is the same float32, what the JSON form of a float
+    field holds, e.g. 0.99196035 rather than 0.991960346698761
+    """
+    packed = struct.pack("<f", value)
+    for precision in range(6, 10):
+        rounded = float("{0:.{1}g}".format(value, precision))
+        if struct.pack("<f", rounded) == packed:
+            return rounded
+    return value
+
+
+class _Result:
+    """
+    Typed result that also reads like the JSON form of the message: a field is
+    a key only when it is set to a non-default value. The slots starting with
+    an underscore are not fields.
+    """
+
+    __slots__ = ()
+
+    def keys(self):
+        return [
+            name
+            for name in self.__slots__
+            if not name.startswith("_") and getattr(self, name)
+        ]
+
+    def items(self):
+        return [(name, self._value(name)) for name in self.keys()]
+
+    def _value(self, name):
+        """ The value of a field in the JSON form """
+        return getattr(self, name)
+
+    def __contains__(self, name):
+        return (
+            name in self.__slots__
+            and not name.startswith("_")
+            and bool(getattr(self, name))
+        )
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        return self._value(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def get(self, name, default=None):
+        return self._value(name) if name in self else default
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def copy(self):
+        result = object.__new__(type(self))
+        for name in self.__slots__:
+            setattr(result, name, getattr(self, name))
+        return result
+
+    def to_dict(self) -> dict:
+        """ Same as json.loads(MessageToJson(message)) """
+        res = {}
+        for name, value in self.items():
+            if isinstance(value, _Result):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = [v.to_dict() for v in value]
+            res[name] = value
+        return res
+
+    def __eq__(self, other):
+        if isinstance(other, (_Result, dict)):
+            return self.to_dict() == (
+                other.to_dict() if isinstance(other, _Result) else other
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class NERSpan(_Result):
+    __slots__ = ("start", "end")
+
+    def __init__(self, start=0, end=0):
+        self.start = start
+        self.end = end
 
-import json
-from google.protobuf.json_format import MessageToJson
+
+class NEREntity(_Result):
+    """
+    The probability attribute is the float32 of the message as is, it is
+    rounded to its JSON form on the first read through the mapping.
+    """
+
+    __slots__ = (
+        "label",
+        "probability",
+        "token",
+        "normalizedValue",
+        "span",
+        "_json_probability",
+    )
+
+    def __init__(
+        self, label="", probability=0.0, token="", normalizedValue="", span=None
+    ):
+        self.label = label
+        self.probability = probability
+        self.token = token
+        self.normalizedValue = normalizedValue
+        self.span = span
+        # (float32 probability, its JSON form once read) for a message
+        self._json_probability = None
+
+    def _value(self, name):
+        value = getattr(self, name)
+        if name != "probability" or self._json_probability is None:
+            return value
+        float32, json_value = self._json_probability
+        # a probability set since is read as is
+        if value != float32:
+            return value
+        if json_value is None:
+            json_value = shortest_float(float32)
+            self._json_probability = (float32, json_value)
+        return json_value
+
+    @classmethod
+    def from_proto(cls, prediction: ner_pb2.NERPredictions) -> "NEREntity":
+        span = None
+        if prediction.HasField("span"):
+            span = NERSpan(prediction.span.start, prediction.span.end)
+        entity = cls(
+            prediction.label,
+            prediction.probability,
+            prediction.token,
+            prediction.normalizedValue,
+            span,
+        )
+        entity._json_probability = (prediction.probability, None)
+        return entity
+
+
+class NERResult(_Result):
+    """
+    Result of the NER client. The fields are those of NERPredictionResponse,
+    probabilities is the list of NEREntity.
+    """
+
+    __slots__ = ("success", "error", "probabilities", "normalizedValue")
+
+    def __init__(self, success=False, error="", probabilities=None, normalizedValue=""):
+        self.success = success
+        self.error = error
+        self.probabilities = probabilities if probabilities is not None else []
+        self.normalizedValue = normalizedValue
+
+    @classmethod
+    def from_proto(cls, response: ner_pb2.NERPredictionResponse) -> "NERResult":
+        return cls(
+            response.success,
+            response.error,
+            [NEREntity.from_proto(p) for p in response.probabilities],
+            response.normalizedValue,
+        )
 
 
 class NER:
@@ -21,13 +196,37 @@ class NER:
         self.stub = ner_pb2_grpc.NERPredictorServiceStub(channel)
         print("Done")
 
-    def __call__(self, context, **kwargs):
+    def __call__(self, context, timeout: float = None, **kwargs) -> NERResult:
+        """ timeout: seconds the gRPC request may take """
+        request = ner_pb2.NERPredictionRequest(
+            document=bytes(context, "utf-8"), **kwargs
+        )
+        return NERResult.from_proto(self.stub.predict(request, timeout=timeout))
+
+
+class AsyncNER:
+    """
+    grpc.aio variant of the NER client, calls are coroutines so that a turn
+    can query several models concurrently.
+    """
+
+    def __init__(self, service_channel: str):
+        self.channels = LoopChannels(
+            service_channel, ner_pb2_grpc.NERPredictorServiceStub
+        )
+
+    def loop_stub(self):
+        return self.channels.stub()
+
+    async def close(self):
+        """ Close the channel of the running event loop """
+        await self.channels.close()
+
+    async def __call__(self, context, **kwargs) -> NERResult:
         request = ner_pb2.NERPredictionRequest(
             document=bytes(context, "utf-8"), **kwargs
         )
-        output = self.stub.predict(request)
-        output = json.loads(MessageToJson(output))
-        return output
+        return NERResult.from_proto(await self.loop_stub().predict(request))
 
 
 if __name__ == "__main__":
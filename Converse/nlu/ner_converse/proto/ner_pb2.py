@@ -8,9 +8,6 @@
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # source: ner.proto
 
-import sys
-
-_b = sys.version_info[0] < 3 and (lambda x: x) or (lambda x: x.encode("latin1"))
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
 from google.protobuf import reflection as _reflection
@@ -26,9 +23,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
     package="",
     syntax="proto3",
     serialized_options=None,
-    serialized_pb=_b(
-        '\n\tner.proto"\xa5\x01\n\x14NERPredictionRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x10\n\x08\x64ocument\x18\x02 \x01(\x0c\x12\x16\n\x0enormalizeToken\x18\x03 \x01(\x08\x12\x19\n\x11normalizeSentence\x18\x04 \x01(\x08\x12\x12\n\nreturnSpan\x18\x05 \x01(\x08\x12\x10\n\x08timeZone\x18\x06 \x01(\t\x12\x10\n\x08language\x18\x07 \x01(\t"x\n\x15NERPredictionResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12&\n\rprobabilities\x18\x03 \x03(\x0b\x32\x0f.NERPredictions\x12\x17\n\x0fnormalizedValue\x18\x04 \x01(\t"t\n\x0eNERPredictions\x12\r\n\x05label\x18\x01 \x01(\t\x12\x13\n\x0bprobability\x18\x02 \x01(\x02\x12\r\n\x05token\x18\x03 \x01(\t\x12\x17\n\x0fnormalizedValue\x18\x04 \x01(\t\x12\x16\n\x04span\x18\x05 \x01(\x0b\x32\x08.NerSpan"%\n\x07NerSpan\x12\r\n\x05start\x18\x01 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x02 \x01(\x05\x32Q\n\x13NERPredictorService\x12:\n\x07predict\x12\x15.NERPredictionRequest\x1a\x16.NERPredictionResponse"\x00\x62\x06proto3'
-    ),
+    serialized_pb=b'\n\tner.proto"\xa5\x01\n\x14NERPredictionRequest\x12\x10\n\x08model_id\x18\x01 \x01(\t\x12\x10\n\x08\x64ocument\x18\x02 \x01(\x0c\x12\x16\n\x0enormalizeToken\x18\x03 \x01(\x08\x12\x19\n\x11normalizeSentence\x18\x04 \x01(\x08\x12\x12\n\nreturnSpan\x18\x05 \x01(\x08\x12\x10\n\x08timeZone\x18\x06 \x01(\t\x12\x10\n\x08language\x18\x07 \x01(\t"x\n\x15NERPredictionResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12&\n\rprobabilities\x18\x03 \x03(\x0b\x32\x0f.NERPredictions\x12\x17\n\x0fnormalizedValue\x18\x04 \x01(\t"B\n\x19NERPredictionBatchRequest\x12\x11\n\tdocuments\x18\x01 \x03(\x0c\x12\x12\n\nreturnSpan\x18\x02 \x01(\x08"G\n\x1aNERPredictionBatchResponse\x12)\n\tresponses\x18\x01 \x03(\x0b\x32\x16.NERPredictionResponse"t\n\x0eNERPredictions\x12\r\n\x05label\x18\x01 \x01(\t\x12\x13\n\x0bprobability\x18\x02 \x01(\x02\x12\r\n\x05token\x18\x03 \x01(\t\x12\x17\n\x0fnormalizedValue\x18\x04 \x01(\t\x12\x16\n\x04span\x18\x05 \x01(\x0b\x32\x08.NerSpan"%\n\x07NerSpan\x12\r\n\x05start\x18\x01 \x01(\x05\x12\x0b\n\x03\x65nd\x18\x02 \x01(\x05\x32\x9c\x01\n\x13NERPredictorService\x12:\n\x07predict\x12\x15.NERPredictionRequest\x1a\x16.NERPredictionResponse"\x00\x12I\n\x0cpredictBatch\x12\x1a.NERPredictionBatchRequest\x1a\x1b.NERPredictionBatchResponse"\x00\x62\x06proto3',
 )
 
 
@@ -48,7 +43,7 @@ _NERPREDICTIONREQUEST = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -66,7 +61,7 @@ _NERPREDICTIONREQUEST = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b(""),
+            default_value=b"",
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -138,7 +133,7 @@ _NERPREDICTIONREQUEST = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -156,7 +151,7 @@ _NERPREDICTIONREQUEST = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -213,7 +208,7 @@ _NERPREDICTIONRESPONSE = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -249,7 +244,7 @@ _NERPREDICTIONRESPONSE = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -272,6 +267,102 @@ _NERPREDICTIONRESPONSE = _descriptor.Descriptor(
 )
 
 
+_NERPREDICTIONBATCHREQUEST = _descriptor.Descriptor(
+    name="NERPredictionBatchRequest",
+    full_name="NERPredictionBatchRequest",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="documents",
+            full_name="NERPredictionBatchRequest.documents",
+            index=0,
+            number=1,
+            type=12,
+            cpp_type=9,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+        _descriptor.FieldDescriptor(
+            name="returnSpan",
+            full_name="NERPredictionBatchRequest.returnSpan",
+            index=1,
+            number=2,
+            type=8,
+            cpp_type=7,
+            label=1,
+            has_default_value=False,
+            default_value=False,
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=303,
+    serialized_end=369,
+)
+
+
+_NERPREDICTIONBATCHRESPONSE = _descriptor.Descriptor(
+    name="NERPredictionBatchResponse",
+    full_name="NERPredictionBatchResponse",
+    filename=None,
+    file=DESCRIPTOR,
+    containing_type=None,
+    fields=[
+        _descriptor.FieldDescriptor(
+            name="responses",
+            full_name="NERPredictionBatchResponse.responses",
+            index=0,
+            number=1,
+            type=11,
+            cpp_type=10,
+            label=3,
+            has_default_value=False,
+            default_value=[],
+            message_type=None,
+            enum_type=None,
+            containing_type=None,
+            is_extension=False,
+            extension_scope=None,
+            serialized_options=None,
+            file=DESCRIPTOR,
+        ),
+    ],
+    extensions=[],
+    nested_types=[],
+    enum_types=[],
+    serialized_options=None,
+    is_extendable=False,
+    syntax="proto3",
+    extension_ranges=[],
+    oneofs=[],
+    serialized_start=371,
+    serialized_end=442,
+)
+
+
 _NERPREDICTIONS = _descriptor.Descriptor(
     name="NERPredictions",
     full_name="NERPredictions",
@@ -288,7 +379,7 @@ _NERPREDICTIONS = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -324,7 +415,7 @@ _NERPREDICTIONS = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -342,7 +433,7 @@ _NERPREDICTIONS = _descriptor.Descriptor(
             cpp_type=9,
             label=1,
             has_default_value=False,
-            default_value=_b("").decode("utf-8"),
+            default_value=b"".decode("utf-8"),
             message_type=None,
             enum_type=None,
             containing_type=None,
@@ -378,8 +469,8 @@ _NERPREDICTIONS = _descriptor.Descriptor(
     syntax="proto3",
     extension_ranges=[],
     oneofs=[],
-    serialized_start=303,
-    serialized_end=419,
+    serialized_start=444,
+    serialized_end=560,
 )
 
 
@@ -435,14 +526,23 @@ _NERSPAN = _descriptor.Descriptor(
     syntax="proto3",
     extension_ranges=[],
     oneofs=[],
-    serialized_start=421,
-    serialized_end=458,
+    serialized_start=562,
+    serialized_end=599,
 )
 
 _NERPREDICTIONRESPONSE.fields_by_name["probabilities"].message_type = _NERPREDICTIONS
+_NERPREDICTIONBATCHRESPONSE.fields_by_name[
+    "responses"
+].message_type = _NERPREDICTIONRESPONSE
 _NERPREDICTIONS.fields_by_name["span"].message_type = _NERSPAN
 DESCRIPTOR.message_types_by_name["NERPredictionRequest"] = _NERPREDICTIONREQUEST
 DESCRIPTOR.message_types_by_name["NERPredictionResponse"] = _NERPREDICTIONRESPONSE
+DESCRIPTOR.message_types_by_name[
+    "NERPredictionBatchRequest"
+] = _NERPREDICTIONBATCHREQUEST
+DESCRIPTOR.message_types_by_name[
+    "NERPredictionBatchResponse"
+] = _NERPREDICTIONBATCHRESPONSE
 DESCRIPTOR.message_types_by_name["NERPredictions"] = _NERPREDICTIONS
 DESCRIPTOR.message_types_by_name["NerSpan"] = _NERSPAN
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
@@ -469,6 +569,28 @@ NERPredictionResponse = _reflection.GeneratedProtocolMessageType(
 )
 _sym_db.RegisterMessage(NERPredictionResponse)
 
+NERPredictionBatchRequest = _reflection.GeneratedProtocolMessageType(
+    "NERPredictionBatchRequest",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _NERPREDICTIONBATCHREQUEST,
+        "__module__": "ner_pb2"
+        # @@protoc_insertion_point(class_scope:NERPredictionBatchRequest)
+    },
+)
+_sym_db.RegisterMessage(NERPredictionBatchRequest)
+
+NERPredictionBatchResponse = _reflection.GeneratedProtocolMessageType(
+    "NERPredictionBatchResponse",
+    (_message.Message,),
+    {
+        "DESCRIPTOR": _NERPREDICTIONBATCHRESPONSE,
+        "__module__": "ner_pb2"
+        # @@protoc_insertion_point(class_scope:NERPredictionBatchResponse)
+    },
+)
+_sym_db.RegisterMessage(NERPredictionBatchResponse)
+
 NERPredictions = _reflection.GeneratedProtocolMessageType(
     "NERPredictions",
     (_message.Message,),
@@ -498,8 +620,8 @@ _NERPREDICTORSERVICE = _descriptor.ServiceDescriptor(
     file=DESCRIPTOR,
     index=0,
     serialized_options=None,
-    serialized_start=460,
-    serialized_end=541,
+    serialized_start=602,
+    serialized_end=758,
     methods=[
         _descriptor.MethodDescriptor(
             name="predict",
@@ -510,6 +632,15 @@ _NERPREDICTORSERVICE = _descriptor.ServiceDescriptor(
             output_type=_NERPREDICTIONRESPONSE,
             serialized_options=None,
         ),
+        _descriptor.MethodDescriptor(
+            name="predictBatch",
+            full_name="NERPredictorService.predictBatch",
+            index=1,
+            containing_service=None,
+            input_type=_NERPREDICTIONBATCHREQUEST,
+            output_type=_NERPREDICTIONBATCHRESPONSE,
+            serialized_options=None,
+        ),
     ],
 )
 _sym_db.RegisterServiceDescriptor(_NERPREDICTORSERVICE)
@@ -27,6 +27,11 @@ class NERPredictorServiceStub(object):
             request_serializer=ner_pb2.NERPredictionRequest.SerializeToString,
             response_deserializer=ner_pb2.NERPredictionResponse.FromString,
         )
+        self.predictBatch = channel.unary_unary(
+            "/NERPredictorService/predictBatch",
+            request_serializer=ner_pb2.NERPredictionBatchRequest.SerializeToString,
+            response_deserializer=ner_pb2.NERPredictionBatchResponse.FromString,
+        )
 
 
 class NERPredictorServiceServicer(object):
@@ -42,6 +47,13 @@ class NERPredictorServiceServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def predictBatch(self, request, context):
+        # missing associated documentation comment in .proto file
+        pass
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_NERPredictorServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -50,6 +62,11 @@ def add_NERPredictorServiceServicer_to_server(servicer, server):
             request_deserializer=ner_pb2.NERPredictionRequest.FromString,
             response_serializer=ner_pb2.NERPredictionResponse.SerializeToString,
         ),
+        "predictBatch": grpc.unary_unary_rpc_method_handler(
+            servicer.predictBatch,
+            request_deserializer=ner_pb2.NERPredictionBatchRequest.FromString,
+            response_serializer=ner_pb2.NERPredictionBatchResponse.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "NERPredictorService", rpc_method_handlers
@@ -12,6 +12,7 @@ import time
 import logging
 import argparse
 from tinybert_ner import NerPredictor
+from batcher import BatchingNerPredictor
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(name)s -   %(message)s",
@@ -58,9 +59,50 @@ if __name__ == "__main__":
     parser.add_argument(
         "--model_path", type=str, default="./models/tinybert_6l", required=False
     )
+    parser.add_argument(
+        "--fast_tokenizer",
+        action="store_true",
+        help="tokenize with BertTokenizerFast and its character offsets",
+    )
+    parser.add_argument(
+        "--batch_wait_ms",
+        type=float,
+        default=0,
+        help="coalesce concurrent requests arriving within this window, "
+        "0 disables batching",
+    )
+    parser.add_argument(
+        "--batch_max_size",
+        type=int,
+        default=64,
+        help="maximum number of texts tagged in one forward pass",
+    )
+    parser.add_argument(
+        "--window_size",
+        type=int,
+        default=128,
+        help="longer texts are tagged in overlapping windows of this many tokens",
+    )
+    parser.add_argument(
+        "--window_stride",
+        type=int,
+        default=96,
+        help="tokens between the starts of two consecutive windows",
+    )
     args = parser.parse_args()
 
-    predictor = NerPredictor(model_path=args.model_path)
+    predictor = NerPredictor(
+        model_path=args.model_path,
+        fast_tokenizer=args.fast_tokenizer,
+        window_size=args.window_size,
+        window_stride=args.window_stride,
+    )
+    if args.batch_wait_ms > 0:
+        predictor = BatchingNerPredictor(
+            predictor,
+            max_wait_ms=args.batch_wait_ms,
+            max_batch_size=args.batch_max_size,
+        )
     logger.info("NER server is running on port {}.".format(8090))
     grpc_application = NERApplication(predictor=predictor)
     grpc_application.run()
@@ -21,3 +21,16 @@ class NerServicer(ner_pb2_grpc.NERPredictorServiceServicer):
             response.success = False
             response.error = str(e)
         return response
+
+    def predictBatch(self, request, context):
+        try:
+            texts = [document.decode("utf-8") for document in request.documents]
+            responses = self.predictor.predict_batch(texts, request.returnSpan)
+        except Exception as e:
+            responses = []
+            for _ in request.documents:
+                response = ner_pb2.NERPredictionResponse()
+                response.success = False
+                response.error = str(e)
+                responses.append(response)
+        return ner_pb2.NERPredictionBatchResponse(responses=responses)
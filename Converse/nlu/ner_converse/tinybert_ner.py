@@ -4,6 +4,7 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import numpy as np
 import transformers
 import torch
 import torch.nn.functional as F
@@ -54,8 +55,30 @@ class NerAddrParser(transformers.BertPreTrainedModel):
 
 
 class NerPredictor:
-    def __init__(self, model_path="./model/tinybert_6l"):
-        self.max_seq_length = 128
+    def __init__(
+        self,
+        model_path="./model/tinybert_6l",
+        fast_tokenizer=False,
+        window_size=128,
+        window_stride=96,
+    ):
+        """
+        :param fast_tokenizer: tokenize with the Rust BertTokenizerFast, which
+            returns the character offsets of the tokens, instead of realigning
+            the tokens of BertTokenizer to the text with token_align
+        :param window_size: longer texts are tagged in overlapping windows of
+            window_size tokens, including [CLS] and [SEP]
+        :param window_stride: number of tokens between the starts of two
+            consecutive windows, at most window_size - 2
+        """
+        if not 0 < window_stride <= window_size - 2:
+            raise ValueError(
+                "window_stride must be in [1, window_size - 2], got {}".format(
+                    window_stride
+                )
+            )
+        self.max_seq_length = window_size
+        self.window_stride = window_stride
         self.per_gpu_eval_batch_size = 64
         self.do_lower_case = True
 
@@ -75,12 +98,21 @@ class NerPredictor:
         self.model.to(self.device)
         self.model.eval()
 
-        self.tokenizer = transformers.BertTokenizer.from_pretrained(
-            model_path, do_lower_case=True
+        self.fast_tokenizer = fast_tokenizer
+        tokenizer_class = (
+            transformers.BertTokenizerFast
+            if fast_tokenizer
+            else transformers.BertTokenizer
         )
+        self.tokenizer = tokenizer_class.from_pretrained(model_path, do_lower_case=True)
 
         self.id2tag = model_config["id2tag_ner"]
         self.id2tag_addr = model_config["id2tag_addr"]
+        self.labels_ner, self.codes_ner = self.entity_labels(self.id2tag)
+        ## the recipient tag detected by the address parser is ignored
+        self.labels_addr, self.codes_addr = self.entity_labels(
+            self.id2tag_addr, ignore=("Recipient",)
+        )
         self.session_id = 0
         self.mask_id = model_config["mask_id"]
         self.cls_id = self.tokenizer.cls_token_id
@@ -103,6 +135,22 @@ class NerPredictor:
         token_starts, token_ends = self.token_align(tokens, text.lower())
         return text, token_ids, token_starts, token_ends
 
+    def texts2ids(self, texts):
+        """ text2id of several texts, tokenized in one call by the fast tokenizer """
+        if not self.fast_tokenizer:
+            return [self.text2id(text) for text in texts]
+        encodings = self.tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True
+        )
+        batch = []
+        for text, token_ids, offsets in zip(
+            texts, encodings["input_ids"], encodings["offset_mapping"]
+        ):
+            token_starts = [start for start, _ in offsets]
+            token_ends = [end for _, end in offsets]
+            batch.append((text, token_ids, token_starts, token_ends))
+        return batch
+
     def token_align(self, tokens, text):
         ### two pointer problem
         ## pointer p1 points to the tokens
@@ -174,7 +222,12 @@ class NerPredictor:
         probs, preds = torch.max(scores, 2)
         probs_addr, preds_addr = torch.max(scores_addr, 2)
 
-        return probs.tolist(), preds.tolist(), probs_addr.tolist(), preds_addr.tolist()
+        return (
+            probs.cpu().numpy(),
+            preds.cpu().numpy(),
+            probs_addr.cpu().numpy(),
+            preds_addr.cpu().numpy(),
+        )
 
     def generate_entity(
         self,
@@ -219,123 +272,128 @@ class NerPredictor:
         return pred
 
     @staticmethod
-    def is_entity(tag_prev, tag_cur):
-        token_change = tag_cur != tag_prev
-        return (
-            token_change and (tag_cur != "O"),
-            token_change and (tag_prev != "O") and (tag_prev is not None),
-        )
-
-    def decode_entities(
-        self, text, token_starts, token_ends, preds, probabilities, return_span
-    ):
-        tags = [self.id2tag[x] for x in preds]
-        predictions = []
-        start_idx, end_idx = -1, -1
-        tag_prev, prob_prev = None, None
-        for token_start, token_end, tag, prob in zip(
-            token_starts, token_ends, tags, probabilities
-        ):
-            # token = text[token_start:token_end]
+    def entity_labels(id2tag, ignore=()):
+        """
+        Entity label of each tag id without the B-/I- prefix, and the code of
+        the label for vectorized decoding, -1 for "O" and the ignored tags
+        """
+        labels, codes = [], []
+        for tag_id in range(len(id2tag)):
+            tag = id2tag[tag_id]
+            if any(name in tag for name in ignore):
+                tag = "O"
             if "-" in tag:
                 tag = tag.split("-")[1]
             elif "_" in tag:
                 tag = tag.split("_")[1]
+            if tag == "O":
+                codes.append(-1)
+                continue
+            if tag not in labels:
+                labels.append(tag)
+            codes.append(labels.index(tag))
+        return labels, np.array(codes, dtype=np.int64)
 
-            # if token.startswith('##'):
-            #     end_idx = token_end
-            #     continue
-            if token_start == end_idx:
-                tag = tag_prev
-
-            is_begin, is_end = self.is_entity(tag_prev, tag)
-
-            # note there are cases when both is_begin and is_end are true. For example, LOC, LOC, DATE.
-            # In this case DATE is both the end of the previous entity and the beginning of the current entity
-            # In this case is_end has to be processed first
-            if is_end:
-                if end_idx is None:  ## take care of [UNK] tokens
-                    end_idx = token_start
-                entity = self.generate_entity(
-                    text=text,
-                    tag=tag_prev,
-                    probability=prob_prev,
-                    start=start_idx,
-                    end=end_idx,
-                    return_span=return_span,
-                )
-                predictions.append(entity)
-                tag_prev, prob_prev = None, None
-
-            if is_begin:
-                tag_prev, prob_prev, start_idx = tag, prob, token_start
+    @staticmethod
+    def entity_runs(token_starts, token_ends, codes):
+        """
+        Find the entities in the label codes of the tokens. A token starting
+        where the previous one ends, a word piece or punctuation, takes the
+        label of the first token of its word. An entity is a run of tokens of
+        the same label, the B-/I- prefixes are ignored.
+        :param token_ends: None for the [UNK] tokens of token_align
+        :return: index of the first token, index of the last token and label
+            code of each entity
+        """
+        n = len(codes)
+        starts = np.asarray(token_starts, dtype=np.int64)
+        ends = np.array([-1 if end is None else end for end in token_ends], np.int64)
+        word_starts = np.arange(n)
+        word_starts[1:][starts[1:] == ends[:-1]] = 0
+        labels = codes[np.maximum.accumulate(word_starts)]
+
+        boundaries = np.flatnonzero(np.diff(labels)) + 1
+        first = np.concatenate(([0], boundaries))
+        last = np.concatenate((boundaries - 1, [n - 1]))
+        is_entity = labels[first] != -1
+        return first[is_entity], last[is_entity], labels[first[is_entity]]
 
-            end_idx = token_end
+    @staticmethod
+    def entity_end(token_starts, token_ends, last):
+        """ Character end of an entity, up to the next token after an [UNK] """
+        end = token_ends[last]
+        if end is None:
+            end = token_starts[min(last + 1, len(token_starts) - 1)]
+        return end
 
-        # check if there is any entity in the cache. if so record it
-        if tag_prev is not None:
-            if end_idx is None:  ## take care of [UNK] tokens
-                end_idx = token_start
-            entity = self.generate_entity(
+    def decode_entities(
+        self, text, token_starts, token_ends, preds, probabilities, return_span
+    ):
+        if len(preds) == 0:
+            return []
+        first, last, labels = self.entity_runs(
+            token_starts, token_ends, self.codes_ner[preds]
+        )
+        return [
+            self.generate_entity(
                 text=text,
-                tag=tag_prev,
-                probability=prob_prev,
-                start=start_idx,
-                end=end_idx,
+                tag=self.labels_ner[label],
+                probability=float(probabilities[i]),
+                start=token_starts[i],
+                end=self.entity_end(token_starts, token_ends, j),
                 return_span=return_span,
             )
-            predictions.append(entity)
-
-        return predictions
+            for i, j, label in zip(first.tolist(), last.tolist(), labels.tolist())
+        ]
 
     def decode_entities_addr(
         self, text, token_starts, token_ends, preds_addr, probabilities, return_span
     ):
-        tags = [
-            self.id2tag_addr[x] if "Recipient" not in self.id2tag_addr[x] else "O"
-            for x in preds_addr
-        ]  ## remove the recipient tag detected by the address parser
-        predictions = []
-        tags_cache, start_idx_cache, end_idx_cache, probs_cache, token_prev = (
-            [],
-            [],
-            [],
-            1.0,
-            None,
-        )
-        start_idx, end_idx = -1, -1
-        tag_prev, prob_prev = None, None
-        for token_start, token_end, tag, prob in zip(
-            token_starts, token_ends, tags, probabilities
-        ):
-            if "-" in tag:
-                tag = tag.split("-")[1]
-            elif "_" in tag:
-                tag = tag.split("_")[1]
-
-            if token_start == end_idx:
-                tag = tag_prev
-
-            is_begin, is_end = self.is_entity(tag_prev, tag)
-
-            # note there are cases when both is_begin and is_end are true. For example, LOC, LOC, DATE.
-            # In this case DATE is both the end of the previous entity and the beginning of the current entity
-            # In this case is_end has to be processed first
-            if is_end:
-                if end_idx is None:  ## take care of [UNK] tokens
-                    end_idx = token_start
+        """
+        Address components separated by one character, or following a comma,
+        are merged into one AP/LOCATION entity
+        """
+        if len(preds_addr) == 0:
+            return []
+        codes = self.codes_addr[preds_addr]
+        first, last, labels = self.entity_runs(token_starts, token_ends, codes)
 
-                if (
-                    (not end_idx_cache)
-                    or (start_idx == end_idx_cache[-1] + 1)
-                    or (token_prev == ",")
-                ):
-                    tags_cache.append(tag_prev)
+        predictions = []
+        tags_cache, start_idx_cache, end_idx_cache, probs_cache = [], [], [], 1.0
+        for i, j, label in zip(first.tolist(), last.tolist(), labels.tolist()):
+            tag, prob = self.labels_addr[label], float(probabilities[i])
+            start_idx = token_starts[i]
+            end_idx = self.entity_end(token_starts, token_ends, j)
+            if j == len(codes) - 1:
+                # the text ends with this component
+                if (not end_idx_cache) or (start_idx == end_idx_cache[-1] + 1):
+                    tags_cache.append(tag)
                     start_idx_cache.append(start_idx)
                     end_idx_cache.append(end_idx)
-                    probs_cache *= prob_prev
-                else:
-                    entity = self.generate_entity_addr(
+                    probs_cache *= prob
+                if tags_cache:
+                    predictions.append(
+                        self.generate_entity_addr(
+                            text=text,
+                            tag_cache=tags_cache,
+                            probability=probs_cache,
+                            start_cache=start_idx_cache,
+                            end_cache=end_idx_cache,
+                            return_span=return_span,
+                        )
+                    )
+            elif (
+                (not end_idx_cache)
+                or (start_idx == end_idx_cache[-1] + 1)
+                or (text[token_starts[j] : token_ends[j]] == ",")
+            ):
+                tags_cache.append(tag)
+                start_idx_cache.append(start_idx)
+                end_idx_cache.append(end_idx)
+                probs_cache *= prob
+            else:
+                predictions.append(
+                    self.generate_entity_addr(
                         text=text,
                         tag_cache=tags_cache,
                         probability=probs_cache,
@@ -343,40 +401,15 @@ class NerPredictor:
                         end_cache=end_idx_cache,
                         return_span=return_span,
                     )
-                    tags_cache, start_idx_cache, end_idx_cache, probs_cache = (
-                        [tag],
-                        [start_idx],
-                        [end_idx],
-                        prob_prev,
-                    )
-                    predictions.append(entity)
-                tag_prev, prob_prev = None, None
-
-            if is_begin:
-                tag_prev, prob_prev, start_idx = tag, prob, token_start
-
-            end_idx = token_end
-            token_prev = text[token_start:token_end]
-
-        # check if there is any entity in the cache. if so record it
-        if tag_prev is not None:
-            if end_idx is None:  ## take care of [UNK] tokens
-                end_idx = token_start
-            if (not end_idx_cache) or (start_idx == end_idx_cache[-1] + 1):
-                tags_cache.append(tag_prev)
-                start_idx_cache.append(start_idx)
-                end_idx_cache.append(end_idx)
-                probs_cache *= prob_prev
-            if tags_cache:
-                entity = self.generate_entity_addr(
-                    text=text,
-                    tag_cache=tags_cache,
-                    probability=probs_cache,
-                    start_cache=start_idx_cache,
-                    end_cache=end_idx_cache,
-                    return_span=return_span,
                 )
-                predictions.append(entity)
+                # the new cache starts with the label of the token after the component
+                next_code = codes[j + 1]
+                tags_cache, start_idx_cache, end_idx_cache, probs_cache = (
+                    ["O" if next_code == -1 else self.labels_addr[next_code]],
+                    [start_idx],
+                    [end_idx],
+                    prob,
+                )
 
         return predictions
 
@@ -415,69 +448,106 @@ class NerPredictor:
             return response
 
     def predict(self, text, return_span=True):
-        batch_id = []
-        batch_token_starts = []
-        batch_token_ends = []
-        batch_text = []
-        dynamic_batch_seq_len = 0
-        batch_seq_len = []
-        batch_span = []
-
-        text, token_ids, token_starts, token_ends = self.text2id(text)
-        batch_text.append(text)
-        batch_id.append([self.cls_id] + token_ids + [self.sep_id])
-        batch_token_starts.append(token_starts)
-        batch_token_ends.append(token_ends)
-        batch_span.append(return_span)
-        # Update dynamic batch size
-        tokens_len = len(token_ids)
-        batch_seq_len.append(tokens_len)
-        if tokens_len + 2 > dynamic_batch_seq_len:
-            dynamic_batch_seq_len = tokens_len + 2
-
-        batch_mask = []
-        # Padding & generate masks
-        for utterance_len, token_id in zip(batch_seq_len, batch_id):
-            utterance_len += 2
-            # token_id = [self.cls_id] + token_id + [self.sep_id]
-            token_id += [
-                self.mask_id for _ in range(dynamic_batch_seq_len - utterance_len)
-            ]
-            batch_mask.append(
-                [
-                    1 if idx < utterance_len else 0
-                    for idx in range(dynamic_batch_seq_len)
-                ]
+        return self.predict_batch([text], return_span)[0]
+
+    def predict_batch(self, texts, return_span=True):
+        """
+        Tag several texts with one forward pass per per_gpu_eval_batch_size
+        texts, padded to the longest text of the batch.
+        :param return_span: a bool, or one bool per text
+        :return: one NERPredictionResponse per text
+        """
+        if isinstance(return_span, bool):
+            return_span = [return_span] * len(texts)
+
+        responses = []
+        for start in range(0, len(texts), self.per_gpu_eval_batch_size):
+            end = start + self.per_gpu_eval_batch_size
+            responses.extend(
+                self.predict_chunk(texts[start:end], return_span[start:end])
             )
+        return responses
 
-        batch_id = torch.LongTensor(batch_id)
-        batch_mask = torch.LongTensor(batch_mask)
+    def windows(self, n_tokens):
+        """ (start, end) of the overlapping windows covering n_tokens tokens """
+        size = self.max_seq_length - 2
+        if n_tokens <= size:
+            return [(0, n_tokens)]
+        starts = list(range(0, n_tokens - size, self.window_stride))
+        return [(start, start + size) for start in starts + [n_tokens - size]]
+
+    def tag_windows(self, windows):
+        """ tag_entities of the token ids of the windows, padded to the longest """
+        seq_lens = torch.LongTensor([len(token_ids) + 2 for token_ids in windows])
+        dynamic_batch_seq_len = seq_lens.max().item()
+
+        # Padding & generate masks
+        batch_id = torch.full(
+            (len(windows), dynamic_batch_seq_len), self.mask_id, dtype=torch.long
+        )
+        for i, token_ids in enumerate(windows):
+            batch_id[i, : seq_lens[i]] = torch.LongTensor(
+                [self.cls_id] + token_ids + [self.sep_id]
+            )
+        batch_mask = (
+            torch.arange(dynamic_batch_seq_len).unsqueeze(0) < seq_lens.unsqueeze(1)
+        ).long()
 
         # Calls the model on GPU/CPU
-        (
-            batch_probs,
-            batch_preds,
-            batch_probs_addr,
-            batch_preds_addr,
-        ) = self.tag_entities(batch_id, batch_mask)
-
-        text = batch_text[0]
-        token_starts = batch_token_starts[0]
-        token_ends = batch_token_ends[0]
-        token_length = len(token_starts)
-
-        return self.produce_response(
-            (
-                text,
-                token_starts,
-                token_ends,
-                batch_probs[0][:token_length],
-                batch_preds[0][:token_length],
-                batch_span[0],
-                batch_probs_addr[0][:token_length],
-                batch_preds_addr[0][:token_length],
+        return self.tag_entities(batch_id, batch_mask)
+
+    def predict_chunk(self, texts, return_spans):
+        batch = self.texts2ids(texts)
+        windows = [
+            (i, start, end)
+            for i, (_, token_ids, _, _) in enumerate(batch)
+            for start, end in self.windows(len(token_ids))
+        ]
+
+        # probability and prediction of each token, for the NER and address
+        # heads, taken from the window where the token has the highest probability
+        merged = [
+            [
+                np.full(len(token_ids), -1.0, dtype=np.float32),
+                np.zeros(len(token_ids), dtype=np.int64),
+                np.full(len(token_ids), -1.0, dtype=np.float32),
+                np.zeros(len(token_ids), dtype=np.int64),
+            ]
+            for _, token_ids, _, _ in batch
+        ]
+        for w in range(0, len(windows), self.per_gpu_eval_batch_size):
+            chunk = windows[w : w + self.per_gpu_eval_batch_size]
+            outputs = self.tag_windows(
+                [batch[i][1][start:end] for i, start, end in chunk]
             )
-        )
+            for k, (i, start, end) in enumerate(chunk):
+                for head in (0, 2):
+                    probs, preds = merged[i][head], merged[i][head + 1]
+                    window_probs = outputs[head][k, : end - start]
+                    window_preds = outputs[head + 1][k, : end - start]
+                    better = window_probs > probs[start:end]
+                    probs[start:end][better] = window_probs[better]
+                    preds[start:end][better] = window_preds[better]
+
+        responses = []
+        for i, (text, _, token_starts, token_ends) in enumerate(batch):
+            token_length = len(token_starts)
+            probs, preds, probs_addr, preds_addr = merged[i]
+            responses.append(
+                self.produce_response(
+                    (
+                        text,
+                        token_starts,
+                        token_ends,
+                        probs[:token_length],
+                        preds[:token_length],
+                        return_spans[i],
+                        probs_addr[:token_length],
+                        preds_addr[:token_length],
+                    )
+                )
+            )
+        return responses
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import asyncio
+import weakref
+
+import grpc
+
+
+class LoopChannels:
+    """
+    The grpc.aio channels of a client. A channel belongs to the event loop
+    it is opened on, so a client used from several loops has one channel and
+    stub per loop, opened on first use.
+    """
+
+    def __init__(self, target: str, stub_class):
+        self.target = target
+        self.stub_class = stub_class
+        # event loop -> (channel, stub)
+        self.channels = weakref.WeakKeyDictionary()
+
+    def stub(self):
+        """ The stub of the running loop """
+        loop = asyncio.get_running_loop()
+        if loop not in self.channels:
+            # the channel of a closed loop cannot be used or closed any more
+            for closed in [other for other in self.channels if other.is_closed()]:
+                del self.channels[closed]
+            channel = grpc.aio.insecure_channel(self.target)
+            self.channels[loop] = (channel, self.stub_class(channel))
+        return self.channels[loop][1]
+
+    async def close(self):
+        """ Close the channel of the running loop """
+        channel, _ = self.channels.pop(asyncio.get_running_loop(), (None, None))
+        if channel is not None:
+            await channel.close()
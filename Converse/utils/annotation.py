@@ -0,0 +1,84 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+from typing import List, Tuple
+
+from Converse.utils.nltk_resources import (
+    pos_tag,
+    pos_tag_sents,
+    sent_tokenize,
+    word_tokenize,
+)
+
+
+class UtteranceAnnotation:
+    """
+    NLTK annotations of the user utterance of one turn. Every annotation is
+    computed on first use and then shared by the model clients and the
+    resolution steps of the info layer.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._tokens = None
+        self._pos_tags = None
+        self._lower = None
+        # sentences of the utterance and of the texts derived from it
+        self._sentences = {}  # text -> its sentences
+        self._word_pos_tags = {}  # tuple of words -> their POS tags
+
+    @classmethod
+    def batch(cls, texts: List[str]) -> List["UtteranceAnnotation"]:
+        """ Annotations of several texts, POS tagged in one tagger call """
+        annotations = [cls(text) for text in texts]
+        tagged = pos_tag_sents([annotation.tokens for annotation in annotations])
+        for annotation, tags in zip(annotations, tagged):
+            annotation._pos_tags = tags
+        return annotations
+
+    @property
+    def tokens(self) -> List[str]:
+        if self._tokens is None:
+            self._tokens = word_tokenize(self.text)
+        return self._tokens
+
+    @property
+    def pos_tags(self) -> List[Tuple[str, str]]:
+        if self._pos_tags is None:
+            self._pos_tags = pos_tag(self.tokens)
+        return self._pos_tags
+
+    @property
+    def sentences(self) -> List[str]:
+        return self.sent_tokenize(self.text)
+
+    @property
+    def lower_text(self) -> str:
+        return self.lower().text
+
+    def lower(self) -> "UtteranceAnnotation":
+        """ Annotation of the lowercase utterance, the same one if already lowercase """
+        if self._lower is None:
+            lower_text = self.text.lower()
+            self._lower = (
+                self if lower_text == self.text else UtteranceAnnotation(lower_text)
+            )
+        return self._lower
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        """ Sentences of the utterance, or of a text derived from it in this turn """
+        if text not in self._sentences:
+            self._sentences[text] = sent_tokenize(text)
+        return list(self._sentences[text])
+
+    def pos_tag(self, words: List[str]) -> List[Tuple[str, str]]:
+        """ POS tags of other words of the turn, e.g. the coreference context """
+        if self._tokens is not None and list(words) == self._tokens:
+            return self.pos_tags
+        key = tuple(words)
+        if key not in self._word_pos_tags:
+            self._word_pos_tags[key] = pos_tag(list(words))
+        return self._word_pos_tags[key]
@@ -0,0 +1,145 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from typing import List, Optional, Sequence, Tuple
+
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+from Converse.config.task_config import FAQConfig
+
+FUZZY_MATCHING = "fuzzy_matching"
+
+
+def ngrams(text: str, n: int) -> Counter:
+    return Counter(text[i : i + n] for i in range(len(text) - n + 1))
+
+
+class FAQIndex:
+    """
+    Matches an utterance to the samples of the fuzzy matching FAQs. The
+    samples are matched as thefuzz process.extract with the fuzz.ratio scorer
+    did: both sides normalized by full_process, the best score wins, the
+    first sample on ties, and a match needs a rounded score above threshold.
+
+    The index is built once per bot. A normalized sample equal to the
+    utterance is found by hashing. Otherwise the samples are shortlisted by
+    length, then by the character n-grams they share with the utterance when
+    that narrows the list down, with bounds that keep every sample able to
+    score the threshold. Only the shortlist is scored, with the threshold as
+    score cutoff.
+    """
+
+    def __init__(self, faq_config: FAQConfig, threshold: int = 90, n: int = 3):
+        self.threshold = threshold
+        self.n = n
+        # lowercased samples in config order, the answers of each sample
+        self.questions: List[str] = []
+        self.answers = {}
+        for faq in faq_config:
+            if FUZZY_MATCHING in faq_config[faq].question_match_options:
+                for question in faq_config[faq].samples:
+                    self.questions.append(question.lower())
+                    self.answers[question.lower()] = faq_config[faq].answers
+        self.processed = [full_process(question) for question in self.questions]
+        self.exact = {}
+        for idx, text in enumerate(self.processed):
+            self.exact.setdefault(text, idx)
+        # the samples sorted by length, a length band is a slice of them
+        self.order = sorted(
+            range(len(self.processed)), key=lambda idx: len(self.processed[idx])
+        )
+        self.sorted_texts = [self.processed[idx] for idx in self.order]
+        self.sorted_lengths = [len(text) for text in self.sorted_texts]
+        # n-gram -> positions in the sorted samples
+        postings = defaultdict(list)
+        for pos, text in enumerate(self.sorted_texts):
+            for gram in ngrams(text, n):
+                postings[gram].append(pos)
+        self.postings = dict(postings)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def length_band(self, length: int) -> Tuple[int, int]:
+        """
+        Slice of the sorted samples long enough and short enough to score the
+        threshold, the length difference being a lower bound of the distance
+        """
+        t = self.threshold
+        low = bisect_left(self.sorted_lengths, -(-length * t // (200 - t)))
+        high = bisect_right(self.sorted_lengths, length * (200 - t) // t)
+        return low, high
+
+    def max_distance(self, len_a: int, len_b: int) -> int:
+        """ The largest indel distance of two strings scoring the threshold """
+        return (len_a + len_b) * (100 - self.threshold) // 100
+
+    def candidates(self, text: str) -> Sequence[int]:
+        """ Positions in the sorted samples of those that may score the threshold """
+        low, high = self.length_band(len(text))
+        if low == high:
+            return []
+        # one insertion or deletion breaks at most n of the n-grams of text,
+        # a sample scoring the threshold misses at most slack of them
+        slack = self.n * self.max_distance(len(text), self.sorted_lengths[high - 1])
+        grams = ngrams(text, self.n)
+        if sum(grams.values()) > slack:
+            # so it has one of the rarest n-grams, adding up to more than slack
+            missed = 0
+            prefix = []
+            for gram in sorted(
+                grams, key=lambda gram: len(self.postings.get(gram, ()))
+            ):
+                prefix.append(self.postings.get(gram, ()))
+                missed += grams[gram]
+                if missed > slack:
+                    break
+            # the n-grams narrow down the band only if they are rare enough
+            if sum(len(positions) for positions in prefix) < (high - low) // 4:
+                return list(
+                    {
+                        pos
+                        for positions in prefix
+                        for pos in positions
+                        if low <= pos < high
+                    }
+                )
+        return range(low, high)
+
+    def match(self, utt: str) -> Optional[Tuple[str, int]]:
+        """
+        The best matching sample and its rounded score, None if no sample
+        scores above the threshold
+        """
+        if not self.questions:
+            return None
+        text = full_process(utt.lower())
+        if text in self.exact:
+            return self.questions[self.exact[text]], 100
+        candidates = self.candidates(text)
+        if isinstance(candidates, range):
+            choices = self.sorted_texts[candidates.start : candidates.stop]
+        else:
+            choices = [self.sorted_texts[pos] for pos in candidates]
+        best = None
+        for _, score, i in process.extract(
+            text,
+            choices,
+            scorer=fuzz.ratio,
+            processor=None,
+            score_cutoff=self.threshold,
+            limit=None,
+        ):
+            # the first sample in config order wins a tie
+            key = (score, -self.order[candidates[i]])
+            if best is None or key > best:
+                best = key
+        if best is None or round(best[0]) <= self.threshold:
+            return None
+        return self.questions[-best[1]], int(round(best[0]))
@@ -0,0 +1,129 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+NLTK data used by Converse, read from local directories only. The data is
+downloaded once, ahead of time, with
+python Converse/utils/nltk_resources.py --download [DIR]
+"""
+
+import os
+import threading
+import time
+from typing import List, Tuple
+
+import nltk
+from nltk.tag.perceptron import PerceptronTagger
+# sent_tokenize is imported by the callers from here, with the data resolved
+from nltk.tokenize import sent_tokenize, word_tokenize  # noqa: F401
+
+# searched before the NLTK default directories, several separated by os.pathsep
+DATA_DIR_ENV = "CONVERSE_NLTK_DATA"
+BUNDLED_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data"
+)
+RESOURCES = ["punkt", "averaged_perceptron_tagger"]
+
+
+class NLTKResources:
+    """
+    Resolves the NLTK data from the configured directories, never from the
+    network, and keeps a single loaded tagger. The serving entry points load
+    the data with warmup, otherwise it is loaded on first use.
+    """
+
+    def __init__(self, data_dirs: List[str] = None):
+        self.data_dirs = data_dirs
+        self.lock = threading.Lock()
+        self._tagger = None
+        self.warm = False
+        self.timings = {}
+
+    def search_dirs(self) -> List[str]:
+        if self.data_dirs is not None:
+            return list(self.data_dirs)
+        dirs = [d for d in os.environ.get(DATA_DIR_ENV, "").split(os.pathsep) if d]
+        return dirs + [BUNDLED_DATA_DIR]
+
+    def configure(self):
+        """ Put the data directories first in the NLTK search path """
+        for data_dir in reversed(self.search_dirs()):
+            if data_dir in nltk.data.path:
+                nltk.data.path.remove(data_dir)
+            nltk.data.path.insert(0, data_dir)
+
+    def tagger(self) -> PerceptronTagger:
+        if self._tagger is None:
+            with self.lock:
+                if self._tagger is None:
+                    self.configure()
+                    self._tagger = PerceptronTagger()
+        return self._tagger
+
+    def warmup(self) -> dict:
+        """
+        Load the tokenizer and the tagger, raises LookupError if the data is
+        not in the data directories. Returns the load times in milliseconds.
+        """
+        if self.warm:
+            return self.timings
+        start = time.perf_counter()
+        self.configure()
+        word_tokenize("Warm up the tokenizer. It loads once.")
+        tokenizer_end = time.perf_counter()
+        self.tagger().tag(["warm", "up"])
+        end = time.perf_counter()
+        self.timings.update(
+            {
+                "tokenizer_ms": (tokenizer_end - start) * 1000.0,
+                "tagger_ms": (end - tokenizer_end) * 1000.0,
+                "warmup_ms": (end - start) * 1000.0,
+            }
+        )
+        self.warm = True
+        return self.timings
+
+    def download(self, download_dir: str):
+        """ Fetch the data into download_dir, meant for setup, not for serving """
+        for resource in RESOURCES:
+            if not nltk.download(resource, download_dir=download_dir, quiet=True):
+                raise RuntimeError("Failed to download NLTK resource " + resource)
+
+
+resources = NLTKResources()
+# the tokenizers load their data through the NLTK search path on first use
+resources.configure()
+
+
+def warmup() -> dict:
+    return resources.warmup()
+
+
+def pos_tag(tokens: List[str]) -> List[Tuple[str, str]]:
+    """ Same tags as nltk.pos_tag, with the tagger loaded once """
+    return resources.tagger().tag(tokens)
+
+
+def pos_tag_sents(sentences: List[List[str]]) -> List[List[Tuple[str, str]]]:
+    tagger = resources.tagger()
+    return [tagger.tag(tokens) for tokens in sentences]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser("NLTK data of Converse")
+    parser.add_argument(
+        "--download",
+        nargs="?",
+        const=BUNDLED_DATA_DIR,
+        help="download the data into this directory, %s by default" % BUNDLED_DATA_DIR,
+    )
+    args = parser.parse_args()
+    if args.download:
+        resources.download(args.download)
+    print(json.dumps(warmup(), indent=2))
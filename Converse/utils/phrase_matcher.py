@@ -0,0 +1,83 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+from typing import Dict, Iterable, Set
+
+
+class PhraseMatcher:
+    """
+    Finds which groups of phrases occur in a text up to max_l_dist
+    insertions, deletions and substitutions, i.e. for which groups
+    fuzzysearch.find_near_matches(phrase, text, max_l_dist) finds a match
+    for some phrase of the group. Phrases and texts are compared lowercased.
+
+    All the phrases are compiled once into the bit vectors of a bit-parallel
+    approximate search (Wu-Manber), with one bit per phrase character, so the
+    text is scanned once for all of them. Row d of the search has the bit of
+    a phrase character set when the phrase up to that character matches the
+    text read so far, ending at its last character, with at most d errors.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], max_l_dist: int = 3):
+        self.max_l_dist = max_l_dist
+        self.groups = {}
+        # character -> the bits of the phrase characters equal to it
+        self.char_masks = {}
+        # the first and the last bit of every phrase, the last bits by group
+        self.first_bits = 0
+        self.last_bits = {}
+        offset = 0
+        for group, phrases in groups.items():
+            self.groups[group] = [phrase.lower() for phrase in phrases]
+            self.last_bits[group] = 0
+            for phrase in self.groups[group]:
+                if not phrase:
+                    raise ValueError("Empty phrase in group %s" % group)
+                for i, char in enumerate(phrase):
+                    self.char_masks[char] = self.char_masks.get(char, 0) | (
+                        1 << (offset + i)
+                    )
+                self.first_bits |= 1 << offset
+                self.last_bits[group] |= 1 << (offset + len(phrase) - 1)
+                offset += len(phrase)
+        self.all_bits = (1 << offset) - 1
+        self.any_last_bits = 0
+        for bits in self.last_bits.values():
+            self.any_last_bits |= bits
+        # with d errors, the first d characters of a phrase can be deleted
+        self.initial_rows = [0]
+        for _ in range(max_l_dist):
+            self.initial_rows.append(
+                ((self.initial_rows[-1] << 1) | self.first_bits) & self.all_bits
+            )
+
+    def match(self, text: str) -> Set[str]:
+        """ The groups with a phrase found in text """
+        all_bits = self.all_bits
+        first_bits = self.first_bits
+        char_masks = self.char_masks
+        rows = list(self.initial_rows)
+        found = rows[-1] & self.any_last_bits
+        for char in text.lower():
+            if found == self.any_last_bits:
+                break
+            char_mask = char_masks.get(char, 0)
+            prev_old = rows[0]
+            prev_new = ((prev_old << 1) | first_bits) & char_mask
+            rows[0] = prev_new
+            for d in range(1, len(rows)):
+                old = rows[d]
+                # match, insertion of char, substitution and deletion
+                new = (
+                    (((old << 1) | first_bits) & char_mask)
+                    | prev_old
+                    | ((prev_old | prev_new) << 1)
+                    | first_bits
+                ) & all_bits
+                rows[d] = new
+                prev_old, prev_new = old, new
+            found |= rows[-1] & self.any_last_bits
+        return {group for group, bits in self.last_bits.items() if found & bits}
@@ -6,9 +6,16 @@
 
 from nltk import edit_distance
 from collections import defaultdict
+import asyncio
+import functools
 import requests
 import json
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
 
 def wer(asr, true):
     return edit_distance(asr, true) / len(true)
@@ -76,6 +83,25 @@ def entity_api_call(url, entities, *argv, **kargs):
     return r.json()
 
 
+async def entity_api_call_async(url, entities, *argv, **kargs):
+    """ entity_api_call on the event loop """
+    if aiohttp is None:
+        # without aiohttp, the requests call waits in a worker thread
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(entity_api_call, url, entities, *argv, **kargs)
+        )
+    json_message = {
+        "entities": entities,
+        "cur_task": kargs["cur_task"],
+        "cur_entity": kargs["cur_entity_name"],
+    }
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=json_message) as r:
+            if r.status != 200:
+                return {"success": False, "msg": "ERROR!"}
+            return await r.json()
+
+
 def resp(success: bool, msg: str):
     return {"success": success, "msg": msg}
 
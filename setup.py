@@ -22,7 +22,7 @@ setuptools.setup(
     ],
     install_requires=[
         "black==20.8b1",
-        "grpcio==1.27.2",
+        "grpcio==1.37.1",
         "flake8==3.8.4",
         "flask==1.1.1",
         "Flask-Cors==3.0.9",
@@ -37,7 +37,8 @@ setuptools.setup(
         "python-Levenshtein==0.12.2",
         "thefuzz==0.19.0",
         "pyyaml==5.4",
-        "redis==3.5.3",
+        "rapidfuzz>=2.0.0",
+        "redis>=4.2.0",
         "requests==2.23.0",
         "scikit-learn==0.22.2.post1",
         "Werkzeug==2.2.3",
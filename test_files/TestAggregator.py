@@ -0,0 +1,151 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+import unittest
+from concurrent import futures
+from unittest import mock
+
+from test_files.TestNerTokenizer import unload_server_modules
+
+NER_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Converse",
+    "nlu",
+    "ner_converse",
+)
+MISSING = [m for m in ["grpc"] if importlib.util.find_spec(m) is None]
+
+QUERIES = [
+    "book a table for tomorrow at 7pm",
+    "my email is jane@example.com",
+    "call me at 650 555 0100 on friday",
+    "i want 3 tickets for next monday",
+    "it costs 20 dollars",
+    "send it to 1 market street today",
+    "the second one please",
+    "remind me at noon",
+]
+
+
+class FakeNerStub:
+    """ Tags the date and time words of the query, with a random latency """
+
+    def __init__(self, ner_pb2):
+        self.ner_pb2 = ner_pb2
+
+    def predict(self, request):
+        time.sleep(random.uniform(0, 0.005))
+        query = request.document.decode("utf-8")
+        response = self.ner_pb2.NERPredictionResponse(success=True)
+        for word in query.split():
+            if word in {"tomorrow", "friday", "monday", "today"}:
+                response.probabilities.add(label="DATE", token=word, probability=0.9)
+            elif word in {"7pm", "noon"}:
+                response.probabilities.add(label="TIME", token=word, probability=0.9)
+        return response
+
+
+def fake_duckling_parse(query):
+    """ Every word is a time entity, the NER white list decides what is kept """
+    time.sleep(random.uniform(0, 0.005))
+    results, start = [], 0
+    for word in query.split():
+        start = query.index(word, start)
+        dim = "number" if word.isdigit() else "time"
+        results.append(
+            {
+                "dim": dim,
+                "body": word,
+                "start": start,
+                "end": start + len(word),
+                "value": {"value": word},
+            }
+        )
+        start += len(word)
+    return results
+
+
+def duckling_stub():
+    """ The duckling package, which needs a JVM, Duckling is mocked in the tests """
+    module = types.ModuleType("duckling")
+    module.Duckling = mock.Mock()
+    return module
+
+
+def entities(response):
+    """ NER and duckling responses are merged in completion order """
+    return sorted(p.SerializeToString() for p in response.probabilities)
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestAggregator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.duckling = sys.modules.get("duckling")
+        sys.modules["duckling"] = duckling_stub()
+        unload_server_modules()
+        sys.path.insert(0, NER_DIR)
+        from aggr import Aggregator
+        from proto import ner_pb2
+
+        with mock.patch("aggr.duckling.Duckling") as Duckling:
+            Duckling.return_value.parse.side_effect = fake_duckling_parse
+            cls.aggr = Aggregator(max_workers=16)
+        cls.aggr.stub = FakeNerStub(ner_pb2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.aggr.executor.shutdown()
+        sys.path.remove(NER_DIR)
+        unload_server_modules()
+        if cls.duckling is None:
+            del sys.modules["duckling"]
+        else:
+            sys.modules["duckling"] = cls.duckling
+
+    def test_date_time_filter(self):
+        res = self.aggr.parse("book a table for tomorrow at 7pm")
+        self.assertTrue(res.success)
+        dk = [(p.label, p.token) for p in res.probabilities if "DUCKLING" in p.label]
+        self.assertEqual(dk, [("DUCKLING/time", "tomorrow"), ("DUCKLING/time", "7pm")])
+
+    def test_embedded_matches_remote(self):
+        from aggr import Aggregator
+
+        stub = self.aggr.stub
+        predictor = mock.Mock()
+        predictor.predict.side_effect = lambda text, return_span: stub.predict(
+            mock.Mock(document=text.encode("utf-8"))
+        )
+        with mock.patch("aggr.duckling.Duckling") as Duckling:
+            Duckling.return_value.parse.side_effect = fake_duckling_parse
+            embedded = Aggregator(ner_predictor=predictor)
+        self.assertFalse(hasattr(embedded, "stub"))
+        for query in QUERIES:
+            self.assertEqual(
+                entities(embedded.parse(query)), entities(self.aggr.parse(query))
+            )
+        self.assertEqual(predictor.predict.call_count, len(QUERIES))
+        embedded.executor.shutdown()
+
+    def test_parallel_matches_serial(self):
+        serial = {q: self.aggr.parse(q) for q in QUERIES}
+        queries = QUERIES * 16
+        random.shuffle(queries)
+        with futures.ThreadPoolExecutor(max_workers=32) as executor:
+            parallel = list(executor.map(self.aggr.parse, queries))
+        for query, response in zip(queries, parallel):
+            self.assertEqual(entities(response), entities(serial[query]), query)
+
+
+if __name__ == "__main__":
+    unittest.main()
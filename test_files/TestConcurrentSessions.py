@@ -0,0 +1,153 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+import unittest
+from unittest.mock import patch
+
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.dialog_orchestrator.orchestrator import Orchestrator
+from Converse.utils.utils import resp
+
+INTENTS = {
+    "check the weather": "check_weather",
+    "tv plan": "check_TV_plan_price",
+    "yes": "positive",
+    "no": "negative",
+}
+SCRIPTS = [
+    ["check the weather", "{zip}"],
+    # the weather task has max_turns 2
+    ["check the weather", "hmm", "what", "um", "{zip}"],
+    ["tv plan", "hulu live", "check the weather", "{zip}"],
+    ["hello", "tv plan", "fubo tv", "no"],
+    ["check the weather", "wait a second", "i am back", "{zip}"],
+    ["check the weather", "hmm", "RESET", "check the weather", "hmm", "{zip}"],
+]
+
+
+def info_pipeline(asr_origin, asr_norm, ctx, plan=None):
+    # the model latency lets the threads switch in the middle of a turn
+    time.sleep(0.001)
+    intent = INTENTS.get(asr_norm)
+    return {
+        "ner": {"success": True},
+        "negation": {"wordlist": asr_norm.split(), "triplets": [(-1, -1, -1)]},
+        "final_intent": {
+            "intent": intent,
+            "prob": 0.95 if intent else 0.0,
+            "uncertain": False,
+        },
+    }
+
+
+def entity_api_call(url, entities, *argv, **kwargs):
+    return resp(True, "%s for %s" % (kwargs["cur_task"], entities))
+
+
+def script(i):
+    return [utt.format(zip=94000 + i) for utt in SCRIPTS[i % len(SCRIPTS)]]
+
+
+@patch("Converse.response.response.choice", new=lambda seq: seq[0])
+@patch("Converse.dialog_orchestrator.orchestrator.choice", new=lambda seq: seq[0])
+@patch(
+    "Converse.dialog_state_manager.dial_state_manager.entity_api_call",
+    new=entity_api_call,
+)
+@patch(
+    "Converse.dialog_info_layer.dial_info.InfoManager.info_pipeline",
+    side_effect=info_pipeline,
+)
+class TestConcurrentSessions(unittest.TestCase):
+    """
+    One orchestrator serves many sessions at once, each session keeps its
+    states in its own DialogContext.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dm = Orchestrator(
+            task_path="test_files/test_tasks.yaml",
+            entity_path="test_files/test_entity_config.yaml",
+        )
+
+    def new_ctx(self):
+        state_manager = self.dm.policy_layer.state_manager
+        return DialogContext(
+            entity_config=state_manager.entity_manager.entity_config,
+            task_config=state_manager.task_config,
+            bot_config=self.dm.policy_layer.bot_config,
+        )
+
+    def converse(self, utterances):
+        ctx = self.new_ctx()
+        return [self.dm.process(utt, utt, ctx) for utt in utterances]
+
+    def snapshot(self):
+        components = [self.dm, self.dm.policy_layer, self.dm.policy_layer.state_manager]
+        return [
+            {key: id(value) for key, value in vars(component).items()}
+            for component in components
+        ]
+
+    def test_interleaved_turns(self, mock_info):
+        utterances = script(1)
+        alone = self.converse(utterances)
+        contexts = [self.new_ctx(), self.new_ctx()]
+        transcripts = [[], []]
+        for utt in utterances:
+            for ctx, transcript in zip(contexts, transcripts):
+                transcript.append(self.dm.process(utt, utt, ctx))
+        self.assertEqual(transcripts, [alone, alone])
+        self.assertEqual(contexts[0].task_turns, contexts[1].task_turns)
+
+    def test_threads(self, mock_info):
+        scripts = [script(i) for i in range(300)]
+        components = self.snapshot()
+        serial = [self.converse(utterances) for utterances in scripts]
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            concurrent = list(executor.map(self.converse, scripts))
+        self.assertEqual(concurrent, serial)
+        # the shared components were not changed by the sessions
+        self.assertEqual(self.snapshot(), components)
+        # every session got answers about its own zip code
+        self.assertIn("94000", " ".join(serial[0]))
+        self.assertNotIn("94006", " ".join(serial[0]))
+
+    def test_reset(self, mock_info):
+        components = self.snapshot()
+        ctx = self.new_ctx()
+        for utt in script(1)[:3]:
+            self.dm.process(utt, utt, ctx)
+        self.assertTrue(ctx.task_turns)
+        greeting = self.dm.reset(ctx=ctx)
+        self.assertEqual(greeting, self.dm.policy_layer.response.greeting())
+        fresh = self.new_ctx()
+        for name in ["turn", "task_turns", "collected_entities", "cur_states"]:
+            self.assertEqual(getattr(ctx, name), getattr(fresh, name), name)
+        self.assertIsNone(ctx.tree_manager.cur_task)
+        self.assertFalse(ctx.user_history.messages_buffer)
+        # the session goes on as a new one
+        self.assertEqual(
+            self.converse(script(0)),
+            [self.dm.process(utt, utt, ctx) for utt in script(0)],
+        )
+        self.assertEqual(self.snapshot(), components)
+
+    def test_bot_bundle(self, mock_info):
+        bot = self.dm.bot
+        self.assertIs(self.dm.policy_layer.bot, bot)
+        self.assertIs(self.dm.policy_layer.response, bot.response)
+        self.assertIs(self.dm.policy_layer.state_manager.task_config, bot.task_config)
+        self.assertIs(self.dm.entity_manager, bot.entity_manager)
+        with self.assertRaises(AttributeError):
+            bot.policy = []
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,11 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import pickle
 import unittest
 
+import jsonpickle
+
 from Converse.dialog_context.dialog_context import DialogContext
 from Converse.utils.yaml_parser import load_entity
 from Converse.config.task_config import TaskConfig, BotConfig
@@ -34,3 +37,16 @@ class TestDialogContext(unittest.TestCase):
         self.assertEqual(ctx.tree_manager.cur_task, "check_weather")
         self.assertEqual(ctx.tree_manager.cur_node.name, "entity_group_1")
         self.assertEqual(ctx.tree_manager.cur_entity, "zip_code")
+
+    def test_contexts_saved_without_task_turns(self):
+        self.dialog_context.tree_manager.set_task("check_weather")
+        del self.dialog_context.task_turns
+        del self.dialog_context.exceed_max_turn_flag
+        serialized = jsonpickle.encode(self.dialog_context)
+        for ctx in [
+            DialogContext.deserialize(serialized),
+            pickle.loads(pickle.dumps(self.dialog_context)),
+        ]:
+            self.assertEqual(ctx.task_turns, {})
+            self.assertFalse(ctx.exceed_max_turn_flag)
+            self.assertEqual(ctx.tree_manager.cur_task, "check_weather")
@@ -0,0 +1,102 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import random
+import unittest
+
+from thefuzz import fuzz, process
+
+from Converse.config.task_config import FAQ, FAQConfig
+from Converse.utils.faq_index import FAQIndex
+
+WORDS = (
+    "how do i reset my password where is order can you ship to canada what "
+    "are your hours return policy refund cancel subscription change address "
+    "track package gift card"
+).split()
+
+
+def legacy_match(index, utt):
+    """ The per turn matching of the orchestrator before the index """
+    results = process.extract(utt.lower(), index.questions, scorer=fuzz.ratio)
+    question, score = results[0]
+    return (question, score) if score > 90 else None
+
+
+def typo(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(0, 4)):
+        pos = rng.randint(0, max(len(chars) - 1, 0))
+        op = rng.random()
+        if op < 0.4 or not chars:
+            chars.insert(pos, rng.choice("abcdefghij ?"))
+        elif op < 0.8:
+            del chars[pos]
+        else:
+            chars[pos] = rng.choice("xyz")
+    return "".join(chars)
+
+
+class TestFAQIndex(unittest.TestCase):
+    def test_config(self):
+        index = FAQIndex(FAQConfig("test_files/test_faq_tasks.yaml"))
+        self.assertEqual(index.match("You are amazing"), ("you are amazing!", 100))
+        question, score = index.match("tell me about Salesforce AI research teams")
+        self.assertEqual(question, "tell me about salesforce ai research team")
+        self.assertGreater(score, 90)
+        self.assertIsNone(index.match("I want to check the weather"))
+        self.assertEqual(
+            index.answers[question],
+            ["OK, here's what I found - https://einstein.ai/mission."],
+        )
+        for utt in ["you are amazing", "hello", "", "?", "job opportunities"]:
+            self.assertEqual(index.match(utt), legacy_match(index, utt), utt)
+
+    def test_no_fuzzy_faq(self):
+        index = FAQIndex(
+            {
+                "faq": FAQ(
+                    {
+                        "samples": ["hi"],
+                        "answers": ["hi"],
+                        "question_match_options": "nli",
+                    }
+                )
+            }
+        )
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.match("hi"))
+
+    def test_parity(self):
+        rng = random.Random(0)
+        faqs = {}
+        for i in range(500):
+            samples = [
+                " ".join(rng.choices(WORDS, k=rng.randint(1, 9))) + rng.choice("?! ")
+                for _ in range(3)
+            ]
+            faqs["faq%d" % i] = FAQ(
+                {
+                    "samples": samples,
+                    "answers": ["answer %d" % i],
+                    "question_match_options": ["fuzzy_matching"],
+                }
+            )
+        index = FAQIndex(faqs)
+        utterances = [typo(rng, rng.choice(index.questions)) for _ in range(500)]
+        utterances += [" ".join(rng.choices(WORDS, k=3)) for _ in range(100)]
+        matched = 0
+        for utt in utterances:
+            expected = legacy_match(index, utt)
+            self.assertEqual(index.match(utt), expected, utt)
+            matched += expected is not None
+        # both matches and misses are covered
+        self.assertGreater(matched, 100)
+        self.assertLess(matched, len(utterances))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,10 +4,15 @@
 # For full license text, see the LICENSE file in the repo root
 # or https://opensource.org/licenses/BSD-3-Clause
 
+import asyncio
+import time
 import unittest
+from collections import Counter
 from unittest.mock import patch
 
+import Converse.utils.annotation as annotation
 from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.nlu.negation_detection.negation_v2 import NegationDetection
 from Converse.utils.yaml_parser import load_entity
 from Converse.config.task_config import TaskConfig, BotConfig
 from Converse.dialog_context.dialog_context import DialogContext
@@ -22,7 +27,7 @@ class TestInfoManager(unittest.TestCase):
             bot_config=BotConfig("./test_files/test_tasks.yaml"),
         )
 
-    @patch("Converse.nlu.intent_converse.client.IntentDetection.__call__")
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
     @patch("Converse.nlu.ner_converse.client.NER.__call__")
     @patch("Converse.nlu.negation_detection.negation_v2.NegationDetection.__call__")
     def test_info_pipeline_no_coref(self, mock_negation, mock_ner, mock_intent):
@@ -176,12 +181,9 @@ class TestInfoManager(unittest.TestCase):
                 ],
             },
         ]
-        mock_intent.return_value = {
-            "success": False,
-            "intent": "",
-            "prob": 0.0,
-            "sent": "",
-        }
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": False, "intent": "", "prob": 0.0, "sent": ""} for _ in texts
+        ]
         im = InfoManager(
             "./Converse/bot_configs/dial_info_config.yaml",
             task_config=TaskConfig("./test_files/test_tasks.yaml"),
@@ -201,7 +203,7 @@ class TestInfoManager(unittest.TestCase):
         self.assertDictEqual(res2, res)
         self.assertIn(rn_2.lower(), remove_negation_2.lower())
 
-    @patch("Converse.nlu.intent_converse.client.IntentDetection.__call__")
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
     @patch("Converse.nlu.ner_converse.client.NER.__call__")
     def test_info_pipeline_without_coref_and_negation(self, mock_ner, mock_intent):
         utt1 = (
@@ -270,12 +272,9 @@ class TestInfoManager(unittest.TestCase):
                 ],
             },
         ]
-        mock_intent.return_value = {
-            "success": False,
-            "intent": "",
-            "prob": 0.0,
-            "sent": "",
-        }
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": False, "intent": "", "prob": 0.0, "sent": ""} for _ in texts
+        ]
         im = InfoManager(
             "./test_files/infoconfig_without_coref_and_negation.yaml",
             task_config=TaskConfig("./test_files/test_tasks.yaml"),
@@ -297,6 +296,155 @@ class TestInfoManager(unittest.TestCase):
         self.assertIn(rn_2, remove_negation_2)
         self.assertIn(rc_2, replace_coref_2)
 
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    @patch("Converse.nlu.ner_converse.client.NER.__call__")
+    @patch("Converse.nlu.negation_detection.negation_v2.NegationDetection.__call__")
+    def test_info_pipeline_one_intent_call(self, mock_negation, mock_ner, mock_intent):
+        utt = "Yes. Yes."
+        mock_negation.return_value = {
+            "wordlist": ["yes", ".", "yes", "."],
+            "triplets": [(-1, -1, -1)],
+        }
+        mock_ner.return_value = {"success": True}
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": True, "intent": "positive", "prob": 0.9, "sent": text}
+            for text in texts
+        ]
+        im = InfoManager(
+            "./Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+        res = im.info_pipeline(utt, utt, self.dialog_context)
+        # the full text and both sentences go in one call, the repeated
+        # sentence only once
+        mock_intent.assert_called_once_with([utt, "Yes."], timeout=5.0)
+        self.assertEqual(res["intent"]["sent"], utt)
+        self.assertEqual([r["sent"] for r in res["intent_seg"]], ["Yes.", "Yes."])
+        self.assertEqual(res["final_intent"]["intent"], "positive")
+        self.assertNotIn("intent_extra", res)
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    def test_collect_info_extra_intent_texts(self, mock_intent):
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": True, "intent": "t", "prob": 0.9, "sent": text}
+            for text in texts
+        ]
+        im = InfoManager(
+            "./test_files/infoconfig_without_coref_and_negation.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+        res = im.collect_info(
+            "I like it.", ["intent"], self.dialog_context, ["I like it.", "like it"]
+        )
+        mock_intent.assert_called_once_with(["I like it.", "like it"])
+        self.assertEqual(
+            [r["sent"] for r in res["intent_extra"]], ["I like it.", "like it"]
+        )
+
+    def test_collect_info_async_concurrent(self):
+        async def ner(client, context, **kwargs):
+            await asyncio.sleep(0.2)
+            return {"success": True}
+
+        async def intent(client, texts):
+            await asyncio.sleep(0.2)
+            return [
+                {"success": True, "intent": "t", "prob": 0.9, "sent": text}
+                for text in texts
+            ]
+
+        def negation(client, text, **kwargs):
+            time.sleep(0.2)
+            return {"wordlist": ["yes"], "triplets": [(-1, -1, -1)]}
+
+        with patch(
+            "Converse.nlu.ner_converse.client.AsyncNER.__call__", new=ner
+        ), patch(
+            "Converse.nlu.intent_converse.client.AsyncIntentDetection.batch",
+            new=intent,
+        ), patch(
+            "Converse.nlu.negation_detection.negation_v2.NegationDetection.__call__",
+            new=negation,
+        ):
+            im = InfoManager(
+                "./Converse/bot_configs/dial_info_config.yaml",
+                task_config=TaskConfig("./test_files/test_tasks.yaml"),
+            )
+            start = time.perf_counter()
+            res = asyncio.run(
+                im.collect_info_async(
+                    "Yes. No.", ["ner", "intent", "negation"], self.dialog_context
+                )
+            )
+            elapsed = time.perf_counter() - start
+        # the three models ran concurrently
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(res["ner"], {"success": True})
+        self.assertEqual(res["intent"]["sent"], "Yes. No.")
+        self.assertEqual([r["sent"] for r in res["intent_seg"]], ["Yes.", "No."])
+        self.assertEqual(res["intent_extra"], [])
+        self.assertEqual(res["negation"]["wordlist"], ["yes"])
+
+
+class TestUtteranceAnnotation(unittest.TestCase):
+    def setUp(self):
+        self.dialog_context = DialogContext(
+            entity_config=load_entity("test_files/test_entity_config.yaml"),
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+            bot_config=BotConfig("./test_files/test_tasks.yaml"),
+        )
+        self.calls = Counter()
+
+    def counting(self, name):
+        primitive = getattr(annotation, name)
+
+        def wrapper(arg, *args, **kwargs):
+            self.calls[name, repr(arg)] += 1
+            return primitive(arg, *args, **kwargs)
+
+        return patch.object(annotation, name, new=wrapper)
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    @patch("Converse.nlu.ner_converse.client.NER.__call__")
+    def run_turn(self, utt, mock_ner, mock_intent):
+        mock_ner.return_value = {"success": True}
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": False, "intent": "", "prob": 0.0, "sent": ""} for _ in texts
+        ]
+        im = InfoManager(
+            "./Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+        with self.counting("word_tokenize"), self.counting("pos_tag"), self.counting(
+            "sent_tokenize"
+        ):
+            return im.info_pipeline(utt, utt, self.dialog_context)
+
+    def primitive_calls(self, name):
+        return sum(n for (primitive, _), n in self.calls.items() if primitive == name)
+
+    def test_primitives_once_per_turn(self):
+        res = self.run_turn("i don't want the red one. book a table for two.")
+        self.assertNotEqual(res["negation"]["triplets"], [(-1, -1, -1)])
+        # no primitive runs twice on the same input
+        self.assertEqual(max(self.calls.values()), 1)
+        self.assertEqual(self.primitive_calls("word_tokenize"), 1)
+        self.assertEqual(self.primitive_calls("pos_tag"), 1)
+
+    def test_cased_utterance(self):
+        self.run_turn("Book a table for two. It is for Friday.")
+        self.assertEqual(max(self.calls.values()), 1)
+        # the negation model tokenizes and tags the lowercase utterance
+        self.assertEqual(self.primitive_calls("word_tokenize"), 2)
+        self.assertEqual(self.primitive_calls("pos_tag"), 2)
+
+    def test_negation_annotation(self):
+        negation = NegationDetection("./Converse/bot_configs/negation_model_config")
+        for utt in ["I don't want it.", "not now", "Book a table for two."]:
+            shared = annotation.UtteranceAnnotation(utt)
+            shared.pos_tags
+            self.assertEqual(negation(utt, annotation=shared), negation(utt))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,217 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+INTENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Converse",
+    "nlu",
+    "intent_converse",
+)
+MISSING = [
+    m for m in ["torch", "onnx", "onnxruntime"] if importlib.util.find_spec(m) is None
+]
+
+PAIRS = [
+    ("i want to check my order", "check order status"),
+    ("cancel my order please", "check order status"),
+    ("yes", "yes please"),
+    ("no thanks", "yes please"),
+    ("talk to an agent", "i need help from a person"),
+    ("book a flight for tomorrow", "book flight"),
+    ("what is my account number", "the account number " * 40),
+    ("hi", "a"),
+]
+WORDS = (
+    "i want to check my order status cancel account number yes no agent "
+    "please help me with book flight hotel tomorrow talk an person need "
+    "what is the for a thanks hi"
+).split()
+
+
+def tiny_model(path):
+    """ A randomly initialized two layer TinyBERT with a small vocabulary """
+    import torch
+    from TinyBERT.transformer.modeling import (
+        BertConfig,
+        TinyBertForSequenceClassification,
+    )
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS
+    with open(os.path.join(path, "vocab.txt"), "w") as f:
+        f.write("\n".join(vocab) + "\n")
+    config = BertConfig(
+        vocab_size_or_config_json_file=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    with open(os.path.join(path, "config.json"), "w") as f:
+        json.dump(config.to_dict(), f)
+    torch.manual_seed(0)
+    model = TinyBertForSequenceClassification(config, num_labels=2)
+    torch.save(model.state_dict(), os.path.join(path, "pytorch_model.bin"))
+
+
+@unittest.skipIf("torch" in MISSING, "requires torch")
+class TestOnnxExport(unittest.TestCase):
+    """ The export arguments, which must be accepted by torch 1.8.1 """
+
+    def setUp(self):
+        sys.path.insert(0, INTENT_DIR)
+
+    def tearDown(self):
+        sys.path.remove(INTENT_DIR)
+
+    def test_export_arguments(self):
+        import torch
+        from TinyBERT.transformer.modeling import TinyBertForSequenceClassification
+        from onnx_backend import INPUT_NAMES, export_onnx
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tiny_model(tmp)
+            model = TinyBertForSequenceClassification.from_pretrained(tmp, num_labels=2)
+            with patch.object(torch.onnx, "export") as mock_export:
+                export_onnx(model, os.path.join(tmp, "model.onnx"))
+        _, kwargs = mock_export.call_args
+        self.assertEqual(kwargs["opset_version"], 13)
+        self.assertEqual(kwargs["input_names"], INPUT_NAMES)
+        self.assertEqual(kwargs["output_names"], ["logits"])
+        self.assertEqual(
+            kwargs["dynamic_axes"]["input_ids"], {0: "batch", 1: "sequence"}
+        )
+        # keywords added after torch 1.8.1 fail the export in the NLU image
+        self.assertLessEqual(
+            set(kwargs),
+            {"input_names", "output_names", "dynamic_axes", "opset_version"},
+        )
+
+
+@unittest.skipIf("torch" in MISSING, "requires torch")
+class TestPairTensors(unittest.TestCase):
+    """ The pad-free pair tensors against the padded features """
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, INTENT_DIR)
+        from dnnc_tinybert_inference_only import DNNC
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.model = DNNC(cls.tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(INTENT_DIR)
+
+    def pairs(self):
+        rng = random.Random(0)
+        max_pair_len = self.model.max_seq_length - 3
+
+        def text(n_words):
+            return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+        pairs = list(PAIRS) + [("", ""), ("", "yes"), (text(200), "")]
+        # around the truncation length, with ties between the two sides
+        for len_a, len_b in [
+            (max_pair_len, 0),
+            (max_pair_len, 1),
+            (max_pair_len // 2, max_pair_len // 2 + 1),
+            (max_pair_len, max_pair_len),
+            (100, 100),
+            (3, 200),
+            (200, 3),
+        ]:
+            pairs.append((text(len_a), text(len_b)))
+        for _ in range(50):
+            pairs.append((text(rng.randint(0, 150)), text(rng.randint(0, 150))))
+        return pairs
+
+    def test_features_parity(self):
+        from utils import InputExample
+
+        pairs = self.pairs()
+        features = self.model.convert_examples_to_features(
+            [InputExample(a, b) for a, b in pairs], train=False
+        )
+        input_ids, input_mask, segment_ids = self.model.pair_tensors(
+            [(self.model.encode(a), self.model.encode(b)) for a, b in pairs]
+        )
+        self.assertTrue(
+            any(sum(f.input_mask) == self.model.max_seq_length for f in features)
+        )
+        for i, feature in enumerate(features):
+            seq_len = sum(feature.input_mask)
+            self.assertEqual(input_mask[i].sum().item(), seq_len, pairs[i])
+            # the padding of both is zero, only its length differs
+            self.assertEqual(
+                input_ids[i, :seq_len].tolist(), feature.input_ids[:seq_len]
+            )
+            self.assertEqual(
+                segment_ids[i, :seq_len].tolist(), feature.segment_ids[:seq_len]
+            )
+            self.assertFalse(input_ids[i, seq_len:].any())
+            self.assertFalse(segment_ids[i, seq_len:].any())
+        # cut to the longest pair, the features give the same tensors
+        for tensor, expected in zip(
+            (input_ids, input_mask, segment_ids),
+            self.model.features_to_tensors(features),
+        ):
+            self.assertTrue((tensor == expected).all())
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestIntentBackends(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, INTENT_DIR)
+        from dnnc_tinybert_inference_only import DNNC
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.results = {
+            backend: DNNC(cls.tmp.name, backend=backend).predict(PAIRS)
+            for backend in ["torch", "onnx", "onnx-int8"]
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(INTENT_DIR)
+
+    def assertParity(self, backend, max_drift):
+        labels, probs = self.results[backend]
+        ref_labels, ref_probs = self.results["torch"]
+        self.assertLess((probs - ref_probs).abs().max().item(), max_drift)
+        # labels may only differ where the reference is within the drift of 0.5
+        for label, ref_label, p in zip(labels, ref_labels, ref_probs[:, 0].tolist()):
+            if abs(p - 0.5) > max_drift:
+                self.assertEqual(label, ref_label)
+
+    def test_onnx(self):
+        self.assertParity("onnx", 1e-4)
+        self.assertEqual(self.results["onnx"][0], self.results["torch"][0])
+
+    def test_onnx_int8(self):
+        self.assertParity("onnx-int8", 0.05)
+
+    def test_exported_files(self):
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "model.onnx")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "model-int8.onnx")))
+
+
+if __name__ == "__main__":
+    unittest.main()
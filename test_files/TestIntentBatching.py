@@ -0,0 +1,205 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from test_files.TestIntentBackends import INTENT_DIR, tiny_model
+from test_files.TestNerTokenizer import unload_server_modules
+
+MISSING = [m for m in ["torch", "grpc"] if importlib.util.find_spec(m) is None]
+
+TASKS = [
+    {"task": "check_order", "examples": ["check my order status", "cancel my order"]},
+    {"task": "agent", "examples": ["talk to an agent", "i need help from a person"]},
+    {"task": "flight", "examples": ["book a flight for tomorrow", "book hotel"]},
+]
+SMALL_TASKS = [
+    {"task": "yes", "examples": ["yes please"]},
+    {"task": "no", "examples": ["no thanks"]},
+]
+INPUTS = [
+    "i want to check my order",
+    "cancel my order please",
+    "talk to a person",
+    "book a flight",
+    "yes",
+    "no thanks",
+    "what is my account number",
+    "hi",
+]
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestIntentBatching(unittest.TestCase):
+    """
+    BatchingIntentPredictor gives every request the prediction of
+    DnncIntentPredictor, whichever requests it shares a forward pass with.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        unload_server_modules()
+        sys.path.insert(0, INTENT_DIR)
+        import torch
+        from dnnc_tinybert_inference_only import DnncIntentPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.predictor = DnncIntentPredictor(cls.tmp.name)
+        # above the threshold, the samples are still ranked by the model
+        with torch.no_grad():
+            cls.predictor.model.model.classifier.bias.copy_(torch.tensor([3.0, 0.0]))
+        cls.task_sets = [
+            cls.predictor.task_set(TASKS),
+            cls.predictor.task_set(SMALL_TASKS),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(INTENT_DIR)
+        unload_server_modules()
+
+    def batcher(self, **kwargs):
+        from batcher import BatchingIntentPredictor
+
+        return BatchingIntentPredictor(self.predictor, log_every=0, **kwargs)
+
+    def requests(self):
+        return [
+            (text, self.task_sets[i % len(self.task_sets)])
+            for i, text in enumerate(INPUTS)
+        ]
+
+    def assertPrediction(self, prediction, expected):
+        self.assertEqual(prediction[0], expected[0])
+        self.assertAlmostEqual(prediction[1], expected[1], places=5)
+        self.assertEqual(prediction[2], expected[2])
+
+    def test_split_back(self):
+        batcher = self.batcher(max_wait_ms=200)
+        requests = self.requests()
+        with ThreadPoolExecutor(len(requests)) as pool:
+            predictions = list(
+                pool.map(lambda r: batcher.predict_task_set(*r), requests)
+            )
+        for (text, task_set), prediction in zip(requests, predictions):
+            self.assertNotEqual(prediction[0], "None")
+            self.assertPrediction(
+                prediction, self.predictor.predict_task_set(text, task_set)
+            )
+        stats = batcher.stats.summary()
+        self.assertEqual(stats["requests"], len(requests))
+        self.assertGreater(stats["batch_size_max"], 1)
+
+    def test_batch_request(self):
+        batcher = self.batcher(max_wait_ms=50)
+        predictions = batcher.predict_task_set_batch(INPUTS, self.task_sets[0])
+        expected = self.predictor.predict_task_set_batch(INPUTS, self.task_sets[0])
+        for prediction, expected_prediction in zip(predictions, expected):
+            self.assertPrediction(prediction, expected_prediction)
+        self.assertEqual(batcher.stats.summary()["batches"], 1)
+
+    def test_max_wait_flush(self):
+        batcher = self.batcher(max_wait_ms=100)
+        text, task_set = self.requests()[0]
+        start = time.perf_counter()
+        prediction = batcher.predict_task_set(text, task_set)
+        # a lone request waits for the window, then runs by itself
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        self.assertPrediction(
+            prediction, self.predictor.predict_task_set(text, task_set)
+        )
+        stats = batcher.stats.summary()
+        self.assertEqual((stats["batches"], stats["requests"]), (1, 1))
+        # a batch with max_pairs pairs does not wait for the window
+        batcher = self.batcher(max_wait_ms=60000, max_pairs=1)
+        start = time.perf_counter()
+        batcher.predict_task_set(text, task_set)
+        self.assertLess(time.perf_counter() - start, 30)
+
+    def test_max_pairs(self):
+        requests = self.requests() * 3
+        # two requests fit in a batch, unless both have the larger task set
+        max_pairs = sum(len(task_set) for task_set in self.task_sets) + 1
+        batcher = self.batcher(max_wait_ms=200, max_pairs=max_pairs)
+        predict_task_sets = self.predictor.model.predict_task_sets
+        batch_pairs, batch_sizes = [], []
+
+        def record(premises, task_sets):
+            batch_pairs.append(sum(len(task_set) for task_set in task_sets))
+            batch_sizes.append(len(premises))
+            return predict_task_sets(premises, task_sets)
+
+        with patch.object(
+            self.predictor.model, "predict_task_sets", side_effect=record
+        ):
+            with ThreadPoolExecutor(len(requests)) as pool:
+                predictions = list(
+                    pool.map(lambda r: batcher.predict_task_set(*r), requests)
+                )
+        self.assertLessEqual(max(batch_pairs), max_pairs)
+        self.assertEqual(sum(batch_sizes), len(requests))
+        self.assertGreater(max(batch_sizes), 1)
+        for (text, task_set), prediction in zip(requests, predictions):
+            self.assertPrediction(
+                prediction, self.predictor.predict_task_set(text, task_set)
+            )
+
+    def test_error_propagation(self):
+        batcher = self.batcher(max_wait_ms=200)
+        requests = self.requests()
+        with patch.object(
+            self.predictor.model,
+            "predict_task_sets",
+            side_effect=RuntimeError("out of memory"),
+        ):
+            with ThreadPoolExecutor(len(requests)) as pool:
+                futures = [
+                    pool.submit(batcher.predict_task_set, *request)
+                    for request in requests
+                ]
+                for future in futures:
+                    with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                        future.result()
+        self.assertEqual(batcher.stats.summary()["requests"], len(requests))
+        # the worker keeps serving after a failed batch
+        text, task_set = requests[0]
+        self.assertPrediction(
+            batcher.predict_task_set(text, task_set),
+            self.predictor.predict_task_set(text, task_set),
+        )
+
+    def test_servicer_tasks(self):
+        from proto import intent_pb2
+        from servicer import IntentServicer
+
+        request = intent_pb2.IntentDetectionBatchRequest(
+            documents=INPUTS,
+            tasks=[
+                intent_pb2.IntentClass(label=t["task"], samples=t["examples"])
+                for t in TASKS
+            ],
+        )
+        expected = self.predictor.predict_task_set_batch(INPUTS, self.task_sets[0])
+        for predictor in [self.predictor, self.batcher(max_wait_ms=5)]:
+            response = IntentServicer(predictor).IntentDetectionBatch(request, None)
+            self.assertEqual(len(response.results), len(INPUTS))
+            for res, (label, probability, sent) in zip(response.results, expected):
+                self.assertTrue(res.success)
+                self.assertPrediction(
+                    (res.label, res.probability, res.sent), (label, probability, sent)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
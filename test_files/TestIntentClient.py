@@ -0,0 +1,276 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import Converse.nlu.intent_converse.proto.intent_pb2 as intent_pb2
+from Converse.nlu.intent_converse.client import IntentDetection, AsyncIntentDetection
+from Converse.config.task_config import TaskConfig, FAQConfig
+
+
+def intent_response(label="", prob=0.0, unknown_task_set=False):
+    response = intent_pb2.IntentDetectionResponse()
+    response.unknown_task_set = unknown_task_set
+    response.results.success = bool(label)
+    response.results.label = label
+    response.results.probability = prob
+    response.results.sent = label
+    return response
+
+
+class TestIntentDetection(unittest.TestCase):
+    def setUp(self):
+        self.client = IntentDetection(
+            TaskConfig("test_files/test_faq_tasks.yaml"),
+            "localhost:9001",
+            FAQConfig("test_files/test_faq_tasks.yaml"),
+        )
+        self.client.stub = MagicMock()
+        self.client.stub.RegisterTaskSet.return_value = (
+            intent_pb2.RegisterTaskSetResponse(success=True, task_set_id="abc")
+        )
+
+    def test_register_once(self):
+        self.client.stub.IntentDetection.return_value = intent_response("faq", 0.9)
+        self.client("first")
+        self.client("second")
+        self.assertEqual(self.client.stub.RegisterTaskSet.call_count, 1)
+        for call in self.client.stub.IntentDetection.call_args_list:
+            request = call[0][0]
+            self.assertEqual(request.task_set_id, "abc")
+            self.assertEqual(len(request.tasks), 0)
+
+    def test_reregister_on_cache_miss(self):
+        self.client.stub.IntentDetection.side_effect = [
+            intent_response("faq", 0.9),
+            intent_response(unknown_task_set=True),
+            intent_response("faq", 0.8),
+        ]
+        self.client("first")
+        res = self.client("second")
+        self.assertEqual(self.client.stub.RegisterTaskSet.call_count, 2)
+        self.assertTrue(res["success"])
+        self.assertAlmostEqual(res["prob"], 0.8, places=5)
+
+    def test_register_failure(self):
+        self.client.stub.RegisterTaskSet.return_value = (
+            intent_pb2.RegisterTaskSetResponse(success=False, error="boom")
+        )
+        res = self.client("first")
+        self.assertFalse(res["success"])
+        self.client.stub.IntentDetection.assert_not_called()
+
+    def test_batch(self):
+        response = intent_pb2.IntentDetectionBatchResponse()
+        response.results.extend(
+            [intent_response("faq", 0.9).results, intent_response().results]
+        )
+        self.client.stub.IntentDetectionBatch.return_value = response
+        res = self.client.batch(["first", "second"])
+        request = self.client.stub.IntentDetectionBatch.call_args[0][0]
+        self.assertEqual(list(request.documents), ["first", "second"])
+        self.assertEqual(request.task_set_id, "abc")
+        self.assertEqual([r["success"] for r in res], [True, False])
+        self.assertEqual(res[0]["intent"], "faq")
+        self.client.stub.IntentDetection.assert_not_called()
+
+    def test_batch_reregister_on_cache_miss(self):
+        response = intent_pb2.IntentDetectionBatchResponse()
+        response.results.extend([intent_response("faq", 0.9).results])
+        self.client.stub.IntentDetectionBatch.side_effect = [
+            intent_pb2.IntentDetectionBatchResponse(unknown_task_set=True),
+            response,
+        ]
+        res = self.client.batch(["first"])
+        self.assertEqual(self.client.stub.RegisterTaskSet.call_count, 2)
+        self.assertTrue(res[0]["success"])
+        self.assertEqual(self.client.batch([]), [])
+
+    def test_timeout(self):
+        self.client.stub.IntentDetection.return_value = intent_response("faq", 0.9)
+        self.client("first", timeout=2.0)
+        # the requests of a call share its timeout
+        register_timeout = self.client.stub.RegisterTaskSet.call_args[1]["timeout"]
+        detect_timeout = self.client.stub.IntentDetection.call_args[1]["timeout"]
+        self.assertLessEqual(detect_timeout, register_timeout)
+        self.assertLessEqual(register_timeout, 2.0)
+        self.assertGreater(detect_timeout, 1.0)
+        self.client.stub.IntentDetectionBatch.return_value = (
+            intent_pb2.IntentDetectionBatchResponse()
+        )
+        self.client.batch(["first"], timeout=2.0)
+        self.assertLessEqual(
+            self.client.stub.IntentDetectionBatch.call_args[1]["timeout"], 2.0
+        )
+        self.client("first")
+        self.assertIsNone(self.client.stub.IntentDetection.call_args[1]["timeout"])
+
+
+class TestIntentDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.client = self.cached_client("test_files/test_faq_tasks.yaml")
+
+    @staticmethod
+    def cached_client(task_path, cache_ttl=None):
+        client = IntentDetection(
+            TaskConfig(task_path),
+            "localhost:9001",
+            cache_size=2,
+            cache_ttl=cache_ttl,
+        )
+        client.stub = MagicMock()
+        client.stub.RegisterTaskSet.return_value = intent_pb2.RegisterTaskSetResponse(
+            success=True, task_set_id="abc"
+        )
+        client.stub.IntentDetection.return_value = intent_response("faq", 0.9)
+        return client
+
+    def test_hit_on_normalized_text(self):
+        first = self.client("Check my order")
+        second = self.client("  check MY   order ")
+        self.assertEqual(first, second)
+        self.assertEqual(self.client.stub.IntentDetection.call_count, 1)
+        self.assertEqual(self.client.cache_info()["hits"], 1)
+        self.assertEqual(self.client.cache_info()["misses"], 1)
+
+    def test_lru_eviction(self):
+        for text in ["yes", "no", "yes", "agent", "no"]:
+            self.client(text)
+        # "no" was the least recently used entry when "agent" was added
+        self.assertEqual(self.client.stub.IntentDetection.call_count, 4)
+
+    def test_ttl(self):
+        client = self.cached_client("test_files/test_faq_tasks.yaml", cache_ttl=10)
+        with patch("time.monotonic", return_value=100.0):
+            client("yes")
+            client("yes")
+        with patch("time.monotonic", return_value=111.0):
+            client("yes")
+        self.assertEqual(client.stub.IntentDetection.call_count, 2)
+
+    def test_errors_not_cached(self):
+        self.client.stub.IntentDetection.return_value = intent_response("None", 0.0)
+        self.client("yes")
+        self.client("yes")
+        self.assertEqual(self.client.stub.IntentDetection.call_count, 2)
+
+    def test_failures_not_cached(self):
+        self.client.stub.RegisterTaskSet.return_value = (
+            intent_pb2.RegisterTaskSetResponse(success=False, error="restarting")
+        )
+        self.assertFalse(self.client("yes")["success"])
+        self.assertFalse(self.client.batch(["no"])[0]["success"])
+        self.assertEqual(self.client.cache_info()["size"], 0)
+        # the server is back, the texts are sent again
+        self.client.stub.RegisterTaskSet.return_value = (
+            intent_pb2.RegisterTaskSetResponse(success=True, task_set_id="abc")
+        )
+        self.assertEqual(self.client("yes")["intent"], "faq")
+        self.assertEqual(self.client.batch(["yes"])[0]["intent"], "faq")
+        self.assertEqual(self.client.stub.IntentDetection.call_count, 1)
+        # a text the server matched with no task is cached
+        self.client.stub.IntentDetection.return_value = intent_response()
+        self.assertFalse(self.client("hello")["success"])
+        self.assertFalse(self.client("hello")["success"])
+        self.assertEqual(self.client.stub.IntentDetection.call_count, 2)
+
+    def test_key_depends_on_samples(self):
+        other = self.cached_client("test_files/test_tasks.yaml")
+        self.assertNotEqual(self.client.cache_key("yes"), other.cache_key("yes"))
+
+    def test_batch_sends_misses_only(self):
+        self.client("yes")
+        response = intent_pb2.IntentDetectionBatchResponse()
+        response.results.extend([intent_response("faq", 0.7).results])
+        self.client.stub.IntentDetectionBatch.return_value = response
+        res = self.client.batch(["Yes", "no"])
+        request = self.client.stub.IntentDetectionBatch.call_args[0][0]
+        self.assertEqual(list(request.documents), ["no"])
+        self.assertAlmostEqual(res[0]["prob"], 0.9, places=5)
+        self.assertAlmostEqual(res[1]["prob"], 0.7, places=5)
+
+
+class FakeAioStub:
+    """ Records the requests, answers like the intent server """
+
+    def __init__(self, unknown_first=False):
+        self.requests = []
+        self.registered = 0
+        self.unknown_first = unknown_first
+
+    async def RegisterTaskSet(self, request):
+        self.registered += 1
+        return intent_pb2.RegisterTaskSetResponse(success=True, task_set_id="abc")
+
+    async def IntentDetectionBatch(self, request):
+        self.requests.append(request)
+        if self.unknown_first and len(self.requests) == 1:
+            return intent_pb2.IntentDetectionBatchResponse(unknown_task_set=True)
+        await asyncio.sleep(0.01)
+        response = intent_pb2.IntentDetectionBatchResponse()
+        for document in request.documents:
+            response.results.extend([intent_response(document, 0.9).results])
+        return response
+
+
+class TestAsyncIntentDetection(unittest.TestCase):
+    def setUp(self):
+        self.client = AsyncIntentDetection(
+            TaskConfig("test_files/test_faq_tasks.yaml"), "localhost:9001"
+        )
+
+    def run_with_stub(self, stub, coro):
+        self.client.loop_stub = lambda: stub
+        return asyncio.run(coro)
+
+    def test_concurrent_calls_use_own_requests(self):
+        stub = FakeAioStub()
+
+        async def turns():
+            return await asyncio.gather(
+                self.client.batch(["first"]), self.client.batch(["second", "third"])
+            )
+
+        first, second = self.run_with_stub(stub, turns())
+        self.assertEqual(first[0]["intent"], "first")
+        self.assertEqual([r["intent"] for r in second], ["second", "third"])
+        self.assertEqual(
+            [list(r.documents) for r in stub.requests], [["first"], ["second", "third"]]
+        )
+        self.assertFalse(stub.requests[0] is stub.requests[1])
+
+    def test_channels(self):
+        # only grpc.aio channels, opened on the loop that uses them
+        self.assertIsNone(self.client.stub)
+
+        async def stubs():
+            return self.client.loop_stub(), self.client.loop_stub()
+
+        first, again = asyncio.run(stubs())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(stubs())
+        self.assertIsNot(first, second)
+        # the channels of the closed loops are dropped
+        self.assertLessEqual(len(self.client.channels.channels), 1)
+
+        async def close():
+            self.client.loop_stub()
+            await self.client.close()
+            return len(self.client.channels.channels)
+
+        self.assertEqual(asyncio.run(close()), 0)
+
+    def test_reregister_on_cache_miss(self):
+        stub = FakeAioStub(unknown_first=True)
+        res = self.run_with_stub(stub, self.client.batch(["first"]))
+        self.assertEqual(stub.registered, 2)
+        self.assertTrue(res[0]["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import random
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from test_files.TestIntentBackends import INTENT_DIR, WORDS, tiny_model
+
+MISSING = [m for m in ["torch", "sklearn"] if importlib.util.find_spec(m) is None]
+
+
+def random_tasks(rng, n_tasks=8, n_examples=12):
+    tasks = []
+    for t in range(n_tasks):
+        examples = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))
+            for _ in range(n_examples)
+        ]
+        tasks.append({"task": "task_{}".format(t), "examples": examples})
+    return tasks
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestIntentRetrieval(unittest.TestCase):
+    """ The lexical first stage of DnncIntentPredictor with top_k """
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, INTENT_DIR)
+        from dnnc_tinybert_inference_only import DnncIntentPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.predictor = DnncIntentPredictor(cls.tmp.name, top_k=5)
+        cls.per_task = DnncIntentPredictor(cls.tmp.name, top_k=2, per_task=True)
+        cls.tasks = random_tasks(random.Random(0))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(INTENT_DIR)
+
+    def test_exact_match_retrieved(self):
+        for predictor in [self.predictor, self.per_task]:
+            task_set = predictor.get_task_set(predictor.register(self.tasks))
+            self.assertIsNotNone(task_set.vectorizer)
+            for example in set(task_set.examples):
+                for text in [example, example.upper()]:
+                    candidates = predictor.candidates(text, task_set)
+                    self.assertLess(len(candidates), len(task_set))
+                    self.assertIn(example, candidates.examples, text)
+
+    def test_per_task(self):
+        task_set = self.per_task.task_set(self.tasks)
+        candidates = self.per_task.candidates("book a flight", task_set)
+        for task, indices in candidates.task_indices.items():
+            self.assertEqual(len(indices), 2, task)
+        self.assertEqual(list(candidates.task_indices), list(task_set.task_indices))
+
+    def test_small_task_set(self):
+        tasks = [
+            {"task": "yes", "examples": ["yes please", "yes"]},
+            {"task": "no", "examples": ["no thanks", "no"]},
+        ]
+        for top_k in [4, 5]:
+            self.predictor.top_k = top_k
+            try:
+                task_set = self.predictor.task_set(tasks)
+                # the whole task set is scored, without building the index
+                self.assertIs(self.predictor.candidates("agent", task_set), task_set)
+                self.assertIsNone(task_set.vectorizer)
+            finally:
+                self.predictor.top_k = 5
+
+    def test_subset(self):
+        task_set = self.predictor.task_set(self.tasks)
+        indices = task_set.retrieve("check my order", 5)
+        self.assertEqual(indices, sorted(indices))
+        subset = task_set.subset(indices)
+        self.assertEqual(subset.examples, [task_set.examples[i] for i in indices])
+        self.assertEqual(subset.labels, [task_set.labels[i] for i in indices])
+        for i, index in enumerate(indices):
+            ids = task_set.sample_ids[index]
+            self.assertEqual(subset.sample_tensor[i, : len(ids)].tolist(), ids)
+            self.assertEqual(subset.sample_lens[i].item(), len(ids))
+
+    def test_top_k_argument(self):
+        task_set = self.predictor.get_task_set(self.predictor.register(self.tasks))
+        text = task_set.examples[0]
+        self.assertIs(self.predictor.candidates(text, task_set, top_k=0), task_set)
+        self.assertEqual(len(self.predictor.candidates(text, task_set, top_k=3)), 3)
+        with patch.object(
+            self.predictor.model,
+            "predict_task_set",
+            wraps=self.predictor.model.predict_task_set,
+        ) as mock_predict:
+            self.predictor.predict_task_set(text, task_set, top_k=0)
+            self.assertIs(mock_predict.call_args[0][1], task_set)
+            self.predictor.predict_task_set(text, task_set)
+            self.assertEqual(len(mock_predict.call_args[0][1]), 5)
+
+    def test_evaluate_retrieval(self):
+        examples = [
+            SimpleNamespace(text=example, label=task["task"])
+            for task in self.tasks[:2]
+            for example in task["examples"][:2]
+        ]
+        results = self.predictor.evaluate_retrieval(examples, self.tasks, ks=(1, 5))
+        self.assertEqual(results["recall@5"], 1.0)
+        self.assertIn("two_stage_acc", results)
+        # the predictor keeps its settings, even when the evaluation fails
+        with patch.object(
+            self.predictor.model,
+            "predict_task_set",
+            side_effect=RuntimeError("out of memory"),
+        ):
+            with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                self.predictor.evaluate_retrieval(examples, self.tasks)
+        self.assertEqual((self.predictor.top_k, self.predictor.per_task), (5, False))
+
+    def test_registered_task_set_changes(self):
+        task_set_id = self.predictor.register(self.tasks)
+        task_set = self.predictor.get_task_set(task_set_id)
+        # the same samples are not tokenized again
+        self.assertEqual(self.predictor.register(self.tasks), task_set_id)
+        self.assertIs(self.predictor.get_task_set(task_set_id), task_set)
+
+        changed = [dict(t, examples=list(t["examples"])) for t in self.tasks]
+        changed[0]["examples"][0] = "talk to an agent please"
+        changed_id = self.predictor.register(changed)
+        self.assertNotEqual(changed_id, task_set_id)
+        changed_set = self.predictor.get_task_set(changed_id)
+        self.assertIn("talk to an agent please", changed_set.examples)
+        self.assertIn(
+            "talk to an agent please",
+            self.predictor.candidates("talk to an agent please", changed_set).examples,
+        )
+        self.assertNotIn("talk to an agent please", task_set.examples)
+        # the sample order is part of the content
+        reordered = [
+            dict(t, examples=list(reversed(t["examples"]))) for t in self.tasks
+        ]
+        self.assertNotEqual(self.predictor.register(reordered), task_set_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import unittest
+from unittest.mock import patch
+
+from Converse.config.task_config import BotConfig, TaskConfig
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.dialog_info_layer.model_gate import ModelGate, ModelPlan
+from Converse.entity.entity_manager import EntityManager
+from Converse.utils.yaml_parser import load_entity
+
+MODELS = ["ner", "intent", "negation"]
+
+
+class TestModelGate(unittest.TestCase):
+    def setUp(self):
+        self.gate = ModelGate(
+            MODELS,
+            EntityManager(
+                entity_path="test_files/test_entity_config.yaml",
+                entity_extraction_path="./Converse/bot_configs/"
+                "entity_extraction_config.yaml",
+            ),
+        )
+        self.ctx = DialogContext(
+            entity_config=load_entity("test_files/test_entity_config.yaml"),
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+            bot_config=BotConfig("./test_files/test_tasks.yaml"),
+        )
+
+    def test_polarity(self):
+        for utt in ["yes", "Yes.", "yeah!", "Yes, please", "that's right", "OK"]:
+            self.assertEqual(ModelGate.polarity(utt), "positive", utt)
+        for utt in ["no", "No.", "nope", "no, thank you", "not really"]:
+            self.assertEqual(ModelGate.polarity(utt), "negative", utt)
+        for utt in ["yes I want a bike", "not now", "no idea", "", "I'm not sure"]:
+            self.assertIsNone(ModelGate.polarity(utt), utt)
+
+    def test_plan(self):
+        states = self.ctx.cur_states
+        # no state makes a yes or no answer sufficient
+        self.assertEqual(self.gate.plan("yes", self.ctx).skip, frozenset())
+
+        states.confirm_entity = True
+        plan = self.gate.plan("Yes.", self.ctx)
+        self.assertEqual(plan.polarity, "positive")
+        self.assertEqual(plan.skip, frozenset(MODELS))
+        self.assertIsNone(self.gate.plan("yes 94301", self.ctx).polarity)
+
+        states.multiple_entities = True
+        self.assertEqual(self.gate.plan("no", self.ctx).skip, frozenset())
+        states.multiple_entities = False
+        states.confirm_entity = False
+
+        states.cur_entity_name, states.cur_entity_types = "user_utt", ["USER_UTT"]
+        self.assertEqual(self.gate.plan("no", self.ctx).polarity, "negative")
+        plan = self.gate.plan("a red bike", self.ctx)
+        self.assertIsNone(plan.polarity)
+        self.assertEqual(plan.skip, frozenset(["ner"]))
+
+        # the NER result is used by the time entity
+        states.cur_entity_name, states.cur_entity_types = "time", ["TIME"]
+        self.assertEqual(self.gate.plan("at noon", self.ctx).skip, frozenset())
+
+        summary = self.gate.summary()
+        self.assertEqual(summary["turns"], 7)
+        self.assertEqual(summary["skipped_calls"], 7)
+        self.assertEqual(summary["model_calls"], 14)
+        self.assertEqual(summary["skipped_by_model"]["ner"], 3)
+
+    def test_custom_model(self):
+        gate = ModelGate(MODELS + ["coref"], self.gate.entity_manager)
+        self.ctx.cur_states.confirm_intent = True
+        # the coreference result can not be left out
+        self.assertIsNone(gate.plan("yes", self.ctx).polarity)
+
+
+class TestGatedPipeline(unittest.TestCase):
+    def setUp(self):
+        self.ctx = DialogContext(
+            entity_config=load_entity("test_files/test_entity_config.yaml"),
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+            bot_config=BotConfig("./test_files/test_tasks.yaml"),
+        )
+        self.im = InfoManager(
+            "./Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    @patch("Converse.nlu.ner_converse.client.NER.__call__")
+    @patch("Converse.nlu.negation_detection.negation_v2.NegationDetection.__call__")
+    def test_polarity_plan(self, mock_negation, mock_ner, mock_intent):
+        plan = ModelPlan(MODELS, "negative")
+        res = self.im.info_pipeline("No.", "No.", self.ctx, plan=plan)
+        mock_negation.assert_not_called()
+        mock_ner.assert_not_called()
+        mock_intent.assert_not_called()
+        self.assertEqual(
+            res["final_intent"], {"intent": "negative", "prob": 1.0, "uncertain": False}
+        )
+        self.assertEqual(res["ner"], {"success": True})
+        self.assertEqual(res["negation"]["triplets"], [(-1, -1, -1)])
+        # the utterance is still stored in the history
+        self.assertEqual(self.ctx.user_history.messages_buffer[-1].raw_text, "No.")
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    @patch("Converse.nlu.ner_converse.client.NER.__call__")
+    def test_skip_ner(self, mock_ner, mock_intent):
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": True, "intent": "positive", "prob": 0.9, "sent": text}
+            for text in texts
+        ]
+        res = self.im.info_pipeline(
+            "sounds good", "sounds good", self.ctx, plan=ModelPlan(["ner"])
+        )
+        mock_ner.assert_not_called()
+        mock_intent.assert_called_once()
+        self.assertEqual(res["ner"], {"success": True})
+        self.assertEqual(res["final_intent"]["intent"], "positive")
+        self.assertEqual(res["negation"]["wordlist"], ["sounds", "good"])
+
+
+if __name__ == "__main__":
+    unittest.main()
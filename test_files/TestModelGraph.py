@@ -0,0 +1,218 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from Converse.config.task_config import BotConfig, TaskConfig
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.dialog_info_layer.model_graph import GraphRunner, ModelGraph
+from Converse.utils.yaml_parser import load_entity, save_yaml
+
+
+def sleeping(result, seconds, log=None, name=None):
+    def call():
+        if log is not None:
+            log.append(("start", name))
+        time.sleep(seconds)
+        if log is not None:
+            log.append(("end", name))
+        return result
+
+    return call
+
+
+def failing():
+    raise RuntimeError("model down")
+
+
+class TestModelGraph(unittest.TestCase):
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            ModelGraph({"a": {"depends_on": ["b"]}})
+        with self.assertRaises(ValueError):
+            ModelGraph({"a": {"depends_on": ["b"]}, "b": {"depends_on": ["a"]}})
+        with self.assertRaises(ValueError):
+            ModelGraph({"a": {"timeout": 1.0}})
+        graph = ModelGraph({"a": {"depends_on": ["b"]}, "b": {}, "c": {}})
+        self.assertEqual(graph.order, ["b", "a", "c"])
+
+    def test_concurrent_and_dependencies(self):
+        runner = GraphRunner(ModelGraph({"a": {}, "b": {}, "c": {"depends_on": ["a"]}}))
+        log = []
+        start = time.perf_counter()
+        res = runner.run(
+            {
+                "a": sleeping(1, 0.2, log, "a"),
+                "b": sleeping(2, 0.2),
+                "c": sleeping(3, 0.0, log, "c"),
+            }
+        )
+        # a and b run concurrently, c waits for a
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual(res, {"a": 1, "b": 2, "c": 3})
+        self.assertLess(log.index(("end", "a")), log.index(("start", "c")))
+        # dependencies outside of the run are ignored
+        self.assertEqual(runner.run({"c": sleeping(3, 0.0)}), {"c": 3})
+
+    def test_deadline_fallback(self):
+        runner = GraphRunner(
+            ModelGraph(
+                {
+                    "slow": {"timeout": 0.1, "fallback": {"success": False}},
+                    "fast": {"timeout": 1.0, "fallback": {"success": False}},
+                    "after": {"depends_on": ["slow"]},
+                }
+            )
+        )
+        start = time.perf_counter()
+        res = runner.run(
+            {
+                "slow": sleeping({"success": True}, 0.5),
+                "fast": sleeping({"success": True}, 0.0),
+                "after": sleeping(0, 0.0),
+            }
+        )
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(res["slow"], {"success": False})
+        self.assertEqual(res["fast"], {"success": True})
+        self.assertEqual(res["after"], 0)
+        summary = runner.metrics.summary()
+        self.assertEqual(summary["slow"]["timeouts"], 1)
+        self.assertEqual(summary["fast"]["timeouts"], 0)
+        self.assertEqual(summary["after"]["calls"], 1)
+        self.assertGreaterEqual(summary["slow"]["latency_ms_p50"], 100.0)
+
+    def test_queue_wait(self):
+        runner = GraphRunner(
+            ModelGraph(
+                {
+                    "a": {"timeout": 0.3, "fallback": None},
+                    "b": {"timeout": 0.3, "fallback": None},
+                    "c": {"timeout": 0.3, "fallback": None},
+                }
+            ),
+            max_workers=1,
+        )
+        # one worker, b and c wait for a, their deadlines start with them
+        res = runner.run({name: sleeping(name, 0.15) for name in "abc"})
+        self.assertEqual(res, {"a": "a", "b": "b", "c": "c"})
+        summary = runner.metrics.summary()
+        self.assertEqual(sum(m["timeouts"] for m in summary.values()), 0)
+        self.assertLess(summary["c"]["latency_ms_p50"], 300.0)
+
+    def test_errors(self):
+        runner = GraphRunner(
+            ModelGraph({"a": {"fallback": {"success": False}}, "b": {}})
+        )
+        self.assertEqual(runner.run({"a": failing}), {"a": {"success": False}})
+        self.assertEqual(runner.metrics.summary()["a"]["errors"], 1)
+        with self.assertRaises(RuntimeError):
+            runner.run({"b": failing})
+
+    def test_async(self):
+        async def call(result, seconds):
+            await asyncio.sleep(seconds)
+            return result
+
+        runner = GraphRunner(
+            ModelGraph(
+                {
+                    "slow": {"timeout": 0.1, "fallback": None},
+                    "a": {},
+                    "b": {"depends_on": ["a"]},
+                }
+            )
+        )
+        res = asyncio.run(
+            runner.run_async(
+                {
+                    "slow": lambda: call(1, 0.5),
+                    "a": lambda: call(2, 0.1),
+                    "b": lambda: call(3, 0.1),
+                }
+            )
+        )
+        self.assertEqual(res, {"slow": None, "a": 2, "b": 3})
+        self.assertEqual(runner.metrics.summary()["slow"]["timeouts"], 1)
+
+
+class TestInfoManagerGraph(unittest.TestCase):
+    def setUp(self):
+        self.dialog_context = DialogContext(
+            entity_config=load_entity("test_files/test_entity_config.yaml"),
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+            bot_config=BotConfig("./test_files/test_tasks.yaml"),
+        )
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    @patch("Converse.nlu.ner_converse.client.NER.__call__")
+    def test_ner_deadline(self, mock_ner, mock_intent):
+        mock_ner.side_effect = lambda text, **kwargs: time.sleep(1.0)
+        mock_intent.side_effect = lambda texts, **kwargs: [
+            {"success": True, "intent": "t", "prob": 0.9, "sent": text}
+            for text in texts
+        ]
+        im = InfoManager(
+            "./Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+        im.graph.nodes["ner"].timeout = 0.2
+        res = im.info_pipeline("Yes.", "Yes.", self.dialog_context)
+        self.assertEqual(res["ner"], {"success": False})
+        self.assertEqual(res["final_intent"]["intent"], "t")
+        summary = im.metrics.summary()
+        self.assertEqual(summary["ner"]["timeouts"], 1)
+        self.assertEqual(summary["intent"]["timeouts"], 0)
+        # the gRPC requests get the deadlines of their models
+        self.assertEqual(mock_ner.call_args[1]["timeout"], 0.2)
+        self.assertEqual(mock_intent.call_args[1]["timeout"], 5.0)
+
+    @patch("Converse.nlu.intent_converse.client.IntentDetection.batch")
+    def test_intent_fallback(self, mock_intent):
+        mock_intent.side_effect = RuntimeError("intent server down")
+        im = InfoManager(
+            "./Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("./test_files/test_tasks.yaml"),
+        )
+        res = im.collect_info(
+            "Yes. No.", ["intent"], self.dialog_context, intent_texts=["No"]
+        )
+        fallback = {"success": False, "intent": "", "prob": 0.0, "sent": ""}
+        self.assertEqual(res["intent"], fallback)
+        self.assertEqual(res["intent_seg"], [fallback, fallback])
+        self.assertEqual(res["intent_extra"], [fallback])
+
+    def test_client_path(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            info_path = os.path.join(tmp_dir, "info.yaml")
+            save_yaml(
+                {
+                    "Models": {
+                        "negation_copy": {
+                            "client": "Converse.nlu.negation_detection."
+                            "negation_v2.NegationDetection",
+                            "init_args": {
+                                "model_path": "./Converse/bot_configs/"
+                                "negation_model_config"
+                            },
+                        }
+                    }
+                },
+                info_path,
+            )
+            im = InfoManager(info_path)
+        res = im.collect_info("i don't like it", ["negation_copy"], self.dialog_context)
+        self.assertEqual(res["negation_copy"]["triplets"][0][0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
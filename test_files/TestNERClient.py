@@ -0,0 +1,153 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from google.protobuf.json_format import MessageToJson, ParseDict
+
+import Converse.nlu.ner_converse.proto.ner_pb2 as ner_pb2
+from Converse.entity.entity import NamedEntityExtractor
+from Converse.nlu.ner_converse import client
+from Converse.nlu.ner_converse.client import NER, NERResult
+
+RESPONSES = [
+    {},
+    {"success": False, "error": "model not loaded"},
+    {"success": True},
+    {
+        "success": True,
+        "probabilities": [
+            {
+                "label": "CARDINAL",
+                "probability": 0.8929017186164856,
+                "token": "9 4 3",
+                "span": {"start": 14, "end": 19},
+            },
+            {"label": "CARDINAL", "probability": 0.38835767, "token": "k"},
+        ],
+    },
+    {
+        "success": True,
+        "probabilities": [
+            {
+                "label": "DUCKLING/email",
+                "token": "jane@example.com",
+                "normalizedValue": "jane@example.com",
+                "span": {"end": 16},
+            },
+            {
+                "label": "DUCKLING/number",
+                "token": "94020",
+                "normalizedValue": "94020.0",
+                "span": {"start": 45, "end": 50},
+            },
+            {
+                "label": "AP/LOCATION",
+                "probability": 0.9523145,
+                "token": "94020",
+                "normalizedValue": "ZipCode:94020",
+                "span": {"start": 45, "end": 50},
+            },
+            {
+                "label": "DATE",
+                "probability": 0.12766370177268982,
+                "token": "tomorrow",
+                "span": {"start": 0, "end": 8},
+            },
+        ],
+    },
+]
+
+
+def entity_tuples(entities):
+    return [
+        (type(e), e.value, e.user_utt_value, e.score, e.span, e.ner_label)
+        for e in entities
+    ]
+
+
+class TestNERResult(unittest.TestCase):
+    def setUp(self):
+        self.messages = [
+            ParseDict(response, ner_pb2.NERPredictionResponse())
+            for response in RESPONSES
+        ]
+
+    def test_json_parity(self):
+        for message in self.messages:
+            result = NERResult.from_proto(message)
+            expected = json.loads(MessageToJson(message))
+            self.assertEqual(result.to_dict(), expected)
+            self.assertEqual(result, expected)
+            self.assertEqual(sorted(result.keys()), sorted(expected.keys()))
+            self.assertEqual(bool(result), bool(expected))
+
+    def test_mapping_access(self):
+        result = NERResult.from_proto(self.messages[2])
+        self.assertNotIn("probabilities", result)
+        self.assertEqual(result.probabilities, [])
+        with self.assertRaises(KeyError):
+            result["probabilities"]
+
+        result = NERResult.from_proto(self.messages[4])
+        email = result["probabilities"][0]
+        self.assertNotIn("probability", email)
+        self.assertNotIn("start", email["span"])
+        self.assertEqual(email["span"]["end"], 16)
+        self.assertEqual(email.span.end, 16)
+        email["label"] = "EMAIL"
+        self.assertEqual(email.label, "EMAIL")
+        self.assertIn("start", result["probabilities"][1]["span"])
+
+    def test_probability_json_form(self):
+        message = self.messages[3]
+        with patch.object(
+            client, "shortest_float", side_effect=client.shortest_float
+        ) as mock_shortest:
+            result = NERResult.from_proto(message)
+            mock_shortest.assert_not_called()
+            entity = result.probabilities[1]
+            self.assertEqual(entity.probability, message.probabilities[1].probability)
+            self.assertEqual(entity["probability"], 0.38835767)
+            self.assertEqual(entity.get("probability"), 0.38835767)
+            self.assertEqual(entity.to_dict()["probability"], 0.38835767)
+            # rounded once per entity
+            self.assertEqual(mock_shortest.call_count, 1)
+        entity["probability"] = 0.5
+        self.assertEqual(entity["probability"], 0.5)
+
+    def test_copy(self):
+        result = NERResult.from_proto(self.messages[3])
+        copied = result.copy()
+        copied["success"] = False
+        self.assertTrue(result.success)
+        self.assertIs(copied.probabilities, result.probabilities)
+
+    def test_named_entity_extractor(self):
+        for message in self.messages:
+            typed = NamedEntityExtractor(NERResult.from_proto(message)).extract("")
+            expected = NamedEntityExtractor(json.loads(MessageToJson(message)))
+            self.assertEqual(entity_tuples(typed), entity_tuples(expected.extract("")))
+
+    def test_client(self):
+        ner = NER("localhost:50051")
+        ner.stub = MagicMock()
+        ner.stub.predict.return_value = self.messages[4]
+        result = ner("jane@example.com", returnSpan=True)
+        self.assertIsInstance(result, NERResult)
+        self.assertEqual(result, json.loads(MessageToJson(self.messages[4])))
+        request = ner.stub.predict.call_args[0][0]
+        self.assertEqual(request.document, b"jane@example.com")
+        self.assertTrue(request.returnSpan)
+        self.assertIsNone(ner.stub.predict.call_args[1]["timeout"])
+        ner("jane@example.com", timeout=0.5)
+        self.assertEqual(ner.stub.predict.call_args[1]["timeout"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
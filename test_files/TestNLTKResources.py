@@ -0,0 +1,91 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import nltk
+
+from Converse.config.task_config import TaskConfig
+from Converse.dialog_info_layer.dial_info import InfoManager
+from Converse.utils import nltk_resources
+from Converse.utils.nltk_resources import NLTKResources
+
+
+def data_available():
+    try:
+        nltk.data.find("tokenizers/punkt")
+        nltk.data.find("taggers/averaged_perceptron_tagger")
+    except LookupError:
+        return False
+    return True
+
+
+class TestNLTKResources(unittest.TestCase):
+    def test_import_offline(self):
+        # a fresh interpreter, where any NLTK download fails the import
+        code = (
+            "import nltk\n"
+            "def download(*args, **kwargs):\n"
+            "    raise AssertionError('network access')\n"
+            "nltk.download = download\n"
+            "import Converse.nlu.negation_detection.negation_v2\n"
+            "import Converse.dialog_info_layer.dial_info\n"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    @patch("nltk.download", side_effect=AssertionError("network access"))
+    def test_missing_data(self, mock_download):
+        with tempfile.TemporaryDirectory() as data_dir:
+            resources = NLTKResources(data_dirs=[data_dir])
+            with patch.object(nltk.data, "path", []):
+                with self.assertRaises(LookupError):
+                    resources.warmup()
+                self.assertEqual(nltk.data.path, [data_dir])
+        self.assertFalse(resources.warm)
+        mock_download.assert_not_called()
+
+    def test_search_dirs(self):
+        with patch.dict(os.environ, {"CONVERSE_NLTK_DATA": os.pathsep.join("ab")}):
+            self.assertEqual(
+                NLTKResources().search_dirs(),
+                ["a", "b", nltk_resources.BUNDLED_DATA_DIR],
+            )
+        with patch.object(nltk.data, "path", ["x", "b"]):
+            NLTKResources(data_dirs=["a", "b"]).configure()
+            self.assertEqual(nltk.data.path, ["a", "b", "x"])
+
+    @patch.object(
+        nltk_resources.resources, "warmup", side_effect=LookupError("no NLTK data")
+    )
+    def test_lazy_load(self, mock_warmup):
+        # building the bot does not need the data, the serving entry points
+        # load it with warmup
+        InfoManager(
+            "Converse/bot_configs/dial_info_config.yaml",
+            task_config=TaskConfig("test_files/test_tasks.yaml"),
+        )
+        mock_warmup.assert_not_called()
+
+    @unittest.skipUnless(data_available(), "NLTK data not installed")
+    def test_warmup(self):
+        resources = NLTKResources(data_dirs=[])
+        timings = resources.warmup()
+        self.assertEqual(sorted(timings), ["tagger_ms", "tokenizer_ms", "warmup_ms"])
+        tagger = resources.tagger()
+        self.assertIs(resources.warmup(), timings)
+        self.assertIs(resources.tagger(), tagger)
+        tokens = nltk.word_tokenize("I don't want the red bike.")
+        self.assertEqual(tagger.tag(tokens), nltk.pos_tag(tokens))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import random
+import string
+import unittest
+
+from nltk.sentiment.util import mark_negation
+
+from Converse.nlu.negation_detection.negation_v2 import (
+    NEGATION_ADVERBS,
+    NEGATION_VERBS,
+    SELECTED_POS_TAGS,
+    NegationDetection,
+)
+from Converse.utils.annotation import UtteranceAnnotation
+
+MODEL_PATH = "./Converse/bot_configs/negation_model_config"
+CORPUS = [
+    "we do not like the dog.",
+    "I hate to eat egg",
+    "today is very good",
+    "i am unhappy today, so I would not go there.",
+    "I don't like pickle, it is really disgusting",
+    "I really hate updating my password",
+    "I don't mind providing my social",
+    "A whole combo pizza would not be a bad idea, thanks!",
+    "No.",
+    "not now",
+    "never, ever",
+    "I didn't. Not at all!",
+    "It isn't the red one, it's the blue one.",
+    "I can't find my order and I won't wait",
+    "don't cancel it ; don't",
+    "Nothing else, thanks.",
+    "I disagree with the unpaid invoice",
+    "Neither the bike nor the helmet arrived",
+    "I refuse to pay without a receipt",
+    "The delivery wasn't late but the box was damaged and unusable",
+    "",
+    "...",
+    "Not",
+    "no no no",
+    "The order number is 12345 not 54321",
+    "I'd rather not say",
+]
+WORDS = [
+    "not",
+    "no",
+    "never",
+    "don't",
+    "n't",
+    "do",
+    "unhappy",
+    "dislike",
+    "deny",
+    "nor",
+    "bad",
+    "good",
+    "the",
+    "bike",
+    "i",
+    "like",
+    "it",
+    ",",
+    ".",
+    "!",
+    ";",
+    "()",
+    "-",
+    "",
+    "very",
+    "to",
+    "nothing",
+    "nowhere",
+    "wouldnt",
+    "won't",
+    "isn't",
+    "aint",
+]
+TAGS = sorted(SELECTED_POS_TAGS) + ["PRP", "IN", "CC", ",", ".", ":", "CD"]
+
+
+class LegacyNegationDetection:
+    """ The detection before the single pass rewrite, as the regression reference """
+
+    def __init__(self, model_path):
+        with open(model_path + "/negative_words.txt", encoding="utf-8") as f:
+            self.neg_word_set = set([line.rstrip("\n") for line in f])
+
+    def scope_detection(self, word_pos_list, neg_id):
+        indictors = []
+        for id, pair in enumerate(word_pos_list):
+            if (
+                pair[1] in SELECTED_POS_TAGS
+                and id != neg_id
+                and (pair[0] not in string.punctuation)
+            ):
+                indictors.append(1)
+            else:
+                indictors.append(0)
+        left_most = neg_id - 1
+        while indictors[left_most] != 1:
+            left_most -= 1
+            if left_most < 0 and -left_most > len(indictors):
+                left_most += 1
+                break
+        right_most = neg_id + 1
+        while right_most < len(indictors) and indictors[right_most] != 1:
+            right_most += 1
+        scope_list = []
+        for i in range(right_most, len(word_pos_list)):
+            if indictors[i] == 1:
+                scope_list.append(word_pos_list[i][0])
+            else:
+                break
+        if len(scope_list) > 0:
+            return (right_most, right_most + len(scope_list))
+        else:
+            return (len(indictors), len(indictors))
+
+    def detect(self, wordlist, word_pos_list):
+        nltk_neg_mark_list = mark_negation(wordlist)
+        nltk_start = -1
+        nltk_end = -1
+        for idd, word in enumerate(nltk_neg_mark_list):
+            if word.find("_NEG") > 0:
+                nltk_end = idd
+                if nltk_start == -1:
+                    nltk_start = idd
+        if nltk_end != -1:
+            nltk_end += 1
+        nltk_find = nltk_end > nltk_start
+        fine_negation = False
+        returned_triplets = []
+        for id, pair in enumerate(word_pos_list):
+            word = pair[0]
+            if (
+                word in NEGATION_ADVERBS
+                or word in NEGATION_VERBS
+                or word in self.neg_word_set
+                or word[:2] == "un"
+                or word[:3] == "dis"
+            ):
+                scope_tuple = self.scope_detection(word_pos_list, id)
+                returned_triplets.append((id, scope_tuple[0], scope_tuple[1]))
+                fine_negation = True
+        if fine_negation is False and nltk_find is False:
+            returned_triplets.append((-1, -1, -1))
+        return {"wordlist": wordlist, "triplets": returned_triplets}
+
+    def __call__(self, strr):
+        annotation = UtteranceAnnotation(strr.lower())
+        return self.detect(list(annotation.tokens), annotation.pos_tags)
+
+
+class TestNegationDetection(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.negation = NegationDetection(MODEL_PATH)
+        cls.legacy = LegacyNegationDetection(MODEL_PATH)
+
+    def test_corpus(self):
+        for sent in CORPUS:
+            self.assertEqual(self.negation(sent), self.legacy(sent), sent)
+
+    def test_random_tags(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            word_pos_list = [
+                (rng.choice(WORDS), rng.choice(TAGS)) for _ in range(rng.randint(1, 15))
+            ]
+            wordlist = [word for word, _ in word_pos_list]
+            self.assertEqual(
+                self.negation.detect(word_pos_list),
+                self.legacy.detect(wordlist, word_pos_list),
+                word_pos_list,
+            )
+
+    def test_scope_detection(self):
+        word_pos_list = [
+            ("i", "PRP"),
+            ("do", "VBP"),
+            ("not", "RB"),
+            ("like", "VB"),
+            ("the", "DT"),
+            ("dog", "NN"),
+            (".", "."),
+        ]
+        self.assertEqual(self.negation.scope_detection(word_pos_list, 2), (3, 6))
+        self.assertEqual(self.negation.scope_detection(word_pos_list, 5), (7, 7))
+
+    def test_annotation(self):
+        for sent in CORPUS:
+            annotation = UtteranceAnnotation(sent)
+            self.assertEqual(
+                self.negation(sent, annotation=annotation), self.legacy(sent), sent
+            )
+
+    def test_batch(self):
+        self.assertEqual(
+            self.negation.batch(CORPUS), [self.legacy(sent) for sent in CORPUS]
+        )
+        self.assertEqual(self.negation.batch([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import random
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from test_files.TestNerTokenizer import (
+    MISSING,
+    NER_DIR,
+    TRICKY,
+    tiny_model,
+    unload_server_modules,
+)
+
+MISSING = MISSING + [m for m in ["grpc"] if importlib.util.find_spec(m) is None]
+
+
+def entities(response):
+    """ The fields of a response, the probabilities apart """
+    return (
+        response.success,
+        response.error,
+        response.normalizedValue,
+        [
+            (p.label, p.token, p.normalizedValue, p.span.start, p.span.end)
+            for p in response.probabilities
+        ],
+        [p.probability for p in response.probabilities],
+    )
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestNerBatching(unittest.TestCase):
+    """
+    The texts tagged together, padded to the longest one, get the responses
+    they get when tagged one by one.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        unload_server_modules()
+        sys.path.insert(0, NER_DIR)
+        from tinybert_ner import NerPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.predictor = NerPredictor(
+            cls.tmp.name, fast_tokenizer=True, window_size=16, window_stride=8
+        )
+        # batches of texts over several forward passes
+        cls.predictor.per_gpu_eval_batch_size = 4
+        rng = random.Random(0)
+        cls.texts = TRICKY + [
+            " ".join(rng.choice(TRICKY) for _ in range(rng.randint(1, 8)))
+            for _ in range(20)
+        ]
+        cls.spans = [i % 3 != 0 for i in range(len(cls.texts))]
+        cls.expected = [
+            entities(cls.predictor.predict(text, span))
+            for text, span in zip(cls.texts, cls.spans)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(NER_DIR)
+        unload_server_modules()
+
+    def assertResponses(self, responses, expected):
+        self.assertEqual(len(responses), len(expected))
+        for response, (*fields, probabilities) in zip(responses, expected):
+            # the padding of a batch moves the probabilities a little
+            self.assertEqual(entities(response)[:-1], tuple(fields))
+            for p, expected_p in zip(entities(response)[-1], probabilities):
+                self.assertAlmostEqual(p, expected_p, places=5)
+
+    def batcher(self, **kwargs):
+        from batcher import BatchingNerPredictor
+
+        return BatchingNerPredictor(self.predictor, log_every=0, **kwargs)
+
+    def test_predict_batch(self):
+        self.assertTrue(any(labels for _, _, _, labels, _ in self.expected))
+        responses = self.predictor.predict_batch(self.texts, self.spans)
+        self.assertResponses(responses, self.expected)
+        responses = self.predictor.predict_batch(self.texts, True)
+        self.assertResponses(
+            responses, [entities(self.predictor.predict(text)) for text in self.texts]
+        )
+
+    def test_split_back(self):
+        batcher = self.batcher(max_wait_ms=200)
+        with ThreadPoolExecutor(len(self.texts)) as pool:
+            responses = list(pool.map(batcher.predict, self.texts, self.spans))
+        self.assertResponses(responses, self.expected)
+        stats = batcher.stats.summary()
+        self.assertEqual(stats["requests"], len(self.texts))
+        self.assertGreater(stats["batch_size_max"], 1)
+        # a batch request is split among the batches of max_batch_size texts
+        batcher = self.batcher(max_wait_ms=50, max_batch_size=5)
+        responses = batcher.predict_batch(self.texts, self.spans)
+        self.assertResponses(responses, self.expected)
+        self.assertEqual(batcher.stats.summary()["batch_size_max"], 5)
+
+    def test_error_propagation(self):
+        batcher = self.batcher(max_wait_ms=200)
+        with patch.object(
+            self.predictor, "predict_batch", side_effect=RuntimeError("out of memory")
+        ):
+            with ThreadPoolExecutor(len(self.texts)) as pool:
+                futures = [pool.submit(batcher.predict, text) for text in self.texts]
+                for future in futures:
+                    with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                        future.result()
+        self.assertEqual(batcher.stats.summary()["requests"], len(self.texts))
+        self.assertResponses(
+            [batcher.predict(self.texts[0], self.spans[0])], self.expected[:1]
+        )
+
+    def test_servicer(self):
+        from proto import ner_pb2
+        from servicer import NerServicer
+
+        documents = [text.encode("utf-8") for text in self.texts]
+        for predictor in [self.predictor, self.batcher(max_wait_ms=5)]:
+            servicer = NerServicer(predictor)
+            response = servicer.predictBatch(
+                ner_pb2.NERPredictionBatchRequest(documents=documents, returnSpan=True),
+                None,
+            )
+            singles = [
+                servicer.predict(
+                    ner_pb2.NERPredictionRequest(document=document, returnSpan=True),
+                    None,
+                )
+                for document in documents
+            ]
+            self.assertResponses(
+                response.responses, [entities(single) for single in singles]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
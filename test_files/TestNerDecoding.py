@@ -0,0 +1,353 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import random
+import sys
+import tempfile
+import unittest
+
+from test_files.TestNerTokenizer import MISSING, NER_DIR, TRICKY, tiny_model
+
+
+class LoopDecoder:
+    """ The token by token decoder replaced by the vectorized one """
+
+    def __init__(self, predictor):
+        self.id2tag = predictor.id2tag
+        self.id2tag_addr = predictor.id2tag_addr
+        self.generate_entity = predictor.generate_entity
+        self.generate_entity_addr = predictor.generate_entity_addr
+
+    @staticmethod
+    def is_entity(tag_prev, tag_cur):
+        token_change = tag_cur != tag_prev
+        return (
+            token_change and (tag_cur != "O"),
+            token_change and (tag_prev != "O") and (tag_prev is not None),
+        )
+
+    def decode_entities(
+        self, text, token_starts, token_ends, preds, probabilities, return_span
+    ):
+        tags = [self.id2tag[x] for x in preds]
+        predictions = []
+        start_idx, end_idx = -1, -1
+        tag_prev, prob_prev = None, None
+        for token_start, token_end, tag, prob in zip(
+            token_starts, token_ends, tags, probabilities
+        ):
+            # token = text[token_start:token_end]
+            if "-" in tag:
+                tag = tag.split("-")[1]
+            elif "_" in tag:
+                tag = tag.split("_")[1]
+
+            # if token.startswith('##'):
+            #     end_idx = token_end
+            #     continue
+            if token_start == end_idx:
+                tag = tag_prev
+
+            is_begin, is_end = self.is_entity(tag_prev, tag)
+
+            # note there are cases when both is_begin and is_end are true. For
+            # example, LOC, LOC, DATE. In this case DATE is both the end of the
+            # previous entity and the beginning of the current entity
+            # In this case is_end has to be processed first
+            if is_end:
+                if end_idx is None:  # take care of [UNK] tokens
+                    end_idx = token_start
+                entity = self.generate_entity(
+                    text=text,
+                    tag=tag_prev,
+                    probability=prob_prev,
+                    start=start_idx,
+                    end=end_idx,
+                    return_span=return_span,
+                )
+                predictions.append(entity)
+                tag_prev, prob_prev = None, None
+
+            if is_begin:
+                tag_prev, prob_prev, start_idx = tag, prob, token_start
+
+            end_idx = token_end
+
+        # check if there is any entity in the cache. if so record it
+        if tag_prev is not None:
+            if end_idx is None:  # take care of [UNK] tokens
+                end_idx = token_start
+            entity = self.generate_entity(
+                text=text,
+                tag=tag_prev,
+                probability=prob_prev,
+                start=start_idx,
+                end=end_idx,
+                return_span=return_span,
+            )
+            predictions.append(entity)
+
+        return predictions
+
+    def decode_entities_addr(
+        self, text, token_starts, token_ends, preds_addr, probabilities, return_span
+    ):
+        tags = [
+            self.id2tag_addr[x] if "Recipient" not in self.id2tag_addr[x] else "O"
+            for x in preds_addr
+        ]  # remove the recipient tag detected by the address parser
+        predictions = []
+        tags_cache, start_idx_cache, end_idx_cache, probs_cache, token_prev = (
+            [],
+            [],
+            [],
+            1.0,
+            None,
+        )
+        start_idx, end_idx = -1, -1
+        tag_prev, prob_prev = None, None
+        for token_start, token_end, tag, prob in zip(
+            token_starts, token_ends, tags, probabilities
+        ):
+            if "-" in tag:
+                tag = tag.split("-")[1]
+            elif "_" in tag:
+                tag = tag.split("_")[1]
+
+            if token_start == end_idx:
+                tag = tag_prev
+
+            is_begin, is_end = self.is_entity(tag_prev, tag)
+
+            # note there are cases when both is_begin and is_end are true. For
+            # example, LOC, LOC, DATE. In this case DATE is both the end of the
+            # previous entity and the beginning of the current entity
+            # In this case is_end has to be processed first
+            if is_end:
+                if end_idx is None:  # take care of [UNK] tokens
+                    end_idx = token_start
+
+                if (
+                    (not end_idx_cache)
+                    or (start_idx == end_idx_cache[-1] + 1)
+                    or (token_prev == ",")
+                ):
+                    tags_cache.append(tag_prev)
+                    start_idx_cache.append(start_idx)
+                    end_idx_cache.append(end_idx)
+                    probs_cache *= prob_prev
+                else:
+                    entity = self.generate_entity_addr(
+                        text=text,
+                        tag_cache=tags_cache,
+                        probability=probs_cache,
+                        start_cache=start_idx_cache,
+                        end_cache=end_idx_cache,
+                        return_span=return_span,
+                    )
+                    tags_cache, start_idx_cache, end_idx_cache, probs_cache = (
+                        [tag],
+                        [start_idx],
+                        [end_idx],
+                        prob_prev,
+                    )
+                    predictions.append(entity)
+                tag_prev, prob_prev = None, None
+
+            if is_begin:
+                tag_prev, prob_prev, start_idx = tag, prob, token_start
+
+            end_idx = token_end
+            token_prev = text[token_start:token_end]
+
+        # check if there is any entity in the cache. if so record it
+        if tag_prev is not None:
+            if end_idx is None:  # take care of [UNK] tokens
+                end_idx = token_start
+            if (not end_idx_cache) or (start_idx == end_idx_cache[-1] + 1):
+                tags_cache.append(tag_prev)
+                start_idx_cache.append(start_idx)
+                end_idx_cache.append(end_idx)
+                probs_cache *= prob_prev
+            if tags_cache:
+                entity = self.generate_entity_addr(
+                    text=text,
+                    tag_cache=tags_cache,
+                    probability=probs_cache,
+                    start_cache=start_idx_cache,
+                    end_cache=end_idx_cache,
+                    return_span=return_span,
+                )
+                predictions.append(entity)
+
+        return predictions
+
+
+def random_tags(rng, n_tokens, n_tags):
+    """ Mostly "O" with runs of entity tags, like the model output """
+    tags, tag = [], 0
+    for _ in range(n_tokens):
+        if rng.random() < 0.3:
+            tag = 0 if rng.random() < 0.4 else rng.randrange(1, n_tags)
+        tags.append(tag)
+    return tags
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestNerDecoding(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, NER_DIR)
+        from tinybert_ner import NerPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.predictors = [
+            NerPredictor(cls.tmp.name),
+            NerPredictor(cls.tmp.name, fast_tokenizer=True),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(NER_DIR)
+
+    def corpus(self, predictor, n_random=300):
+        """ Tokenized texts with random tags, [UNK] ends are None with token_align """
+        rng = random.Random(0)
+        texts = TRICKY + [
+            " ".join(rng.choice(TRICKY) for _ in range(rng.randint(1, 6)))
+            for _ in range(n_random)
+        ]
+        for text, _, token_starts, token_ends in predictor.texts2ids(texts):
+            n = len(token_starts)
+            yield (
+                text,
+                token_starts,
+                token_ends,
+                random_tags(rng, n, len(predictor.id2tag)),
+                [rng.random() for _ in range(n)],
+                random_tags(rng, n, len(predictor.id2tag_addr)),
+                [rng.random() for _ in range(n)],
+            )
+
+    def test_regression(self):
+        for predictor in self.predictors:
+            loop = LoopDecoder(predictor)
+            for text, starts, ends, preds, probs, preds_addr, probs_addr in self.corpus(
+                predictor
+            ):
+                for return_span in [True, False]:
+                    self.assertEqual(
+                        predictor.decode_entities(
+                            text, starts, ends, preds, probs, return_span
+                        ),
+                        loop.decode_entities(
+                            text, starts, ends, preds, probs, return_span
+                        ),
+                        text,
+                    )
+                    self.assertEqual(
+                        predictor.decode_entities_addr(
+                            text, starts, ends, preds_addr, probs_addr, return_span
+                        ),
+                        loop.decode_entities_addr(
+                            text, starts, ends, preds_addr, probs_addr, return_span
+                        ),
+                        text,
+                    )
+
+    def test_model_output(self):
+        predictor = self.predictors[1]
+        responses = predictor.predict_batch(TRICKY)
+        self.assertTrue(any(response.probabilities for response in responses))
+        for text, response in zip(TRICKY, responses):
+            for prediction in response.probabilities:
+                self.assertEqual(
+                    text[prediction.span.start : prediction.span.end], prediction.token
+                )
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestNerWindows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, NER_DIR)
+        from tinybert_ner import NerPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.full = NerPredictor(cls.tmp.name, fast_tokenizer=True, window_size=512)
+        cls.windowed = NerPredictor(
+            cls.tmp.name, fast_tokenizer=True, window_size=16, window_stride=8
+        )
+        rng = random.Random(0)
+        cls.texts = TRICKY + [
+            " ".join(rng.choice(TRICKY) for _ in range(rng.randint(5, 20)))
+            for _ in range(20)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(NER_DIR)
+
+    def test_windows(self):
+        size = self.windowed.max_seq_length - 2
+        self.assertEqual(self.windowed.windows(0), [(0, 0)])
+        self.assertEqual(self.windowed.windows(size), [(0, size)])
+        for n_tokens in range(size + 1, 100):
+            windows = self.windowed.windows(n_tokens)
+            self.assertEqual(windows[0][0], 0)
+            self.assertEqual(windows[-1][1], n_tokens)
+            for (start, end), (next_start, _) in zip(windows, windows[1:]):
+                self.assertEqual(end - start, size)
+                self.assertLessEqual(next_start - start, 8)
+
+    def test_short_texts_unchanged(self):
+        short = [t for t in self.texts if len(self.windowed.texts2ids([t])[0][1]) <= 14]
+        self.assertTrue(short)
+        self.assertEqual(
+            self.windowed.predict_batch(short), self.full.predict_batch(short)
+        )
+
+    def test_merge_highest_probability(self):
+        predictor = self.windowed
+        text = self.texts[-1]
+        _, token_ids, token_starts, token_ends = predictor.texts2ids([text])[0]
+        windows = predictor.windows(len(token_ids))
+        self.assertGreater(len(windows), 2)
+        probs, preds = [-1.0] * len(token_ids), [0] * len(token_ids)
+        for start, end in windows:
+            window_probs, window_preds, _, _ = predictor.tag_windows(
+                [token_ids[start:end]]
+            )
+            for k in range(end - start):
+                if window_probs[0, k] > probs[start + k]:
+                    probs[start + k] = window_probs[0, k]
+                    preds[start + k] = window_preds[0, k]
+        expected = predictor.decode_entities(
+            text, token_starts, token_ends, preds, probs, True
+        )
+        ner_entities = [
+            p for p in predictor.predict(text).probabilities if p.label != "AP/LOCATION"
+        ]
+        self.assertEqual(ner_entities, expected)
+
+    def test_spans(self):
+        text = " ".join(self.texts) * 3
+        self.assertGreater(len(self.full.texts2ids([text])[0][1]), 510)
+        response = self.windowed.predict(text)
+        self.assertTrue(response.success)
+        self.assertTrue(response.probabilities)
+        for prediction in response.probabilities:
+            self.assertEqual(
+                text[prediction.span.start : prediction.span.end], prediction.token
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import importlib.util
+import os
+import string
+import sys
+import tempfile
+import unittest
+import unicodedata
+
+NER_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Converse",
+    "nlu",
+    "ner_converse",
+)
+MISSING = [
+    m
+    for m in ["torch", "transformers", "tokenizers"]
+    if importlib.util.find_spec(m) is None
+]
+
+WORDS = (
+    "i love new york my email is jane doe example com cafe in zurich on friday "
+    "call me at ship to market st sf ca tomorrow pm don t the naive resume "
+    "tower hello there order number please jan ##ing ##mber ##05 55"
+).split()
+
+TRICKY = [
+    "i love New York",
+    "my email is jane.doe@example.com",
+    "call me at (650) 555-0100!!",
+    "ship to 1 Market St., SF, CA 94105",
+    "tomorrow at 7pm?",
+    "don't",
+    "I'm at the U.S.A.",
+    "a  b   c",
+    "tab\there",
+    "hello ☃",
+    "☃",
+    "hi ☃ there",
+    "x ☃☃ y",
+    "東京 tower",
+    "ＡＢＣ full width",
+    "café in Zürich on Friday",
+    "Naïve résumé",
+    "  leading and trailing  ",
+    "",
+]
+
+
+def unload_server_modules():
+    """
+    The intent and the ner servers both have top level proto, batcher and
+    servicer modules, imported from whichever server directory is on the path
+    """
+    for name in list(sys.modules):
+        if name.split(".")[0] in {"proto", "batcher", "servicer", "aggr"}:
+            del sys.modules[name]
+
+
+def tiny_model(path):
+    """ A randomly initialized two layer NerAddrParser with a wordpiece vocabulary """
+    import torch
+    import transformers
+    from tinybert_ner import NerAddrParser
+
+    chars = list(string.ascii_lowercase + string.digits + string.punctuation)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + chars
+    vocab += ["##" + c for c in string.ascii_lowercase + string.digits]
+    vocab += [w for w in WORDS if w not in vocab]
+    with open(os.path.join(path, "vocab.txt"), "w") as f:
+        f.write("\n".join(vocab) + "\n")
+    id2tag_ner = ["O", "B-LOC", "I-LOC", "B-DATE", "I-DATE", "B-PER", "I-PER"]
+    id2tag_addr = ["O", "B-Street", "I-Street", "B-City", "B-State", "B-Zip"]
+    torch.save(
+        {
+            "num_tags_ner": len(id2tag_ner),
+            "num_tags_addr": len(id2tag_addr),
+            "id2tag_ner": dict(enumerate(id2tag_ner)),
+            "id2tag_addr": dict(enumerate(id2tag_addr)),
+            "mask_id": 0,
+        },
+        os.path.join(path, "config.pt"),
+    )
+    config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    torch.manual_seed(0)
+    NerAddrParser(config, len(id2tag_ner), len(id2tag_addr)).save_pretrained(path)
+
+
+def strip_accents(text):
+    return "".join(
+        c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn"
+    )
+
+
+@unittest.skipIf(MISSING, "requires {}".format(", ".join(MISSING)))
+class TestNerTokenizer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, NER_DIR)
+        from tinybert_ner import NerPredictor
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        tiny_model(cls.tmp.name)
+        cls.slow = NerPredictor(cls.tmp.name)
+        cls.fast = NerPredictor(cls.tmp.name, fast_tokenizer=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        sys.path.remove(NER_DIR)
+
+    def aligned(self, text):
+        """ token_align found a complete span for every token """
+        _, token_ids, token_starts, token_ends = self.slow.text2id(text)
+        return len(token_starts) == len(token_ids) and None not in token_ends
+
+    def test_token_ids(self):
+        slow = [token_ids for _, token_ids, _, _ in self.slow.texts2ids(TRICKY)]
+        fast = [token_ids for _, token_ids, _, _ in self.fast.texts2ids(TRICKY)]
+        self.assertEqual(fast, slow)
+
+    def test_offsets_parity(self):
+        aligned = [text for text in TRICKY if self.aligned(text)]
+        self.assertGreater(len(aligned), len(TRICKY) // 2)
+        for text in aligned:
+            self.assertEqual(self.fast.texts2ids([text]), [self.slow.text2id(text)])
+
+    def test_offsets_cover_tokens(self):
+        # also where token_align gives up: accents, [UNK] ends and CJK characters
+        for text, token_ids, token_starts, token_ends in self.fast.texts2ids(TRICKY):
+            tokens = self.fast.tokenizer.convert_ids_to_tokens(token_ids)
+            for token, start, end in zip(tokens, token_starts, token_ends):
+                self.assertLess(start, end)
+                if token != "[UNK]":
+                    self.assertEqual(
+                        strip_accents(text[start:end].lower()), token.lstrip("#")
+                    )
+
+    def test_prediction_spans(self):
+        aligned = [text for text in TRICKY if self.aligned(text)]
+        for slow, fast in zip(
+            self.slow.predict_batch(aligned), self.fast.predict_batch(aligned)
+        ):
+            self.assertEqual(fast, slow)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import random
+import unittest
+
+from fuzzysearch import find_near_matches
+
+from Converse.config.task_config import BotConfig
+from Converse.utils.phrase_matcher import PhraseMatcher
+
+# the keyword lists of Orchestrator.pause_detection before the matcher
+LEGACY_HOLD = [
+    "hold a second",
+    "hold a sec",
+    "hold a 2nd",
+    "hold a moment",
+    "wait a second",
+    "wait a sec",
+    "wait a 2nd",
+    "wait a moment",
+]
+LEGACY_RESUME = [
+    "okay I'm back",
+    "ok i'm back",
+    "i'm back ok" "i'm back",
+    "i am back",
+]
+
+# utterance -> (has a hold phrase, has a resume phrase)
+CORPUS = {
+    "hold a second": (True, False),
+    "Hold a sec please": (True, False),
+    "can you hold a moment": (True, False),
+    "wait a 2nd": (True, False),
+    "wait a minute": (True, False),
+    "wait wait a second i need my card": (True, False),
+    "hold on a sec": (True, False),
+    "please wait a moment": (True, False),
+    "hod a secnd": (True, False),
+    "OK I'm back": (False, True),
+    "okay im back": (False, True),
+    "I'm back": (False, True),
+    "i am back now": (False, True),
+    "im back": (False, True),
+    "i'm bak": (False, True),
+    "alright i am back, where were we": (False, True),
+    "back": (False, False),
+    "i'm black": (False, True),
+    "hello": (False, False),
+    "check the weather": (False, False),
+    "my zip code is 94301": (False, False),
+    "what is the second option": (False, False),
+    "i want a tv plan": (False, False),
+    "hold": (False, False),
+    "a second": (False, False),
+    "i am bad": (False, True),
+    "wait a second i'm back": (True, True),
+    "": (False, False),
+}
+
+
+def legacy_found(keywords, utt):
+    utter = utt.lower()
+    return any(find_near_matches(k, utter, max_l_dist=3) for k in keywords)
+
+
+class TestPhraseMatcher(unittest.TestCase):
+    def setUp(self):
+        bot_config = BotConfig("test_files/test_tasks.yaml")
+        self.matcher = PhraseMatcher(
+            {"hold": bot_config.hold_keywords, "resume": bot_config.resume_keywords}
+        )
+
+    def test_corpus(self):
+        for utt, (hold, resume) in CORPUS.items():
+            found = self.matcher.match(utt)
+            self.assertEqual(("hold" in found, "resume" in found), (hold, resume), utt)
+            # the same decisions as the keywords and search before the matcher
+            self.assertEqual(legacy_found(LEGACY_HOLD, utt), hold, utt)
+            self.assertEqual(legacy_found(LEGACY_RESUME, utt), resume, utt)
+
+    def test_parity(self):
+        rng = random.Random(0)
+        phrases = list(self.matcher.groups["hold"]) + list(
+            self.matcher.groups["resume"]
+        )
+        for _ in range(500):
+            chars = list(rng.choice(phrases))
+            for _ in range(rng.randint(0, 6)):
+                pos = rng.randint(0, len(chars))
+                op = rng.random()
+                if op < 0.4:
+                    chars.insert(pos, rng.choice("abcdehikmnostw' "))
+                elif chars[pos:]:
+                    if op < 0.7:
+                        del chars[pos]
+                    else:
+                        chars[pos] = rng.choice("abcdehikmnostw' ")
+            utt = rng.choice(["", "um ", "so "]) + "".join(chars)
+            found = self.matcher.match(utt)
+            for group, keywords in self.matcher.groups.items():
+                self.assertEqual(group in found, legacy_found(keywords, utt), utt)
+
+    def test_short_phrases(self):
+        matcher = PhraseMatcher({"a": ["ab"], "b": ["abcdef"]}, max_l_dist=1)
+        self.assertEqual(matcher.match(""), set())
+        self.assertEqual(matcher.match("xbx"), {"a"})
+        self.assertEqual(matcher.match("ABCXEF"), {"a", "b"})
+        with self.assertRaises(ValueError):
+            PhraseMatcher({"a": [""]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+# Copyright (c) 2020, salesforce.com, inc.
+# All rights reserved.
+# SPDX-License-Identifier: BSD-3-Clause
+# For full license text, see the LICENSE file in the repo root
+# or https://opensource.org/licenses/BSD-3-Clause
+
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from Converse.dialog_context.dialog_context import DialogContext
+from Converse.dialog_context.dialog_context_manager import DialogContextManager
+from Converse.dialog_orchestrator.orchestrator import Orchestrator
+from Converse.dialog_state_manager.dial_state_manager import (
+    FunctionCalls,
+    PendingFunctionCall,
+    StateManager,
+    function_calls,
+)
+from Converse.utils import utils
+from Converse.utils.utils import resp
+
+from test_files.TestConcurrentSessions import (
+    entity_api_call,
+    info_pipeline,
+    script,
+)
+
+HTTP_CALLS = []
+
+
+async def info_pipeline_async(asr_origin, asr_norm, ctx, plan=None):
+    # the model latency, other turns run in the meantime
+    await asyncio.sleep(0.05)
+    return info_pipeline(asr_origin, asr_norm, ctx, plan)
+
+
+async def entity_api_call_async(url, entities, *argv, **kwargs):
+    HTTP_CALLS.append(url)
+    await asyncio.sleep(0.05)
+    return entity_api_call(url, entities, *argv, **kwargs)
+
+
+@patch("Converse.response.response.choice", new=lambda seq: seq[0])
+@patch("Converse.dialog_orchestrator.orchestrator.choice", new=lambda seq: seq[0])
+@patch(
+    "Converse.dialog_state_manager.dial_state_manager.entity_api_call",
+    new=entity_api_call,
+)
+@patch(
+    "Converse.dialog_state_manager.dial_state_manager.entity_api_call_async",
+    new=entity_api_call_async,
+)
+@patch(
+    "Converse.dialog_info_layer.dial_info.InfoManager.info_pipeline",
+    side_effect=info_pipeline,
+)
+@patch(
+    "Converse.dialog_info_layer.dial_info.InfoManager.info_pipeline_async",
+    new=lambda self, *args, **kwargs: info_pipeline_async(*args, **kwargs),
+)
+class TestProcessAsync(unittest.TestCase):
+    """
+    Orchestrator.process_async gives the responses of Orchestrator.process,
+    many turns wait on their I/O at once on one event loop.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dm = Orchestrator(
+            task_path="test_files/test_tasks.yaml",
+            entity_path="test_files/test_entity_config.yaml",
+        )
+        cls.dmgr = DialogContextManager.new_instance("memory")
+
+    def setUp(self):
+        HTTP_CALLS.clear()
+
+    def new_ctx(self):
+        state_manager = self.dm.policy_layer.state_manager
+        return DialogContext(
+            entity_config=state_manager.entity_manager.entity_config,
+            task_config=state_manager.task_config,
+            bot_config=self.dm.policy_layer.bot_config,
+        )
+
+    async def converse_async(self, cid, utterances):
+        responses = []
+        for utt in utterances:
+            ctx = await self.dmgr.get_or_create_ctx_async(
+                cid,
+                self.dm.policy_layer.state_manager.entity_manager.entity_config,
+                self.dm.policy_layer.state_manager.task_config,
+                self.dm.policy_layer.bot_config,
+            )
+            responses.append(await self.dm.process_async(utt, utt, ctx))
+            await self.dmgr.save_async(cid, ctx)
+        await self.dmgr.delete_ctx_async(cid)
+        return responses
+
+    def test_parity(self, mock_info):
+        scripts = [script(i) for i in range(12)]
+        serial = []
+        for utterances in scripts:
+            ctx = self.new_ctx()
+            serial.append([self.dm.process(utt, utt, ctx) for utt in utterances])
+
+        async def run():
+            return await asyncio.gather(
+                *[self.converse_async(i, utts) for i, utts in enumerate(scripts)]
+            )
+
+        self.assertEqual(asyncio.run(run()), serial)
+        # the weather and tv plan functions are served over http
+        self.assertTrue(self.dm.policy_layer.state_manager.url_functions)
+        self.assertIn("http://localhost:8001/get_weather", HTTP_CALLS)
+
+    def test_turns_in_flight(self, mock_info):
+        scripts = [script(i) for i in range(300)]
+        turns = sum(len(utterances) for utterances in scripts)
+
+        async def run():
+            return await asyncio.gather(
+                *[self.converse_async(i, utts) for i, utts in enumerate(scripts)]
+            )
+
+        start = time.perf_counter()
+        transcripts = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        # every turn waits at least 50ms on its models, one after the other
+        # the turns would take over a minute
+        self.assertLess(elapsed, turns * 0.05 / 10)
+        self.assertIn("94000", " ".join(transcripts[0]))
+        self.assertNotIn("94006", " ".join(transcripts[0]))
+        self.assertFalse(self.dmgr.context_store)
+
+    def test_function_calls(self, mock_info):
+        local_calls = []
+
+        def local_function(entities, **kwargs):
+            local_calls.append(entities)
+            return resp(True, "local")
+
+        ctx = self.new_ctx()
+        calls = FunctionCalls()
+        token = function_calls.set(calls)
+        try:
+            run = StateManager._execute_entity_or_task_function
+            self.assertEqual(run(ctx, local_function, None)["msg"], "local")
+            with self.assertRaises(PendingFunctionCall) as pending:
+                run(ctx, None, "http://localhost:8001/get_weather")
+            self.assertEqual(pending.exception.url, "http://localhost:8001/get_weather")
+            calls.record(pending.exception.url, resp(True, "remote"))
+            calls.rewind()
+            # the step runs again, the functions already called are not
+            self.assertEqual(run(ctx, local_function, None)["msg"], "local")
+            self.assertEqual(
+                run(ctx, None, "http://localhost:8001/get_weather")["msg"], "remote"
+            )
+            self.assertEqual(len(local_calls), 1)
+            # the step took another path, the rest of the record is dropped
+            calls.rewind()
+            with self.assertRaises(PendingFunctionCall):
+                run(ctx, None, "http://localhost:8001/get_tv_plan")
+            self.assertEqual(calls.calls, [])
+        finally:
+            function_calls.reset(token)
+        # outside of process_async the functions are called right away
+        self.assertEqual(run(ctx, local_function, None)["msg"], "local")
+        self.assertEqual(len(local_calls), 2)
+
+    def test_checkpoint(self, mock_info):
+        ctx = self.new_ctx()
+        for utt in script(0)[:1]:
+            self.dm.process(utt, utt, ctx)
+        checkpoint = ctx.checkpoint(["turn object"])
+        self.dm.process("94301", "94301", ctx)
+        self.assertEqual(ctx.turn, 2)
+        (turn_object,) = ctx.restore(checkpoint)
+        self.assertEqual(turn_object, ["turn object"])
+        self.assertEqual(ctx.turn, 1)
+        self.assertEqual(ctx.tree_manager.cur_task, "check_weather")
+        # the configs of the bot are not copied
+        self.assertIs(ctx.bot_config, self.dm.policy_layer.bot_config)
+        self.assertIs(
+            ctx.tree_manager.task_path, self.dm.policy_layer.state_manager.task_config
+        )
+
+
+class TestEntityApiCallAsync(unittest.TestCase):
+    @patch("Converse.utils.utils.aiohttp", new=None)
+    @patch("Converse.utils.utils.requests.post")
+    def test_without_aiohttp(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=200)
+        mock_post.return_value.json.return_value = resp(True, "sunny")
+        states = {"cur_task": "check_weather", "cur_entity_name": "zip_code"}
+        res = asyncio.run(
+            utils.entity_api_call_async(
+                "http://localhost:8001/get_weather", {"zip_code": "94301"}, **states
+            )
+        )
+        self.assertEqual(res, resp(True, "sunny"))
+        mock_post.assert_called_once_with(
+            "http://localhost:8001/get_weather",
+            json={
+                "entities": {"zip_code": "94301"},
+                "cur_task": "check_weather",
+                "cur_entity": "zip_code",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()